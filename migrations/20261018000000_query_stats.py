@@ -0,0 +1,26 @@
+"""Store the bot's per-statement query stats for the usage CLI."""
+
+
+def upgrade(connection):
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS query_stats (
+            fingerprint TEXT PRIMARY KEY,
+            calls INTEGER NOT NULL,
+            errors INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            bytes_received INTEGER NOT NULL,
+            total_ms REAL NOT NULL,
+            p50_ms REAL NOT NULL,
+            p95_ms REAL NOT NULL,
+            p99_ms REAL NOT NULL,
+            wait_ms_avg REAL NOT NULL,
+            wait_ms_max REAL NOT NULL,
+            update_time DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def downgrade(connection):
+    connection.execute("DROP TABLE query_stats")
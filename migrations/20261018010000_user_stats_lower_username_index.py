@@ -0,0 +1,14 @@
+"""Index user_stats by lowercased username for case-insensitive lookups."""
+
+
+def upgrade(connection):
+    connection.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_user_stats_lower_username
+        ON user_stats (LOWER(username))
+        """
+    )
+
+
+def downgrade(connection):
+    connection.execute("DROP INDEX idx_user_stats_lower_username")
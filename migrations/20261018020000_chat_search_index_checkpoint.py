@@ -0,0 +1,17 @@
+"""Remember how far the chat search indexer has read chat_stats."""
+
+
+def upgrade(connection):
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_search_index_checkpoint (
+            name TEXT PRIMARY KEY,
+            last_stats_id INTEGER NOT NULL,
+            update_time DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def downgrade(connection):
+    connection.execute("DROP TABLE chat_search_index_checkpoint")
@@ -0,0 +1,19 @@
+"""Record how long the last chat search index run took and what it stored."""
+
+
+def upgrade(connection):
+    for definition in (
+        "last_run_ms INTEGER",
+        "last_run_windows INTEGER",
+        "last_run_utterances INTEGER",
+    ):
+        connection.execute(
+            f"ALTER TABLE chat_search_index_checkpoint ADD COLUMN {definition}"
+        )
+
+
+def downgrade(connection):
+    for column in ("last_run_utterances", "last_run_windows", "last_run_ms"):
+        connection.execute(
+            f"ALTER TABLE chat_search_index_checkpoint DROP COLUMN {column}"
+        )
@@ -9,7 +9,30 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--chat-id", type=int, action="append")
     parser.add_argument("--limit-utterances", type=int)
     parser.add_argument("--refresh", action="store_true")
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Read, embed and write concurrently, reporting per-chat progress.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Embedding requests in flight with --pipeline.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Estimate the backlog and embedding calls without indexing.",
+    )
     args = parser.parse_args()
+    if (args.pipeline or args.dry_run) and (
+        args.refresh or args.limit_utterances is not None
+    ):
+        parser.error(
+            "--pipeline and --dry-run cannot be combined with --refresh "
+            "or --limit-utterances"
+        )
     if args.refresh and args.limit_utterances is not None:
         parser.error("--refresh cannot be combined with --limit-utterances")
     return args
@@ -26,6 +49,16 @@ async def backfill() -> None:
     )
 
     chat_ids = args.chat_id or await source_chat_ids()
+    if args.pipeline or args.dry_run:
+        from management.chat_search_backfill import backfill_from_cli
+
+        await backfill_from_cli(
+            "utterances",
+            chat_ids,
+            concurrency=args.concurrency,
+            dry_run=args.dry_run,
+        )
+        return
     if args.refresh:
         print(f"indexed_utterances={await refresh_utterances(chat_ids):,}")
         return
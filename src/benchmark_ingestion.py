@@ -0,0 +1,313 @@
+"""Measure how fast the bot absorbs group messages.
+
+Synthetic updates go through the handler groups from `main.register_handlers`
+and the real update processor, against a fresh local libsql file with every
+migration applied. Bot API calls are answered in-process.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import cast
+
+BOT_USER = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "Benchmark",
+    "username": "benchmark_bot",
+    "can_join_groups": True,
+    "can_read_all_group_messages": True,
+    "supports_inline_queries": False,
+}
+HIGHLIGHT = "benchmark"
+WORDS = [
+    "ring",
+    "tonight",
+    "raid",
+    "boss",
+    "patch",
+    "lag",
+    "server",
+    "queue",
+    "build",
+    "meta",
+    "nerf",
+    "buff",
+    "coffee",
+    "lunch",
+    "deploy",
+    "ship",
+    "review",
+    "merge",
+    "weekend",
+    "match",
+    "goal",
+]
+# No @mentions: `mention_handler` shares handler group 3 with
+# `message_stats_handler` in `main.register_handlers`, and only the first
+# matching handler of a group runs, so mention writes never happen.
+MESSAGE_KINDS = ("plain", "reply", "link", "highlight")
+MESSAGE_WEIGHTS = (65, 20, 10, 5)
+NOT_MEASURED = [
+    (
+        "chat_mentions writes: mention_handler is shadowed by message_stats_handler "
+        "in handler group 3, so mentions are left out of the traffic"
+    )
+]
+
+type JsonObject = dict[str, object]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-fts",
+        action="store_true",
+        help="Leave message search off, so message text is not stored.",
+    )
+    parser.add_argument(
+        "--database",
+        help="libsql file to create; defaults to a temporary file.",
+    )
+    return parser.parse_args()
+
+
+def prepare_database(path: str, *, chats: list[int], fts: bool) -> None:
+    import migrate
+
+    os.environ["TURSO_DATABASE_URL"] = path
+    os.environ["TURSO_AUTH_TOKEN"] = "benchmark"
+    # Some migrations print progress; keep stdout for the JSON report.
+    with contextlib.redirect_stdout(sys.stderr):
+        migrate.main()
+
+    connection = migrate.open_connection()
+    try:
+        connection.executemany(
+            "INSERT OR REPLACE INTO group_settings (chat_id, fts) VALUES (?, ?)",
+            [(chat_id, int(fts)) for chat_id in chats],
+        )
+        connection.executemany(
+            "INSERT INTO highlights (chat_id, string, user_id) VALUES (?, ?, ?)",
+            [(chat_id, HIGHLIGHT, 1000) for chat_id in chats],
+        )
+    finally:
+        connection.close()
+
+
+def synthetic_messages(
+    count: int, *, chats: list[int], users: int, seed: int
+) -> list[JsonObject]:
+    """Message payloads in the shape the Bot API delivers them."""
+    rng = random.Random(seed)
+    now = int(time.time())
+    last_message: dict[int, JsonObject] = {}
+    payloads: list[JsonObject] = []
+    for message_id in range(1, count + 1):
+        chat_id = rng.choice(chats)
+        user_id = 1000 + rng.randrange(users)
+        text = " ".join(rng.choices(WORDS, k=rng.randint(3, 16)))
+        message: JsonObject = {
+            "message_id": message_id,
+            "date": now,
+            "chat": {"id": chat_id, "type": "supergroup", "title": f"Chat {chat_id}"},
+            "from": {
+                "id": user_id,
+                "is_bot": False,
+                "first_name": f"User {user_id}",
+                "username": f"bench_user{user_id}",
+            },
+        }
+        kind = rng.choices(MESSAGE_KINDS, MESSAGE_WEIGHTS)[0]
+        if kind == "reply" and chat_id in last_message:
+            message["reply_to_message"] = last_message[chat_id]
+        elif kind == "link":
+            link = f"https://example.com/posts/{message_id}"
+            message["entities"] = [
+                {"type": "url", "offset": len(text) + 1, "length": len(link)}
+            ]
+            text = f"{text} {link}"
+        elif kind == "highlight":
+            text = f"{text} {HIGHLIGHT}"
+        message["text"] = text
+        last_message[chat_id] = message
+        payloads.append({"update_id": message_id, "message": message})
+    return payloads
+
+
+def make_request():
+    from telegram.request import BaseRequest, RequestData
+
+    class BenchmarkRequest(BaseRequest):
+        """Answers Bot API calls locally and counts them by method."""
+
+        def __init__(self):
+            self.calls: Counter[str] = Counter()
+            self._message_id = 0
+
+        @property
+        def read_timeout(self) -> float | None:
+            return None
+
+        async def initialize(self) -> None:
+            pass
+
+        async def shutdown(self) -> None:
+            pass
+
+        async def do_request(
+            self,
+            url: str,
+            method: str,
+            request_data: RequestData | None = None,
+            read_timeout: object = None,
+            write_timeout: object = None,
+            connect_timeout: object = None,
+            pool_timeout: object = None,
+        ) -> tuple[int, bytes]:
+            endpoint = url.rsplit("/", 1)[-1]
+            self.calls[endpoint] += 1
+            parameters = request_data.parameters if request_data else {}
+            result: object = True
+            if endpoint == "getMe":
+                result = BOT_USER
+            elif endpoint == "sendMessage":
+                self._message_id += 1
+                result = {
+                    "message_id": self._message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": parameters["chat_id"], "type": "private"},
+                    "text": parameters.get("text", ""),
+                }
+            return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    return BenchmarkRequest()
+
+
+async def run(args: argparse.Namespace, database: str) -> JsonObject:
+    chats = [-1001000000000 - index for index in range(args.chats)]
+    prepare_database(database, chats=chats, fts=not args.no_fts)
+
+    from telegram import Update
+    from telegram.ext import ApplicationBuilder, ContextTypes, TypeHandler
+
+    from config.db import close_db, init_db
+    from config.query_stats import percentile, query_stats_snapshot, reset_query_stats
+    from main import register_handlers
+    from management.ingestion import ingestion_buffer
+    from utils.concurrency import background_tasks
+    from utils.update_processor import ChatFairUpdateProcessor
+
+    request = make_request()
+    application = (
+        ApplicationBuilder()
+        .token("123456:benchmark")
+        .request(request)
+        .get_updates_request(request)
+        .updater(None)
+        .job_queue(None)
+        .concurrent_updates(ChatFairUpdateProcessor())
+        .build()
+    )
+    register_handlers(application)
+
+    enqueued: dict[int, float] = {}
+    latencies: list[float] = []
+    errors = 0
+
+    async def record_latency(update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
+        latencies.append(time.perf_counter() - enqueued[update.update_id])
+
+    async def count_error(_: object, __: ContextTypes.DEFAULT_TYPE) -> None:
+        nonlocal errors
+        errors += 1
+
+    # After every other group, so this sees when the blocking handlers finished.
+    application.add_handler(TypeHandler(Update, record_latency), group=100)
+    application.add_error_handler(count_error)
+
+    await init_db()
+    try:
+        async with application:
+            updates = [
+                Update.de_json(payload, application.bot)
+                for payload in synthetic_messages(
+                    args.messages, chats=chats, users=args.users, seed=args.seed
+                )
+            ]
+            await application.start()
+            reset_query_stats()
+            request.calls.clear()
+
+            started = time.perf_counter()
+            for update in updates:
+                enqueued[update.update_id] = time.perf_counter()
+                await application.update_queue.put(update)
+            await application.update_queue.join()
+            # stop() waits for the non-blocking handlers PTB spawned.
+            await application.stop()
+            await background_tasks.drain(timeout=60)
+            await ingestion_buffer.flush()
+            elapsed = time.perf_counter() - started
+    finally:
+        await ingestion_buffer.close()
+        await close_db()
+
+    queries = query_stats_snapshot()
+    statements = sum(cast(int, query["calls"]) for query in queries)
+    samples = sorted(latencies)
+    return {
+        "messages": len(updates),
+        "chats": args.chats,
+        "users": args.users,
+        "fts": not args.no_fts,
+        "elapsed_seconds": round(elapsed, 3),
+        "messages_per_second": round(len(updates) / elapsed, 1),
+        "handler_latency_ms": {
+            "p50": round(percentile(samples, 0.50) * 1000, 2),
+            "p99": round(percentile(samples, 0.99) * 1000, 2),
+            "max": round(samples[-1] * 1000, 2) if samples else 0.0,
+        },
+        "db_statements": statements,
+        "db_statements_per_message": round(statements / len(updates), 2),
+        "not_measured": NOT_MEASURED,
+        "bot_api_calls": dict(request.calls.most_common()),
+        "errors": errors,
+        # ru_maxrss is reported in kilobytes on Linux.
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "slowest_queries": queries[:5],
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    # Never read .env here: the benchmark must not reach a production database.
+    os.environ.setdefault("TELEGRAM_TOKEN", "123456:benchmark")
+    os.environ.setdefault("QUOTE_CHANNEL_ID", "1")
+    if args.database:
+        if Path(args.database).exists():
+            raise SystemExit(f"{args.database} already exists; pass a new path.")
+        report = asyncio.run(run(args, args.database))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            report = asyncio.run(run(args, f"{directory}/benchmark.db"))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import os
+from pathlib import Path
+
 EMBEDDING_MODEL = "qwen/qwen3-embedding-8b"
 MEMORY_MODEL = "openai/gpt-5.6-luna"
 EMBEDDING_DIMENSIONS = 1024
@@ -16,3 +19,10 @@ QUERY_INSTRUCTION = (
     "observable statements, preferences, attitudes, and behavior that support a "
     "playful choice.\nQuery: "
 )
+
+SEARCH_CACHE_PATH = "db/chat-search.db"
+SEARCH_INDEX_CHECKPOINT = "chat_search"
+
+
+def cache_path() -> Path:
+    return Path(os.environ.get("SEARCH_CACHE_PATH", SEARCH_CACHE_PATH))
@@ -0,0 +1,187 @@
+"""How far the chat search index and its local cache trail `chat_stats`.
+
+This imports nothing from the bot, so `command_usage` can run it with only the
+database credentials.
+"""
+
+import importlib
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+from typing import Any
+
+from chat_search_config import (
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_MODEL,
+    SEARCH_INDEX_CHECKPOINT,
+    UTTERANCE_EMBEDDING_DIMENSIONS,
+    cache_path,
+)
+
+type Fetch = Callable[[str, tuple[object, ...]], Awaitable[Sequence[Mapping[str, Any]]]]
+
+SOURCE_MESSAGE_FILTER = """
+    message_id IS NOT NULL
+    AND message_text IS NOT NULL
+    AND message_text <> ''
+    AND message_text NOT LIKE '/%'
+"""
+
+CHAT_LAG_SQL = f"""
+WITH latest AS (
+    SELECT
+        gs.chat_id,
+        newest.message_id AS newest_message_id,
+        newest.create_time AS newest_time,
+        windows.end_message_id AS window_end,
+        windows.end_time AS window_time,
+        utterances.end_message_id AS utterance_end,
+        utterances.end_time AS utterance_time
+    FROM group_settings gs
+    LEFT JOIN chat_stats newest ON newest.id = (
+        SELECT id
+        FROM chat_stats
+        WHERE chat_id = gs.chat_id
+        AND {SOURCE_MESSAGE_FILTER}
+        ORDER BY message_id DESC
+        LIMIT 1
+    )
+    LEFT JOIN chat_search_windows windows ON windows.id = (
+        SELECT id
+        FROM chat_search_windows
+        WHERE chat_id = gs.chat_id
+        AND embedding_model = ?
+        AND embedding_dimension = ?
+        ORDER BY start_message_id DESC
+        LIMIT 1
+    )
+    LEFT JOIN chat_search_utterances utterances ON utterances.id = (
+        SELECT id
+        FROM chat_search_utterances
+        WHERE chat_id = gs.chat_id
+        AND embedding_model = ?
+        AND embedding_dimension = ?
+        ORDER BY start_message_id DESC
+        LIMIT 1
+    )
+    WHERE gs.fts = 1
+)
+SELECT
+    latest.*,
+    (
+        SELECT COUNT(*)
+        FROM chat_stats cs
+        WHERE cs.chat_id = latest.chat_id
+        AND (latest.window_end IS NULL OR cs.message_id > latest.window_end)
+        AND {SOURCE_MESSAGE_FILTER}
+    ) AS window_backlog,
+    (
+        SELECT COUNT(*)
+        FROM chat_stats cs
+        WHERE cs.chat_id = latest.chat_id
+        AND (latest.utterance_end IS NULL OR cs.message_id > latest.utterance_end)
+        AND {SOURCE_MESSAGE_FILTER}
+    ) AS utterance_backlog,
+    CAST(
+        (julianday(latest.newest_time) - julianday(latest.window_time)) * 86400
+        AS INTEGER
+    ) AS window_lag_seconds,
+    CAST(
+        (julianday(latest.newest_time) - julianday(latest.utterance_time)) * 86400
+        AS INTEGER
+    ) AS utterance_lag_seconds
+FROM latest
+ORDER BY window_backlog DESC, latest.chat_id
+"""
+
+INDEXER_SQL = """
+SELECT
+    checkpoint.last_stats_id,
+    checkpoint.update_time,
+    checkpoint.last_run_ms,
+    checkpoint.last_run_windows,
+    checkpoint.last_run_utterances,
+    (
+        SELECT COUNT(*)
+        FROM chat_stats
+        WHERE id > COALESCE(checkpoint.last_stats_id, 0)
+    ) AS feed_backlog_rows
+FROM (SELECT 1)
+LEFT JOIN chat_search_index_checkpoint checkpoint ON checkpoint.name = ?
+"""
+
+CACHE_LAG_SQL = """
+SELECT
+    (SELECT COUNT(*) FROM chat_search_windows WHERE id > ?) AS windows_behind,
+    (SELECT COUNT(*) FROM chat_search_utterances WHERE id > ?) AS utterances_behind
+"""
+
+
+def cached_remote_ids() -> tuple[int, int] | None:
+    """Remote IDs the local search cache has synced through, if it exists."""
+    path = cache_path()
+    if not path.exists():
+        return None
+    libsql_connect: Any = vars(importlib.import_module("libsql"))["connect"]
+    connection = libsql_connect(str(path))
+    try:
+        row = connection.execute(
+            """
+            SELECT windows.remote_id, utterances.remote_id
+            FROM search_cache_state windows, search_utterance_cache_state utterances
+            WHERE windows.singleton = 1 AND utterances.singleton = 1
+            """
+        ).fetchone()
+    finally:
+        connection.close()
+    return (row[0], row[1]) if row else None
+
+
+async def search_index_lag(fetch: Fetch) -> dict[str, Any]:
+    """Per-chat indexing lag, the indexer's last run and local cache lag.
+
+    `fetch` runs one query and returns its rows, so the bot and the CLI can
+    share this over their own connections.
+    """
+    chats = await fetch(
+        CHAT_LAG_SQL,
+        (
+            EMBEDDING_MODEL,
+            EMBEDDING_DIMENSIONS,
+            EMBEDDING_MODEL,
+            UTTERANCE_EMBEDDING_DIMENSIONS,
+        ),
+    )
+    indexer = (await fetch(INDEXER_SQL, (SEARCH_INDEX_CHECKPOINT,)))[0]
+    synced = cached_remote_ids()
+    cache = await fetch(CACHE_LAG_SQL, synced) if synced else None
+    return {
+        "indexer": {
+            "checkpoint_stats_id": indexer["last_stats_id"],
+            "update_time": indexer["update_time"],
+            "feed_backlog_rows": indexer["feed_backlog_rows"],
+            "last_run_ms": indexer["last_run_ms"],
+            "last_run_windows": indexer["last_run_windows"],
+            "last_run_utterances": indexer["last_run_utterances"],
+        },
+        "cache": {
+            "windows_behind": cache[0]["windows_behind"] if cache else None,
+            "utterances_behind": cache[0]["utterances_behind"] if cache else None,
+        },
+        "chats": [
+            {
+                "chat_id": row["chat_id"],
+                "newest_message_id": row["newest_message_id"],
+                "newest_message_time": row["newest_time"],
+                "windows": {
+                    "indexed_through": row["window_end"],
+                    "backlog_messages": row["window_backlog"],
+                    "lag_seconds": row["window_lag_seconds"],
+                },
+                "utterances": {
+                    "indexed_through": row["utterance_end"],
+                    "backlog_messages": row["utterance_backlog"],
+                    "lag_seconds": row["utterance_lag_seconds"],
+                },
+            }
+            for row in chats
+        ],
+    }
@@ -1,8 +1,10 @@
 import argparse
+import asyncio
 import json
 
 from dotenv import load_dotenv
 
+from chat_search_lag import search_index_lag
 from migrate import open_connection
 
 type JsonObject = dict[str, object]
@@ -85,6 +87,27 @@ def usage_report(
     }
 
 
+def query_report(connection, *, limit: int) -> JsonObject:
+    queries = fetch_rows(
+        connection,
+        """
+        SELECT *
+        FROM query_stats
+        ORDER BY total_ms DESC
+        LIMIT ?
+        """,
+        (limit,),
+    )
+    return {"filters": {"limit": limit}, "queries": queries}
+
+
+def search_lag_report(connection) -> JsonObject:
+    async def fetch(sql: str, params: tuple[object, ...]) -> list[JsonObject]:
+        return fetch_rows(connection, sql, params)
+
+    return asyncio.run(search_index_lag(fetch))
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Query production command usage and failure history."
@@ -96,6 +119,16 @@ def parse_args() -> argparse.Namespace:
         choices=("completed", "blocked", "failed"),
     )
     parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument(
+        "--queries",
+        action="store_true",
+        help="Show the slowest database statements recorded by the bot instead.",
+    )
+    parser.add_argument(
+        "--search-lag",
+        action="store_true",
+        help="Show how far the semantic search index trails each chat instead.",
+    )
     return parser.parse_args()
 
 
@@ -104,13 +137,18 @@ def main() -> None:
     args = parse_args()
     connection = open_connection()
     try:
-        report = usage_report(
-            connection,
-            days=args.days,
-            command=args.command,
-            status=args.status,
-            limit=args.limit,
-        )
+        if args.search_lag:
+            report = search_lag_report(connection)
+        elif args.queries:
+            report = query_report(connection, limit=args.limit)
+        else:
+            report = usage_report(
+                connection,
+                days=args.days,
+                command=args.command,
+                status=args.status,
+                limit=args.limit,
+            )
     finally:
         connection.close()
     print(json.dumps(report, indent=2, ensure_ascii=False))
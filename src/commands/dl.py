@@ -1,4 +1,3 @@
-import asyncio
 import io
 import json
 from html.parser import HTMLParser
@@ -13,11 +12,12 @@ from yt_dlp import YoutubeDL
 from yt_dlp.utils import DownloadError
 
 import utils
-from config.db import get_db
+from config.executors import network_executor
 from config.logger import logger
 from config.options import config
 from utils.decorators import command
 from utils.messages import get_message
+from utils.update_context import update_context
 
 MAX_MEDIA_COUNT = 10
 MAX_DOWNLOAD_SIZE = 47 * (1 << 20)
@@ -61,18 +61,6 @@ class InstagramImageParser(HTMLParser):
             self.image_url = attributes.get("content")
 
 
-async def _is_auto_dl_enabled(chat_id: int) -> bool:
-    async with (
-        get_db() as conn,
-        conn.execute(
-            "SELECT auto_dl FROM group_settings WHERE chat_id = ?",
-            (chat_id,),
-        ) as cursor,
-    ):
-        row = await cursor.fetchone()
-    return bool(row and row["auto_dl"])
-
-
 async def _request_cobalt(
     session: aiohttp.ClientSession,
     endpoint: str,
@@ -129,7 +117,7 @@ async def _fetch_with_yt_dlp(
     session: aiohttp.ClientSession,
     target: str,
 ) -> None:
-    media_url, filename = await asyncio.to_thread(_extract_with_yt_dlp, target)
+    media_url, filename = await network_executor.run(_extract_with_yt_dlp, target)
     await _fetch_and_send(message, session, media_url, filename)
 
 
@@ -342,7 +330,7 @@ async def auto_dl_message_handler(update: Update, _: ContextTypes.DEFAULT_TYPE)
         return
     if message.chat.type == ChatType.PRIVATE:
         return
-    if not await _is_auto_dl_enabled(message.chat_id):
+    if not (await update_context(update).settings()).auto_dl:
         return
 
     for _entity, link in sorted(
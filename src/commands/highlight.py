@@ -1,19 +1,47 @@
+import asyncio
 import html
+import os
+import time
 
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Message, Update, User
 from telegram.constants import KeyboardButtonStyle, ParseMode
 from telegram.error import Forbidden
 from telegram.ext import ContextTypes
 
-from config.db import get_db
+from config.db import TursoRow, get_db
 from config.logger import logger
 from utils.decorators import command
+from utils.highlights import invalidate_highlight_matcher
 from utils.messages import get_message
+from utils.update_context import update_context
+
+HIGHLIGHT_DM_CONCURRENCY = int(os.environ.get("HIGHLIGHT_DM_CONCURRENCY", "8"))
+# Users who blocked the bot are skipped for this long instead of costing an API
+# call on every match.
+HIGHLIGHT_FORBIDDEN_COOLDOWN_SECONDS = float(
+    os.environ.get("HIGHLIGHT_FORBIDDEN_COOLDOWN_SECONDS", "21600")
+)
+
+_dm_slots: asyncio.Semaphore | None = None
+_dm_slots_loop: asyncio.AbstractEventLoop | None = None
+_dm_blocked_until: dict[int, float] = {}
+
+
+def dm_slots() -> asyncio.Semaphore:
+    """DM concurrency limit for the running loop."""
+    global _dm_slots, _dm_slots_loop
+    loop = asyncio.get_running_loop()
+    if _dm_slots is None or _dm_slots_loop is not loop:
+        _dm_slots_loop = loop
+        _dm_slots = asyncio.Semaphore(HIGHLIGHT_DM_CONCURRENCY)
+    return _dm_slots
 
 
-def delete_highlight_button(highlight_id: int, user_id: int) -> InlineKeyboardButton:
+def delete_highlight_button(
+    highlight_id: int, user_id: int, *, label: str = "Delete Highlight"
+) -> InlineKeyboardButton:
     return InlineKeyboardButton(
-        "Delete Highlight",
+        label,
         callback_data=f"hl:{highlight_id},{user_id}",
         style=KeyboardButtonStyle.DANGER,
     )
@@ -74,13 +102,18 @@ async def highlight_button_handler(
         await query.answer("You can only delete your own highlights.")
         return
 
-    async with get_db() as conn:
-        await conn.execute(
+    async with (
+        get_db() as conn,
+        conn.execute(
             """
-            DELETE FROM 'highlights' WHERE id = ?
+            DELETE FROM 'highlights' WHERE id = ? RETURNING chat_id
             """,
             (highlight_id,),
-        )
+        ) as cursor,
+    ):
+        deleted = await cursor.fetchone()
+    if deleted:
+        invalidate_highlight_matcher(deleted["chat_id"])
 
     await query.answer("Deleted highlight.")
 
@@ -121,6 +154,9 @@ async def highlighter(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             if not result.rowcount:
                 await message.reply_text("Highlight already exists.")
                 return
+        invalidate_highlight_matcher(message.chat_id)
+        # They may have started a DM with the bot since it was last blocked.
+        _dm_blocked_until.pop(message.from_user.id, None)
 
         bot_username = context.bot.username
         text = (
@@ -140,40 +176,95 @@ async def highlighter(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     )
 
 
+def _dm_blocked(user_id: int) -> bool:
+    blocked_until = _dm_blocked_until.get(user_id)
+    if blocked_until is None:
+        return False
+    if blocked_until > time.monotonic():
+        return True
+    del _dm_blocked_until[user_id]
+    return False
+
+
+def _block_dms(user_id: int) -> None:
+    now = time.monotonic()
+    # Users are otherwise only removed when they match a highlight again.
+    for expired in [key for key, until in _dm_blocked_until.items() if until <= now]:
+        del _dm_blocked_until[expired]
+    _dm_blocked_until[user_id] = now + HIGHLIGHT_FORBIDDEN_COOLDOWN_SECONDS
+
+
+def _highlight_dm(
+    message: Message, author: User, rows: list[TursoRow]
+) -> tuple[str, InlineKeyboardMarkup]:
+    keywords = ", ".join(f"<code>{html.escape(row['string'])}</code>" for row in rows)
+    if len(rows) == 1:
+        subject = f"Your highlight {keywords} was"
+        buttons = [[delete_highlight_button(rows[0]["id"], rows[0]["user_id"])]]
+    else:
+        subject = f"Your highlights {keywords} were"
+        buttons = [
+            [
+                delete_highlight_button(
+                    row["id"], row["user_id"], label=f"Delete {row['string']}"
+                )
+            ]
+            for row in rows
+        ]
+    text = (
+        f"{subject} mentioned "
+        f"in <b>{html.escape(message.chat.title or str(message.chat_id))}</b> by "
+        f"<a href='tg://user?id={author.id}'>{html.escape(author.first_name)}</a>."
+        f"\n\n🔗 <a href='{html.escape(message.link or '', quote=True)}'>Link</a>"
+    )
+    return text, InlineKeyboardMarkup(buttons)
+
+
+async def _send_highlight_dm(
+    context: ContextTypes.DEFAULT_TYPE,
+    message: Message,
+    author: User,
+    user_id: int,
+    rows: list[TursoRow],
+) -> None:
+    text, reply_markup = _highlight_dm(message, author, rows)
+    try:
+        async with dm_slots():
+            await context.bot.send_message(
+                user_id,
+                text,
+                parse_mode=ParseMode.HTML,
+                reply_markup=reply_markup,
+            )
+    except Forbidden:
+        # Do not leak highlight keywords or owner identity into the group.
+        logger.info(
+            "Highlight DM forbidden for user %s in chat %s", user_id, message.chat_id
+        )
+        _block_dms(user_id)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Highlight DM to user %s failed: %s", user_id, exc)
+
+
 async def highlight_worker(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     message = get_message(update)
 
     if not message:
         return
-    if not message.text or not message.from_user:
+    author = message.from_user
+    if not message.text or not author:
         return
 
-    async with (
-        get_db() as conn,
-        conn.execute(
-            """SELECT * FROM highlights WHERE chat_id = ?""", (message.chat_id,)
-        ) as cursor,
-    ):
-        result = await cursor.fetchall()
+    matcher = await update_context(update).highlights()
 
-    for row in result:
-        if row["string"].lower() in message.text.lower():
-            try:
-                await context.bot.send_message(
-                    row["user_id"],
-                    f"Your highlight <code>{html.escape(row['string'])}</code> was mentioned "
-                    f"in <b>{html.escape(message.chat.title or str(message.chat_id))}</b> by "
-                    f"<a href='tg://user?id={message.from_user.id}'>{html.escape(message.from_user.first_name)}</a>."
-                    f"\n\n🔗 <a href='{html.escape(message.link or '', quote=True)}'>Link</a>",
-                    parse_mode=ParseMode.HTML,
-                    reply_markup=InlineKeyboardMarkup(
-                        [[delete_highlight_button(row["id"], row["user_id"])]]
-                    ),
-                )
-            except Forbidden:
-                # Do not leak highlight keywords or owner identity into the group.
-                logger.info(
-                    "Highlight DM forbidden for user %s in chat %s",
-                    row["user_id"],
-                    message.chat_id,
-                )
+    recipients: dict[int, list[TursoRow]] = {}
+    for row in matcher.matches(message.text):
+        recipients.setdefault(row["user_id"], []).append(row)
+
+    await asyncio.gather(
+        *(
+            _send_highlight_dm(context, message, author, user_id, rows)
+            for user_id, rows in recipients.items()
+            if not _dm_blocked(user_id)
+        )
+    )
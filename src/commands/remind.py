@@ -174,19 +174,28 @@ async def worker_reminder(context: ContextTypes.DEFAULT_TYPE):
     ):
         existing_reminders = await cursor.fetchall()
 
-    for reminder in existing_reminders:
-        async with get_db() as conn:
-            claim = await conn.execute(
-                """
-                UPDATE reminders
-                SET claim_time = ?, attempt_count = attempt_count + 1, last_error = NULL
-                WHERE id = ?
-                AND (claim_time IS NULL OR claim_time <= ?)
-                """,
-                (now, reminder["id"], expired_claim_time),
-            )
-            if claim.rowcount == 0:
-                continue
+    if not existing_reminders:
+        return
+
+    async with get_db() as conn:
+        claims = await conn.batch(
+            [
+                (
+                    """
+                    UPDATE reminders
+                    SET claim_time = ?, attempt_count = attempt_count + 1, last_error = NULL
+                    WHERE id = ?
+                    AND (claim_time IS NULL OR claim_time <= ?)
+                    """,
+                    (now, reminder["id"], expired_claim_time),
+                )
+                for reminder in existing_reminders
+            ]
+        )
+
+    for reminder, claim in zip(existing_reminders, claims, strict=True):
+        if claim.rowcount == 0:
+            continue
 
         text = (
             f'⏰ <a href="tg://user?id={reminder["user_id"]}">Reminder for you</a>'
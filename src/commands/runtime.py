@@ -10,9 +10,10 @@ from telegram.error import BadRequest, TelegramError
 from telegram.ext import ContextTypes
 
 from config import logger
-from config.db import get_db
+from config.db import get_db, get_read_db
 from config.options import config
 from utils.admin import is_admin
+from utils.chat_settings import get_chat_settings
 from utils.concurrency import schedule_background_task
 from utils.decorators import CommandFunc, get_command_meta
 from utils.messages import get_message
@@ -87,7 +88,7 @@ async def record_command_event(
         )
 
 
-def finish_command_event(
+async def finish_command_event(
     message: Message,
     command: str,
     status: str,
@@ -108,7 +109,7 @@ def finish_command_event(
         type(error).__name__ if error else None,
         exc_info=(type(error), error, error.__traceback__) if error else None,
     )
-    schedule_background_task(
+    await schedule_background_task(
         record_command_event(message, command, status, duration_ms, error),
         "command-event",
     )
@@ -136,7 +137,7 @@ async def every_message_action(update: Update, _: ContextTypes.DEFAULT_TYPE) ->
 
 
 async def _is_blocked(user_id: int, command: str) -> bool:
-    async with get_db() as conn:
+    async with get_read_db() as conn:
         result = await conn.execute(
             "SELECT 1 FROM command_blocklist WHERE user_id = ? AND command = ?",
             (user_id, command),
@@ -167,19 +168,17 @@ async def ensure_command_available(
         await message.reply_text("This command is not available in private chats.")
         return False
 
+    if command in (await get_chat_settings(whitelist_chat_id)).whitelisted:
+        return True
     async with (
-        get_db() as conn,
+        get_read_db() as conn,
         conn.execute(
             """
             SELECT 1
             FROM command_whitelist
-            WHERE command = ?
-            AND (
-                (whitelist_type = 'chat' AND whitelist_id = ?)
-                OR (whitelist_type = 'user' AND whitelist_id = ?)
-            );
+            WHERE command = ? AND whitelist_type = 'user' AND whitelist_id = ?;
             """,
-            (command, whitelist_chat_id, user_id),
+            (command, user_id),
         ) as cursor,
     ):
         if await cursor.fetchone():
@@ -219,7 +218,7 @@ def command_wrapper(
                 logger.debug("Skipping command reaction: %s", exc)
 
         try:
-            schedule_background_task(
+            await schedule_background_task(
                 message.reply_chat_action(ChatAction.TYPING),
                 "typing-indicator",
             )
@@ -233,7 +232,7 @@ def command_wrapper(
                 await message.reply_text("❌ You are blocked from using this command.")
                 return
 
-            schedule_background_task(set_command_reaction(), "command-reaction")
+            await schedule_background_task(set_command_reaction(), "command-reaction")
 
             await fn(update, context)
         except HandledCommandError as exc:
@@ -249,7 +248,7 @@ def command_wrapper(
             raise
         finally:
             if command_name and message.from_user:
-                finish_command_event(
+                await finish_command_event(
                     message,
                     command_name,
                     status,
@@ -1,4 +1,3 @@
-import asyncio
 import os
 import time
 import uuid
@@ -9,6 +8,7 @@ from telegram.error import TelegramError
 from telegram.ext import ContextTypes
 
 from commands.runtime import ensure_command_available
+from config.executors import media_executor
 from config.logger import logger
 from management.chat_memory import (
     enable_fts as enable_chat_fts,
@@ -207,7 +207,7 @@ async def import_chat_stats(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     try:
         await status_msg.edit_text("Parsing JSON export...")
-        batch = await asyncio.to_thread(parse_export_file, filename, message.chat_id)
+        batch = await media_executor.run(parse_export_file, filename, message.chat_id)
 
         if not batch:
             await status_msg.edit_text("No valid messages found in export.")
@@ -6,6 +6,7 @@ from telegram.ext import ContextTypes
 
 from config.db import get_db
 from utils.admin import is_admin
+from utils.chat_settings import get_chat_settings, invalidate_chat_settings
 from utils.decorators import command
 from utils.messages import get_message
 
@@ -53,38 +54,13 @@ async def _can_manage_settings(
 
 
 async def _setting_states(chat_id: int) -> dict[str, bool]:
-    states = {toggle.key: False for toggle in TOGGLES}
-    command_names = tuple(
-        toggle.value for toggle in TOGGLES if toggle.table == "command_whitelist"
-    )
-    placeholders = ", ".join("?" for _ in command_names)
-
-    async with get_db() as conn:
-        async with conn.execute(
-            "SELECT fts, auto_dl FROM group_settings WHERE chat_id = ?",
-            (chat_id,),
-        ) as cursor:
-            row = await cursor.fetchone()
-            states["fts"] = bool(row and row["fts"])
-            states["auto_dl"] = bool(row and row["auto_dl"])
-
-        async with conn.execute(
-            f"""
-            SELECT command
-            FROM command_whitelist
-            WHERE whitelist_type = ?
-            AND whitelist_id = ?
-            AND command IN ({placeholders})
-            """,
-            (WHITELIST_TYPE, chat_id, *command_names),
-        ) as cursor:
-            rows = await cursor.fetchall()
-            enabled_commands = {row["command"] for row in rows}
-
-    for toggle in TOGGLES:
-        if toggle.table == "command_whitelist":
-            states[toggle.key] = toggle.value in enabled_commands
-    return states
+    chat_settings = await get_chat_settings(chat_id)
+    return {
+        toggle.key: toggle.value in chat_settings.whitelisted
+        if toggle.table == "command_whitelist"
+        else getattr(chat_settings, toggle.value)
+        for toggle in TOGGLES
+    }
 
 
 def _settings_keyboard(chat_id: int, states: dict[str, bool]) -> InlineKeyboardMarkup:
@@ -129,9 +105,7 @@ async def _set_toggle(chat_id: int, toggle: SettingToggle, enabled: bool) -> Non
                 """,
                 (chat_id, int(enabled)),
             )
-            return
-
-        if enabled:
+        elif enabled:
             await conn.execute(
                 """
                 INSERT OR IGNORE INTO command_whitelist (
@@ -141,15 +115,15 @@ async def _set_toggle(chat_id: int, toggle: SettingToggle, enabled: bool) -> Non
                 """,
                 (toggle.value, WHITELIST_TYPE, chat_id),
             )
-            return
-
-        await conn.execute(
-            """
-            DELETE FROM command_whitelist
-            WHERE command = ? AND whitelist_type = ? AND whitelist_id = ?
-            """,
-            (toggle.value, WHITELIST_TYPE, chat_id),
-        )
+        else:
+            await conn.execute(
+                """
+                DELETE FROM command_whitelist
+                WHERE command = ? AND whitelist_type = ? AND whitelist_id = ?
+                """,
+                (toggle.value, WHITELIST_TYPE, chat_id),
+            )
+    invalidate_chat_settings(chat_id)
 
 
 @command(
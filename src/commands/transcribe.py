@@ -1,4 +1,3 @@
-import asyncio
 import mimetypes
 import os
 import subprocess
@@ -12,6 +11,7 @@ from telegram.ext import ContextTypes
 import commands
 from commands.ai import generate_text
 from commands.runtime import ensure_command_available
+from config.executors import media_executor
 from config.logger import logger
 from config.options import config
 from utils.command_limits import ensure_quota
@@ -62,7 +62,7 @@ async def _convert_audio_to_wav(
             if os.path.exists(dst_path):
                 os.unlink(dst_path)
 
-    return await asyncio.to_thread(_run)
+    return await media_executor.run(_run)
 
 
 @command(
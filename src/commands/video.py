@@ -15,6 +15,7 @@ from telegram.ext import ContextTypes
 import commands
 from commands.ai import OPENROUTER_BASE_URL, OPENROUTER_HEADERS
 from commands.runtime import HandledCommandError, ensure_command_available
+from config.executors import media_executor
 from config.logger import logger
 from config.options import config
 from utils.command_limits import ensure_quota
@@ -280,7 +281,9 @@ async def video(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             VIDEO_JOB_LOCK,
             aiohttp.ClientSession(headers=headers, timeout=timeout) as session,
         ):
-            request = build_video_request(prompt, source_image)
+            request = await media_executor.run(
+                build_video_request, prompt, source_image
+            )
             job_id = await submit_video(session, request)
             await wait_for_video(session, job_id)
             job_completed = True
@@ -7,6 +7,7 @@ from telegram.ext import ContextTypes
 import commands
 from config.db import get_db
 from utils.admin import is_admin
+from utils.chat_settings import invalidate_chat_settings
 from utils.decorators import command
 from utils.messages import get_message
 
@@ -76,6 +77,7 @@ async def _update_whitelist(
                 )
                 return
 
+    invalidate_chat_settings(chat_id)
     if remove:
         await message.reply_text(
             (
@@ -1,21 +1,40 @@
 import asyncio
+import base64
 import importlib
 import json
 import os
-from collections.abc import AsyncGenerator, Iterator
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Callable, Sequence
 from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Self
-from urllib import error, parse, request
+from functools import lru_cache
+from typing import Any, ClassVar, Self
+from urllib import parse
+
+import aiohttp
 
 from config import logger
+from config.executors import db_executor
+from config.query_stats import QueryStats, record_query
 
 _init_lock = asyncio.Lock()
 DB_OPEN_ATTEMPTS = 3
 DB_OPEN_RETRY_DELAY_SECONDS = 0.2
 HRANA_CLOSED_MESSAGE = "connection closed before message completed"
 HTTP_READ_TIMEOUT_SECONDS = 60
+HTTP_CONNECT_TIMEOUT_SECONDS = 10
+HTTP_TOTAL_TIMEOUT_SECONDS = 90
+HTTP_CONNECTION_LIMIT = int(os.environ.get("TURSO_HTTP_CONNECTION_LIMIT", "16"))
+HTTP_KEEPALIVE_SECONDS = 30
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+DB_POOL_IDLE_SECONDS = float(os.environ.get("DB_POOL_IDLE_SECONDS", "300"))
+DB_POOL_HEALTH_CHECK_SECONDS = 30
+CURSOR_FETCH_SIZE = 256
+DB_REPLICA_PATH = os.environ.get("TURSO_REPLICA_PATH")
+DB_REPLICA_SYNC_SECONDS = float(os.environ.get("TURSO_REPLICA_SYNC_SECONDS", "15"))
 
 
 def is_retryable_open_error(exc: Exception) -> bool:
@@ -40,9 +59,32 @@ def open_sync_connection():
     )
 
 
+def replica_enabled() -> bool:
+    return bool(DB_REPLICA_PATH) and os.environ["TURSO_DATABASE_URL"].startswith(
+        ("libsql://", "https://")
+    )
+
+
+def open_replica_connection():
+    libsql_connect: Any = vars(importlib.import_module("libsql"))["connect"]
+    return libsql_connect(
+        DB_REPLICA_PATH,
+        sync_url=os.environ["TURSO_DATABASE_URL"],
+        auth_token=os.environ["TURSO_AUTH_TOKEN"],
+        autocommit=True,
+        _check_same_thread=False,
+    )
+
+
+def is_read_statement(sql: str) -> bool:
+    return sql.lstrip()[:6].upper() in ("SELECT", "PRAGMA")
+
+
 def bind_params(params: object) -> object:
     if isinstance(params, datetime):
         return str(params)
+    if isinstance(params, bytearray | memoryview):
+        return bytes(params)
     if isinstance(params, tuple):
         return tuple(bind_params(value) for value in params)
     if isinstance(params, list):
@@ -52,29 +94,41 @@ def bind_params(params: object) -> object:
     return params
 
 
-@dataclass(frozen=True)
-class TursoRow:
-    values: tuple[Any, ...]
-    columns: dict[str, int]
+class TursoRow(tuple):
+    """Result row readable by position or by column name.
 
-    def __getitem__(self, key: int | str) -> Any:
-        if isinstance(key, str):
-            return self.values[self.columns[key]]
-        return self.values[key]
+    Rows are plain tuples; the column map lives on a subclass shared by
+    every row with the same columns, so rows carry no per-row dict.
+    """
 
-    def __iter__(self) -> Iterator[Any]:
-        return iter(self.values)
+    __slots__ = ()
+    columns: ClassVar[dict[str, int]] = {}
 
-    def __len__(self) -> int:
-        return len(self.values)
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self.columns[key])
+        return tuple.__getitem__(self, key)
+
+
+@lru_cache(maxsize=256)
+def row_type(columns: tuple[str, ...]) -> type[TursoRow]:
+    return type(
+        "TursoRow",
+        (TursoRow,),
+        {
+            "__slots__": (),
+            "columns": {name: index for index, name in enumerate(columns)},
+        },
+    )
 
 
 class TursoCursor:
-    def __init__(self, cursor):
+    def __init__(self, cursor, stats: QueryStats | None = None):
         self._cursor = cursor
-        self._columns = {
-            column[0]: index for index, column in enumerate(cursor.description or ())
-        }
+        self._stats = stats
+        self._row_type = row_type(
+            tuple(column[0] for column in cursor.description or ())
+        )
 
     @property
     def lastrowid(self) -> int:
@@ -88,75 +142,148 @@ class TursoCursor:
         return self
 
     async def __aexit__(self, *_: object) -> None:
-        await asyncio.to_thread(self._cursor.close)
+        await self._call(self._cursor.close)
+
+    def __aiter__(self) -> AsyncIterator[TursoRow]:
+        return self._iterate()
 
     async def fetchone(self) -> TursoRow | None:
-        row = await asyncio.to_thread(self._cursor.fetchone)
-        return self._row(row) if row is not None else None
+        row = await self._call(self._cursor.fetchone)
+        if row is None:
+            return None
+        self._count_rows(1)
+        return self._row_type(row)
+
+    async def fetchmany(self, size: int = CURSOR_FETCH_SIZE) -> list[TursoRow]:
+        rows = await self._call(lambda: self._cursor.fetchmany(size))
+        self._count_rows(len(rows))
+        return list(map(self._row_type, rows))
 
     async def fetchall(self) -> list[TursoRow]:
-        rows = await asyncio.to_thread(self._cursor.fetchall)
-        return [self._row(row) for row in rows]
+        rows = await self._call(self._cursor.fetchall)
+        self._count_rows(len(rows))
+        return list(map(self._row_type, rows))
 
-    def _row(self, row: tuple[Any, ...]) -> TursoRow:
-        return TursoRow(row, self._columns)
+    def _count_rows(self, count: int) -> None:
+        if self._stats is not None:
+            self._stats.rows += count
+
+    async def _iterate(self) -> AsyncIterator[TursoRow]:
+        while rows := await self.fetchmany():
+            for row in rows:
+                yield row
+
+    async def _call[T](self, fn: Callable[[], T]) -> T:
+        if getattr(self._cursor, "is_buffered", False):
+            return fn()
+        return await db_executor.run(fn)
 
 
 class TursoHttpCursor:
+    """Buffered result set whose rows are decoded only as they are fetched."""
+
+    is_buffered = True
+
     def __init__(
         self,
-        rows: list[tuple[Any, ...]],
+        rows: list[Any],
         columns: list[str],
         rowcount: int,
         lastrowid: int | None,
+        decode: Callable[[Any], tuple[Any, ...]] = tuple,
     ):
-        self._rows = rows
-        self._offset = 0
+        self._rows = deque(rows)
+        self._decode = decode
         self.description = [(column,) for column in columns]
         self.rowcount = rowcount
         self.lastrowid = lastrowid
 
     def fetchone(self) -> tuple[Any, ...] | None:
-        if self._offset >= len(self._rows):
+        if not self._rows:
             return None
-        row = self._rows[self._offset]
-        self._offset += 1
-        return row
+        return self._decode(self._rows.popleft())
+
+    def fetchmany(self, size: int) -> list[tuple[Any, ...]]:
+        return [
+            self._decode(self._rows.popleft())
+            for _ in range(min(size, len(self._rows)))
+        ]
 
     def fetchall(self) -> list[tuple[Any, ...]]:
-        rows = self._rows[self._offset :]
-        self._offset = len(self._rows)
-        return rows
+        return self.fetchmany(len(self._rows))
 
     def close(self) -> None:
-        return None
+        self._rows.clear()
+
+
+_http_session: aiohttp.ClientSession | None = None
+_http_session_loop: asyncio.AbstractEventLoop | None = None
+
+
+def http_session() -> aiohttp.ClientSession:
+    """Shared keep-alive session for every Hrana request on the running loop."""
+    global _http_session, _http_session_loop
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        _http_session_loop = loop
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=HTTP_CONNECTION_LIMIT,
+                keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=aiohttp.ClientTimeout(
+                total=HTTP_TOTAL_TIMEOUT_SECONDS,
+                connect=HTTP_CONNECT_TIMEOUT_SECONDS,
+                sock_read=HTTP_READ_TIMEOUT_SECONDS,
+            ),
+        )
+    return _http_session
+
+
+async def close_http_session() -> None:
+    global _http_session
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
 
 
 class TursoHttpConnection:
     needs_foreign_key_init = False
+    is_async = True
 
     def __init__(self, database_url: str, auth_token: str):
         hostname = parse.urlparse(database_url).hostname
         if not hostname:
             raise ValueError("TURSO_DATABASE_URL must include a host")
         self._endpoint = f"https://{hostname}/v2/pipeline"
-        self._headers = {
-            "Authorization": f"Bearer {auth_token}",
-            "Content-Type": "application/json",
-        }
+        self._headers = {"Authorization": f"Bearer {auth_token}"}
+        self._baton: str | None = None
+        self._stream_endpoint: str | None = None
+        self._in_transaction = False
+        self._begin_pending = False
+        self.bytes_received = 0
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._in_transaction
 
-    def execute(self, sql: str, params: object = None) -> TursoHttpCursor:
-        result = self._request([self._statement(sql, params)])[0]
-        return self._cursor(result)
+    async def execute(self, sql: str, params: object = None) -> TursoHttpCursor:
+        responses = await self._request(
+            [{"type": "execute", "stmt": self._statement(sql, params)}]
+        )
+        return self._cursor(responses[0]["result"])
 
-    def executemany(self, sql: str, params: object) -> TursoHttpCursor:
+    async def executemany(self, sql: str, params: object) -> TursoHttpCursor:
         statements = [
             self._statement(sql, batch) for batch in self._many_params(params)
         ]
         if not statements:
             return TursoHttpCursor([], [], 0, None)
 
-        results = [self._cursor(result) for result in self._request(statements)]
+        responses = await self._request(
+            [{"type": "execute", "stmt": statement} for statement in statements]
+        )
+        results = [self._cursor(response["result"]) for response in responses]
         return TursoHttpCursor(
             results[-1].fetchall(),
             [column[0] for column in results[-1].description],
@@ -164,39 +291,114 @@ class TursoHttpConnection:
             results[-1].lastrowid,
         )
 
-    def close(self) -> None:
-        return None
-
-    def _request(self, statements: list[dict[str, object]]) -> list[dict[str, Any]]:
-        body = json.dumps(
-            {
-                "requests": [
-                    {
-                        "type": "execute",
-                        "stmt": statement,
-                    }
-                    for statement in statements
-                ]
-                + [{"type": "close"}]
-            }
-        ).encode()
-        req = request.Request(
-            self._endpoint,
-            data=body,
-            headers=self._headers,
-            method="POST",
-        )
+    async def batch(
+        self, statements: list[tuple[str, object]]
+    ) -> list[TursoHttpCursor]:
+        """Run statements atomically as one Hrana batch in a single round trip."""
+        if not statements:
+            return []
+        wrap = not self._in_transaction
+        steps: list[dict[str, object]] = []
+        if wrap:
+            steps.append({"stmt": {"sql": "BEGIN"}})
+        for sql, params in statements:
+            step: dict[str, object] = {"stmt": self._statement(sql, params)}
+            if steps:
+                step["condition"] = {"type": "ok", "step": len(steps) - 1}
+            steps.append(step)
+        if wrap:
+            commit_step = len(steps)
+            steps.append(
+                {
+                    "stmt": {"sql": "COMMIT"},
+                    "condition": {"type": "ok", "step": commit_step - 1},
+                }
+            )
+            steps.append(
+                {
+                    "stmt": {"sql": "ROLLBACK"},
+                    "condition": {
+                        "type": "not",
+                        "cond": {"type": "ok", "step": commit_step},
+                    },
+                }
+            )
+
+        [response] = await self._request([{"type": "batch", "batch": {"steps": steps}}])
+        result = response["result"]
+        for step_error in result["step_errors"]:
+            if step_error is not None:
+                raise ValueError(f"Hrana: `stream error: `{step_error}``")
+        step_results = result["step_results"]
+        if wrap:
+            step_results = step_results[1 : 1 + len(statements)]
+        return [self._cursor(step_result) for step_result in step_results]
+
+    async def begin(self) -> None:
+        # BEGIN rides along with the first statement of the transaction.
+        self._in_transaction = True
+        self._begin_pending = True
+
+    async def commit(self) -> None:
+        await self._end_transaction("COMMIT")
+
+    async def rollback(self) -> None:
+        await self._end_transaction("ROLLBACK")
+
+    async def close(self) -> None:
+        if self._baton is not None:
+            with suppress(ValueError):
+                await self._end_transaction("ROLLBACK")
+
+    async def _end_transaction(self, sql: str) -> None:
+        begun = not self._begin_pending
+        self._in_transaction = False
+        self._begin_pending = False
+        if not begun:
+            return
+        try:
+            await self._request([{"type": "execute", "stmt": {"sql": sql}}])
+        finally:
+            self._baton = None
+            self._stream_endpoint = None
+
+    async def _request(self, requests: list[dict[str, object]]) -> list[dict[str, Any]]:
+        prefix = 0
+        if self._begin_pending:
+            requests = [{"type": "execute", "stmt": {"sql": "BEGIN"}}, *requests]
+            self._begin_pending = False
+            prefix = 1
+        body: dict[str, object] = {
+            "requests": requests
+            if self._in_transaction
+            else [*requests, {"type": "close"}]
+        }
+        if self._baton is not None:
+            body["baton"] = self._baton
 
         try:
-            with request.urlopen(req, timeout=HTTP_READ_TIMEOUT_SECONDS) as response:
-                payload = json.loads(response.read().decode())
-        except error.HTTPError as exc:
-            response_body = exc.read().decode("utf-8", "replace")
-            raise ValueError(
-                f"Hrana: `api error: `status={exc.code} {exc.reason}, body={response_body}``"
-            ) from exc
-        except error.URLError as exc:
-            raise ValueError(f"Hrana: `http error: `{exc.reason}``") from exc
+            raw = await self._post(body)
+        except aiohttp.ServerDisconnectedError as exc:
+            # A pooled keep-alive socket the server had already closed. Outside
+            # a stream the request carries no server state, so send it again
+            # on a fresh socket; inside one the baton may be gone.
+            if self._baton is not None:
+                raise ValueError(
+                    f"Hrana: `http error: `{HRANA_CLOSED_MESSAGE}``"
+                ) from exc
+            try:
+                raw = await self._post(body)
+            except aiohttp.ServerDisconnectedError as retry_exc:
+                raise ValueError(
+                    f"Hrana: `http error: `{HRANA_CLOSED_MESSAGE}``"
+                ) from retry_exc
+        self.bytes_received += len(raw)
+        payload = json.loads(raw)
+
+        if self._in_transaction:
+            self._baton = payload.get("baton")
+            if base_url := payload.get("base_url"):
+                self._stream_endpoint = f"{base_url.rstrip('/')}/v2/pipeline"
 
         responses = []
         for result in payload["results"]:
@@ -205,10 +407,29 @@ class TursoHttpConnection:
             response = result["response"]
             if response["type"] == "close":
                 continue
-            if response["type"] != "execute":
+            if response["type"] not in ("execute", "batch"):
                 raise ValueError(f"Hrana: `stream error: `{response}``")
-            responses.append(response["result"])
-        return responses
+            responses.append(response)
+        return responses[prefix:]
+
+    async def _post(self, body: dict[str, object]) -> bytes:
+        """POST one pipeline body; a dropped keep-alive socket is left to the caller."""
+        try:
+            async with http_session().post(
+                self._stream_endpoint or self._endpoint,
+                json=body,
+                headers=self._headers,
+            ) as response:
+                if response.status >= 400:
+                    response_body = await response.text(errors="replace")
+                    raise ValueError(
+                        f"Hrana: `api error: `status={response.status} {response.reason}, body={response_body}``"
+                    )
+                return await response.read()
+        except aiohttp.ServerDisconnectedError:
+            raise
+        except (aiohttp.ClientError, TimeoutError) as exc:
+            raise ValueError(f"Hrana: `http error: `{exc}``") from exc
 
     def _statement(self, sql: str, params: object = None) -> dict[str, object]:
         statement: dict[str, object] = {"sql": sql}
@@ -232,17 +453,18 @@ class TursoHttpConnection:
 
     def _cursor(self, result: dict[str, Any]) -> TursoHttpCursor:
         columns = [column["name"] for column in result["cols"]]
-        rows = [
-            tuple(self._result_value(value) for value in row) for row in result["rows"]
-        ]
         lastrowid = result["last_insert_rowid"]
         return TursoHttpCursor(
-            rows,
+            result["rows"],
             columns,
             result["affected_row_count"],
             int(lastrowid) if lastrowid is not None else None,
+            self._decode_row,
         )
 
+    def _decode_row(self, row: list[dict[str, Any]]) -> tuple[Any, ...]:
+        return tuple(map(self._result_value, row))
+
     def _value(self, value: object) -> dict[str, object]:
         if value is None:
             return {"type": "null"}
@@ -254,6 +476,8 @@ class TursoHttpConnection:
             return {"type": "float", "value": value}
         if isinstance(value, str):
             return {"type": "text", "value": value}
+        if isinstance(value, bytes | bytearray | memoryview):
+            return {"type": "blob", "base64": base64.b64encode(value).decode()}
         raise TypeError(f"Unsupported Turso value: {type(value).__name__}")
 
     def _result_value(self, value: dict[str, Any]) -> object:
@@ -266,6 +490,9 @@ class TursoHttpConnection:
             return float(value["value"])
         if kind == "text":
             return value["value"]
+        if kind == "blob":
+            encoded = value["base64"]
+            return base64.b64decode(encoded + "=" * (-len(encoded) % 4))
         raise ValueError(f"Unsupported Hrana value type: {kind}")
 
 
@@ -296,32 +523,93 @@ class TursoOperation:
             await self._cursor.__aexit__()
 
     async def _execute(self) -> TursoCursor:
-        if self._many:
-            cursor = await asyncio.to_thread(
-                self._connection.executemany,
-                self._sql,
-                bind_params(self._params or []),
+        started = time.perf_counter()
+        bytes_before = getattr(self._connection, "bytes_received", 0)
+        wait_seconds = 0.0
+        try:
+            if getattr(self._connection, "is_async", False):
+                if self._many:
+                    cursor = await self._connection.executemany(
+                        self._sql, bind_params(self._params or [])
+                    )
+                else:
+                    cursor = await self._connection.execute(
+                        self._sql, bind_params(self._params)
+                    )
+            elif self._many:
+                cursor, wait_seconds = await db_executor.run_timed(
+                    self._connection.executemany,
+                    self._sql,
+                    bind_params(self._params or []),
+                )
+            elif self._params is None:
+                cursor, wait_seconds = await db_executor.run_timed(
+                    self._connection.execute, self._sql
+                )
+            else:
+                cursor, wait_seconds = await db_executor.run_timed(
+                    self._connection.execute,
+                    self._sql,
+                    bind_params(self._params),
+                )
+        except Exception:
+            record_query(self._sql, seconds=time.perf_counter() - started, failed=True)
+            raise
+        stats = record_query(
+            self._sql,
+            seconds=time.perf_counter() - started,
+            wait_seconds=wait_seconds,
+            bytes_received=getattr(self._connection, "bytes_received", 0)
+            - bytes_before,
+        )
+        return TursoCursor(cursor, stats)
+
+
+def run_sync_batch(
+    connection, statements: list[tuple[str, object]]
+) -> list[TursoHttpCursor]:
+    """Run statements atomically on a blocking libsql connection."""
+    owns_transaction = not getattr(connection, "in_transaction", False)
+    if owns_transaction:
+        connection.execute("BEGIN")
+    cursors = []
+    try:
+        for sql, params in statements:
+            cursor = (
+                connection.execute(sql)
+                if params is None
+                else connection.execute(sql, params)
             )
-        elif self._params is None:
-            cursor = await asyncio.to_thread(self._connection.execute, self._sql)
-        else:
-            cursor = await asyncio.to_thread(
-                self._connection.execute,
-                self._sql,
-                bind_params(self._params),
+            # libsql cursors step lazily; buffer each result before the next statement.
+            cursors.append(
+                TursoHttpCursor(
+                    cursor.fetchall() if cursor.description else [],
+                    [column[0] for column in cursor.description or ()],
+                    cursor.rowcount,
+                    cursor.lastrowid,
+                )
             )
-        return TursoCursor(cursor)
+    except Exception:
+        if owns_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    if owns_transaction:
+        connection.execute("COMMIT")
+    return cursors
 
 
 class TursoConnection:
     def __init__(self, connection):
         self._connection = connection
+        # Set when a statement may have written, so the read replica can resync.
+        self.dirty = False
 
     def execute(
         self,
         sql: str,
         params: object = None,
     ) -> TursoOperation:
+        self.dirty = self.dirty or not is_read_statement(sql)
         return TursoOperation(self._connection, sql, params, many=False)
 
     def executemany(
@@ -329,10 +617,72 @@ class TursoConnection:
         sql: str,
         params: object,
     ) -> TursoOperation:
+        self.dirty = True
         return TursoOperation(self._connection, sql, params, many=True)
 
+    async def batch(
+        self,
+        statements: Sequence[tuple[str, object]],
+    ) -> list[TursoCursor]:
+        """Run `(sql, params)` pairs atomically in one round trip."""
+        bound = [(sql, bind_params(params)) for sql, params in statements]
+        self.dirty = self.dirty or not all(is_read_statement(sql) for sql, _ in bound)
+        # One stats entry per distinct statement mix, however many rows it carries.
+        label = "BATCH " + "; ".join(dict.fromkeys(sql for sql, _ in bound))
+        started = time.perf_counter()
+        bytes_before = getattr(self._connection, "bytes_received", 0)
+        wait_seconds = 0.0
+        try:
+            if getattr(self._connection, "is_async", False):
+                cursors = await self._connection.batch(bound)
+            else:
+                cursors, wait_seconds = await db_executor.run_timed(
+                    run_sync_batch, self._connection, bound
+                )
+        except Exception:
+            record_query(label, seconds=time.perf_counter() - started, failed=True)
+            raise
+        stats = record_query(
+            label,
+            seconds=time.perf_counter() - started,
+            wait_seconds=wait_seconds,
+            bytes_received=getattr(self._connection, "bytes_received", 0)
+            - bytes_before,
+        )
+        return [TursoCursor(cursor, stats) for cursor in cursors]
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncGenerator[Self]:
+        if getattr(self._connection, "is_async", False):
+            await self._connection.begin()
+        else:
+            await db_executor.run(self._connection.execute, "BEGIN")
+        try:
+            yield self
+        except BaseException:
+            await self._end_transaction("ROLLBACK")
+            raise
+        await self._end_transaction("COMMIT")
+
+    async def _end_transaction(self, sql: str) -> None:
+        if getattr(self._connection, "is_async", False):
+            await (
+                self._connection.commit()
+                if sql == "COMMIT"
+                else self._connection.rollback()
+            )
+            return
+        await db_executor.run(self._connection.execute, sql)
+
+    @property
+    def in_transaction(self) -> bool:
+        return bool(getattr(self._connection, "in_transaction", False))
+
     async def close(self) -> None:
-        await asyncio.to_thread(self._connection.close)
+        if getattr(self._connection, "is_async", False):
+            await self._connection.close()
+            return
+        await db_executor.run(self._connection.close)
 
 
 async def _open_connection() -> TursoConnection:
@@ -358,21 +708,259 @@ async def _open_connection() -> TursoConnection:
     raise RuntimeError("Turso connection initialization failed")
 
 
+@dataclass
+class IdleConnection:
+    connection: TursoConnection
+    last_used: float
+
+
+class ConnectionPool:
+    """Bounded set of long-lived connections shared by `get_db` callers."""
+
+    def __init__(
+        self,
+        *,
+        size: int,
+        idle_seconds: float,
+        health_check_seconds: float,
+    ):
+        self._idle: list[IdleConnection] = []
+        self._slots = asyncio.Semaphore(size)
+        self._idle_seconds = idle_seconds
+        self._health_check_seconds = health_check_seconds
+        self._loop = asyncio.get_running_loop()
+        self._reaper: asyncio.Task[None] | None = None
+        self._closed = False
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    async def acquire(self) -> TursoConnection:
+        await self._slots.acquire()
+        try:
+            self._start_reaper()
+            while self._idle:
+                idle = self._idle.pop()
+                if await self._is_healthy(idle):
+                    return idle.connection
+                await self._discard(idle.connection)
+            return await _open_connection()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, connection: TursoConnection, *, reusable: bool) -> None:
+        try:
+            if reusable and not self._closed and not connection.in_transaction:
+                self._idle.append(IdleConnection(connection, time.monotonic()))
+            else:
+                await self._discard(connection)
+        finally:
+            self._slots.release()
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reaper:
+            # A pool left behind by a finished loop cannot wait on its reaper.
+            with suppress(RuntimeError):
+                self._reaper.cancel()
+            if self._loop is asyncio.get_running_loop():
+                with suppress(asyncio.CancelledError):
+                    await self._reaper
+        idle, self._idle = self._idle, []
+        for item in idle:
+            await self._discard(item.connection)
+
+    async def reap_idle(self) -> None:
+        cutoff = time.monotonic() - self._idle_seconds
+        expired = [item for item in self._idle if item.last_used < cutoff]
+        self._idle = [item for item in self._idle if item.last_used >= cutoff]
+        for item in expired:
+            await self._discard(item.connection)
+
+    async def _is_healthy(self, idle: IdleConnection) -> bool:
+        idle_for = time.monotonic() - idle.last_used
+        if idle_for >= self._idle_seconds:
+            return False
+        if idle_for < self._health_check_seconds:
+            return True
+        try:
+            await idle.connection.execute("SELECT 1;")
+        except Exception as exc:  # noqa: BLE001
+            logger.info("Dropping stale pooled Turso connection: %s", exc)
+            return False
+        return True
+
+    async def _discard(self, connection: TursoConnection) -> None:
+        with suppress(Exception):
+            await connection.close()
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None or self._reaper.done():
+            self._reaper = self._loop.create_task(self._reap_periodically())
+
+    async def _reap_periodically(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self._idle_seconds)
+            await self.reap_idle()
+
+
+class ReadReplica:
+    """Embedded libsql copy of the primary for read-mostly lookups.
+
+    The replica syncs every `sync_seconds`, and sooner after any `get_db` block
+    that wrote. Reads share one local connection, serialized by `lock`.
+    """
+
+    def __init__(self, *, sync_seconds: float):
+        self.lock = asyncio.Lock()
+        self._sync_seconds = sync_seconds
+        self._wake = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._raw: Any = None
+        self._connection: TursoConnection | None = None
+        self._syncer: asyncio.Task[None] | None = None
+        self._closed = False
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    async def connection(self) -> TursoConnection:
+        """Open and sync the replica on first use. Call with `lock` held."""
+        if self._connection is None:
+            self._raw = await db_executor.run(open_replica_connection)
+            await db_executor.run(self._raw.sync)
+            self._connection = TursoConnection(self._raw)
+        if self._syncer is None or self._syncer.done():
+            self._syncer = self._loop.create_task(self._sync_periodically())
+        return self._connection
+
+    async def sync(self) -> None:
+        async with self.lock:
+            if self._connection is not None:
+                await db_executor.run(self._raw.sync)
+
+    def request_sync(self) -> None:
+        self._wake.set()
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._syncer:
+            self._syncer.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._syncer
+        async with self.lock:
+            if self._connection is not None:
+                with suppress(Exception):
+                    await self._connection.close()
+                self._connection = self._raw = None
+
+    async def _sync_periodically(self) -> None:
+        while not self._closed:
+            with suppress(TimeoutError):
+                async with asyncio.timeout(self._sync_seconds):
+                    await self._wake.wait()
+            self._wake.clear()
+            try:
+                await self.sync()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Turso replica sync failed: %s", exc)
+
+
+_pool: ConnectionPool | None = None
+_replica: ReadReplica | None = None
+# The connection the current task holds, so nested `get_db` calls reuse it
+# instead of waiting on a pool the task may have exhausted itself.
+_held_connection: ContextVar[tuple[asyncio.Task[Any], TursoConnection] | None] = (
+    ContextVar("held_connection", default=None)
+)
+
+
+async def _connection_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None or _pool.loop is not asyncio.get_running_loop():
+        previous, _pool = (
+            _pool,
+            ConnectionPool(
+                size=DB_POOL_SIZE,
+                idle_seconds=DB_POOL_IDLE_SECONDS,
+                health_check_seconds=DB_POOL_HEALTH_CHECK_SECONDS,
+            ),
+        )
+        if previous is not None:
+            await previous.close()
+    return _pool
+
+
+def _read_replica() -> ReadReplica:
+    global _replica
+    if _replica is None or _replica.loop is not asyncio.get_running_loop():
+        _replica = ReadReplica(sync_seconds=DB_REPLICA_SYNC_SECONDS)
+    return _replica
+
+
 async def init_db() -> None:
     async with _init_lock:
         async with get_db() as conn:
             await conn.execute("SELECT 1;")
-        logger.info("Turso connection initialized")
+        logger.info("Turso connection pool initialized (size=%d)", DB_POOL_SIZE)
+        if replica_enabled():
+            async with get_read_db():
+                pass
+            logger.info("Turso read replica synced to %s", DB_REPLICA_PATH)
 
 
 async def close_db() -> None:
+    global _pool, _replica
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+    if _replica is not None:
+        await _replica.close()
+        _replica = None
+    await close_http_session()
     logger.info("Turso connection closed")
 
 
 @asynccontextmanager
 async def get_db() -> AsyncGenerator[TursoConnection]:
-    conn = await _open_connection()
+    task = asyncio.current_task()
+    held = _held_connection.get()
+    # Child tasks inherit the context, so only the holding task may reuse it.
+    if task is not None and held is not None and held[0] is task:
+        yield held[1]
+        return
+
+    pool = await _connection_pool()
+    conn = await pool.acquire()
+    token = _held_connection.set((task, conn)) if task is not None else None
+    reusable = False
     try:
         yield conn
+        reusable = True
     finally:
-        await conn.close()
+        if token is not None:
+            _held_connection.reset(token)
+        if conn.dirty:
+            conn.dirty = False
+            if _replica is not None:
+                _replica.request_sync()
+        await pool.release(conn, reusable=reusable)
+
+
+@asynccontextmanager
+async def get_read_db() -> AsyncGenerator[TursoConnection]:
+    """Connection for read-mostly lookups that tolerate a few seconds of lag.
+
+    Served from the local replica when `TURSO_REPLICA_PATH` is set, otherwise
+    the same as `get_db`. Never write through it.
+    """
+    if not replica_enabled():
+        async with get_db() as conn:
+            yield conn
+        return
+    replica = _read_replica()
+    async with replica.lock:
+        yield await replica.connection()
@@ -0,0 +1,112 @@
+"""Named thread pools so blocking work of one kind cannot starve another."""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+
+@dataclass
+class ExecutorStats:
+    submitted: int = 0
+    completed: int = 0
+    queued: int = 0
+    running: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+
+class NamedExecutor:
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._stats = ExecutorStats()
+
+    async def run[T](self, fn: Callable[..., T], *args: object) -> T:
+        """Run `fn(*args)` on this pool, like `asyncio.to_thread`."""
+        result, _ = await self.run_timed(fn, *args)
+        return result
+
+    async def run_timed[T](
+        self, fn: Callable[..., T], *args: object
+    ) -> tuple[T, float]:
+        """Like `run`, also returning how long the call queued for a thread."""
+        loop = asyncio.get_running_loop()
+        call = partial(contextvars.copy_context().run, fn, *args)
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._stats.submitted += 1
+            self._stats.queued += 1
+
+        def timed() -> tuple[T, float]:
+            wait_seconds = time.perf_counter() - submitted_at
+            with self._lock:
+                self._stats.queued -= 1
+                self._stats.running += 1
+                self._stats.wait_seconds_total += wait_seconds
+                self._stats.wait_seconds_max = max(
+                    self._stats.wait_seconds_max, wait_seconds
+                )
+            try:
+                return call(), wait_seconds
+            finally:
+                with self._lock:
+                    self._stats.running -= 1
+                    self._stats.completed += 1
+
+        return await loop.run_in_executor(self._pool(), timed)
+
+    def metrics(self) -> dict[str, object]:
+        with self._lock:
+            stats = ExecutorStats(**vars(self._stats))
+        started = stats.submitted - stats.queued
+        return {
+            "workers": self.max_workers,
+            "queued": stats.queued,
+            "running": stats.running,
+            "submitted": stats.submitted,
+            "completed": stats.completed,
+            "wait_ms_avg": round(stats.wait_seconds_total / started * 1000, 2)
+            if started
+            else 0.0,
+            "wait_ms_max": round(stats.wait_seconds_max * 1000, 2),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=f"{self.name}-executor",
+            )
+        return self._executor
+
+
+db_executor = NamedExecutor("db", int(os.environ.get("DB_EXECUTOR_WORKERS", "12")))
+media_executor = NamedExecutor(
+    "media", int(os.environ.get("MEDIA_EXECUTOR_WORKERS", "2"))
+)
+network_executor = NamedExecutor(
+    "network", int(os.environ.get("NETWORK_EXECUTOR_WORKERS", "8"))
+)
+EXECUTORS = (db_executor, media_executor, network_executor)
+
+
+def executor_metrics() -> dict[str, dict[str, object]]:
+    return {executor.name: executor.metrics() for executor in EXECUTORS}
+
+
+def shutdown_executors() -> None:
+    for executor in EXECUTORS:
+        executor.shutdown()
@@ -0,0 +1,107 @@
+"""Per-statement latency and volume stats, keyed by normalized SQL."""
+
+import math
+import os
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from config.logger import logger
+
+QUERY_SAMPLE_SIZE = 512
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "250"))
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """Collapse literals and placeholder lists so equivalent statements group."""
+    text = _WHITESPACE.sub(" ", sql).strip().rstrip(";").rstrip()
+    text = _LITERAL.sub("?", text)
+    return _PLACEHOLDER_LIST.sub("(?, ...)", text)
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[max(math.ceil(fraction * len(samples)) - 1, 0)]
+
+
+@dataclass
+class QueryStats:
+    calls: int = 0
+    errors: int = 0
+    rows: int = 0
+    bytes_received: int = 0
+    total_seconds: float = 0.0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    samples: deque[float] = field(
+        default_factory=lambda: deque(maxlen=QUERY_SAMPLE_SIZE)
+    )
+
+    def summary(self) -> dict[str, object]:
+        samples = sorted(self.samples)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "bytes_received": self.bytes_received,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+            "wait_ms_avg": round(self.wait_seconds / self.calls * 1000, 2)
+            if self.calls
+            else 0.0,
+            "wait_ms_max": round(self.max_wait_seconds * 1000, 2),
+        }
+
+
+_registry: dict[str, QueryStats] = {}
+
+
+def record_query(
+    sql: str,
+    *,
+    seconds: float,
+    wait_seconds: float = 0.0,
+    bytes_received: int = 0,
+    failed: bool = False,
+) -> QueryStats:
+    """Record one statement; rows are added by the cursor as they are fetched."""
+    key = fingerprint(sql)
+    stats = _registry.get(key)
+    if stats is None:
+        stats = _registry[key] = QueryStats()
+    stats.calls += 1
+    stats.errors += failed
+    stats.bytes_received += bytes_received
+    stats.total_seconds += seconds
+    stats.wait_seconds += wait_seconds
+    stats.max_wait_seconds = max(stats.max_wait_seconds, wait_seconds)
+    stats.samples.append(seconds)
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query %.0f ms (executor wait %.0f ms): %s",
+            seconds * 1000,
+            wait_seconds * 1000,
+            key,
+        )
+    return stats
+
+
+def query_stats_snapshot(limit: int | None = None) -> list[dict[str, object]]:
+    """Statements ordered by total time spent, slowest first."""
+    ranked = sorted(
+        _registry.items(), key=lambda item: item[1].total_seconds, reverse=True
+    )
+    return [{"fingerprint": key, **stats.summary()} for key, stats in ranked[:limit]]
+
+
+def reset_query_stats() -> None:
+    _registry.clear()
@@ -14,6 +14,7 @@ from telegram.ext import (
     CallbackQueryHandler,
     ContextTypes,
     MessageHandler,
+    TypeHandler,
     filters,
 )
 
@@ -29,18 +30,20 @@ from config.db import (
     close_db,
     init_db,
 )
+from config.executors import shutdown_executors
 from config.logger import logger
 from config.options import config
+from management.botstats import save_query_stats
 from management.chat_memory_build import build_chat_memories
 from management.chat_search_cache import sync_search_cache
-from management.chat_search_index import (
-    index_pending_utterances,
-    index_pending_windows,
-    searchable_chat_ids,
-)
+from management.chat_search_feed import search_index_feed
+from management.ingestion import ingestion_buffer
 from management.message_tracking import mention_handler, message_stats_handler
 from utils import command_limits
+from utils.concurrency import background_tasks
 from utils.decorators import get_command_meta
+from utils.update_context import bind_update_context
+from utils.update_processor import ChatFairUpdateProcessor
 
 
 async def post_init(application: Application) -> None:
@@ -80,14 +83,16 @@ async def post_shutdown(application: Application) -> None:
     """
     logger.info(f"Shutting down @{application.bot.username} (ID: {application.bot.id})")
     await close_ai_provider()
+    await background_tasks.drain(timeout=10)
+    await ingestion_buffer.close()
+    await save_query_stats()
     await close_db()
+    shutdown_executors()
     logger.info("Cleanup finished.")
 
 
 async def worker_chat_search_index(_: ContextTypes.DEFAULT_TYPE) -> None:
-    chat_ids = await searchable_chat_ids()
-    windows = await index_pending_windows(chat_ids=chat_ids)
-    utterances = await index_pending_utterances(chat_ids=chat_ids)
+    windows, utterances = await search_index_feed.run()
     if windows or utterances:
         logger.info(
             "Indexed %d chat search windows and %d utterances",
@@ -100,6 +105,10 @@ async def worker_chat_memory_build(_: ContextTypes.DEFAULT_TYPE) -> None:
     await build_chat_memories()
 
 
+async def worker_query_stats(_: ContextTypes.DEFAULT_TYPE) -> None:
+    await save_query_stats()
+
+
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Log the error and send a telegram message to notify the developer."""
     if isinstance(context.error, NetworkError) and "ConnectError" in str(context.error):
@@ -136,19 +145,11 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
         )
 
 
-def main():
-    application = (
-        ApplicationBuilder()
-        .token(config.TELEGRAM.TOKEN)
-        .rate_limiter(AIORateLimiter(max_retries=10))
-        .concurrent_updates(True)
-        .post_init(post_init)
-        .post_shutdown(post_shutdown)
-        .build()
-    )
+def register_handlers(application: Application) -> None:
     application.add_error_handler(error_handler)
     application.add_handlers(
         handlers={
+            -1: [TypeHandler(Update, bind_update_context)],
             0: [
                 MessageHandler(
                     filters.TEXT & ~filters.COMMAND,
@@ -172,6 +173,19 @@ def main():
             ],
         }
     )
+
+
+def main():
+    application = (
+        ApplicationBuilder()
+        .token(config.TELEGRAM.TOKEN)
+        .rate_limiter(AIORateLimiter(max_retries=10))
+        .concurrent_updates(ChatFairUpdateProcessor())
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    register_handlers(application)
     job_queue = application.job_queue
     if job_queue is None:
         raise RuntimeError(
@@ -208,7 +222,7 @@ def main():
     if search_index_enabled:
         job_queue.run_repeating(
             worker_chat_search_index,
-            interval=900,
+            interval=60,
             first=30,
             name="worker_chat_search_index",
             job_kwargs={"max_instances": 1, "coalesce": True},
@@ -219,6 +233,13 @@ def main():
         name="worker_chat_memory_build",
         job_kwargs={"max_instances": 1, "coalesce": True},
     )
+    job_queue.run_repeating(
+        worker_query_stats,
+        interval=300,
+        first=300,
+        name="worker_query_stats",
+        job_kwargs={"max_instances": 1, "coalesce": True},
+    )
     job_queue.run_daily(command_limits.reset_command_limits, time=datetime.time(18, 30))
     if config.TELEGRAM.UPDATER == "polling":
         logger.info("Using polling...")
@@ -1,10 +1,21 @@
+import html
+
 from telegram import Update
 from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
 
+from chat_search_lag import search_index_lag
 from config.db import get_db
+from config.executors import executor_metrics
+from config.query_stats import query_stats_snapshot
+from management.chat_search_cache import embedding_cache_metrics
+from management.ingestion import ingestion_buffer
+from openrouter_embeddings import batch_sizer
+from utils.admin import is_admin
+from utils.concurrency import background_tasks
 from utils.decorators import command
 from utils.messages import get_message
+from utils.update_processor import ChatFairUpdateProcessor
 
 
 async def _fetch_scalar(query: str) -> int:
@@ -13,6 +24,11 @@ async def _fetch_scalar(query: str) -> int:
     return result[0] if result and result[0] else 0
 
 
+async def _fetch_rows(query: str, params: tuple[object, ...]):
+    async with get_db() as conn, conn.execute(query, params) as cursor:
+        return await cursor.fetchall()
+
+
 async def _reply_ranked_stats(
     message,
     context: ContextTypes.DEFAULT_TYPE,
@@ -94,3 +110,166 @@ async def get_command_stats(update: Update, context: ContextTypes.DEFAULT_TYPE)
         [f"<code>{row['command_count']:4} - /{row['command']}</code>" for row in rows],
         total_count,
     )
+
+
+QUERY_STATS_COLUMNS = (
+    "fingerprint",
+    "calls",
+    "errors",
+    "rows",
+    "bytes_received",
+    "total_ms",
+    "p50_ms",
+    "p95_ms",
+    "p99_ms",
+    "wait_ms_avg",
+    "wait_ms_max",
+)
+
+
+async def save_query_stats() -> None:
+    """Persist this process's query stats so `command_usage.py` can read them."""
+    snapshot = query_stats_snapshot()
+    if not snapshot:
+        return
+    columns = ", ".join(QUERY_STATS_COLUMNS)
+    placeholders = ", ".join("?" for _ in QUERY_STATS_COLUMNS)
+    async with get_db() as conn:
+        await conn.executemany(
+            f"""
+            INSERT OR REPLACE INTO query_stats ({columns}, update_time)
+            VALUES ({placeholders}, CURRENT_TIMESTAMP)
+            """,
+            [tuple(row[column] for column in QUERY_STATS_COLUMNS) for row in snapshot],
+        )
+
+
+@command(
+    triggers=["executors"],
+    usage="/executors",
+    example="/executors",
+    description="Show queue depth of the blocking work pools and background tasks.",
+)
+async def get_executor_stats(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    message = get_message(update)
+    if not message:
+        return
+    if not update.effective_user or not is_admin(update.effective_user.id):
+        await message.reply_text("❌ This command is only available to admins")
+        return
+    lines = [
+        f"<code>{name:8} {stats['running']}/{stats['workers']} running, "
+        f"{stats['queued']} queued, wait avg {stats['wait_ms_avg']}ms "
+        f"max {stats['wait_ms_max']}ms</code>"
+        for name, stats in executor_metrics().items()
+    ]
+    lines += [
+        f"<code>{label:16} {stats['running']} running, {stats['queued']} queued, "
+        f"{stats['dropped']} dropped, {stats['failed']} failed</code>"
+        for label, stats in background_tasks.metrics().items()
+    ]
+    processor = context.application.update_processor
+    if isinstance(processor, ChatFairUpdateProcessor):
+        stats = processor.metrics()
+        lines.append(
+            f"<code>updates          {stats['running']}/{processor.max_running} "
+            f"running, {stats['pending']} pending in {stats['chats']} chats</code>"
+        )
+        depths = sorted(
+            processor.queue_depths().items(), key=lambda item: item[1], reverse=True
+        )
+        lines += [
+            f"<code>  chat {chat_id}: {depth} pending</code>"
+            for chat_id, depth in depths[:5]
+        ]
+    ingestion = ingestion_buffer.metrics()
+    lines.append(
+        f"<code>ingestion        {ingestion['buffered']} buffered, "
+        f"{ingestion['failures']} failed flushes, {ingestion['dropped']} dropped, "
+        f"{ingestion['rejected']} rejected</code>"
+    )
+    embeddings = embedding_cache_metrics()
+    lines.append(
+        f"<code>embedding cache  {embeddings['hits']} hits, "
+        f"{embeddings['misses']} misses, {embeddings['evicted']} evicted</code>"
+    )
+    lines.append(
+        f"<code>embedding batch  {batch_sizer.budget} tokens, "
+        f"{batch_sizer.requests} requests, {batch_sizer.failures} failed</code>"
+    )
+    await message.reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
+
+
+@command(
+    triggers=["querystats"],
+    usage="/querystats",
+    example="/querystats",
+    description="Show the database statements that took the most time.",
+)
+async def get_query_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    message = get_message(update)
+    if not message:
+        return
+    if not update.effective_user or not is_admin(update.effective_user.id):
+        await message.reply_text("❌ This command is only available to admins")
+        return
+    snapshot = query_stats_snapshot(limit=10)
+    if not snapshot:
+        await message.reply_text("No queries recorded yet.")
+        return
+    lines = [
+        f"<b>{row['total_ms']:.0f}ms</b> over {row['calls']} calls, "
+        f"p50 {row['p50_ms']}ms p95 {row['p95_ms']}ms p99 {row['p99_ms']}ms, "
+        f"{row['rows']} rows, wait avg {row['wait_ms_avg']}ms\n"
+        f"<code>{html.escape(str(row['fingerprint'])[:200])}</code>"
+        for row in snapshot
+    ]
+    await message.reply_text("\n\n".join(lines), parse_mode=ParseMode.HTML)
+
+
+def _format_lag(seconds: int | None) -> str:
+    if seconds is None:
+        return "never indexed"
+    if seconds < 3600:
+        return f"{max(0, seconds) // 60}m behind"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m behind"
+
+
+@command(
+    triggers=["searchlag"],
+    usage="/searchlag",
+    example="/searchlag",
+    description="Show how far the semantic search index trails each chat.",
+)
+async def get_search_lag(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    message = get_message(update)
+    if not message:
+        return
+    if not update.effective_user or not is_admin(update.effective_user.id):
+        await message.reply_text("❌ This command is only available to admins")
+        return
+    report = await search_index_lag(_fetch_rows)
+    indexer = report["indexer"]
+    cache = report["cache"]
+    indexer_line = (
+        f"<b>Indexer:</b> {indexer['feed_backlog_rows']} rows past the checkpoint, "
+        f"last run {indexer['last_run_ms'] or 0}ms stored "
+        f"{indexer['last_run_windows'] or 0} windows and "
+        f"{indexer['last_run_utterances'] or 0} utterances"
+    )
+    cache_line = (
+        f"<b>Local cache:</b> {cache['windows_behind']} windows and "
+        f"{cache['utterances_behind']} utterances behind"
+        if cache["windows_behind"] is not None
+        else "<b>Local cache:</b> not created yet"
+    )
+    lines = [indexer_line, cache_line, ""]
+    lines += [
+        f"<code>{chat['chat_id']}: windows {chat['windows']['backlog_messages']} "
+        f"msgs, {_format_lag(chat['windows']['lag_seconds'])}; utterances "
+        f"{chat['utterances']['backlog_messages']} msgs</code>"
+        for chat in report["chats"][:10]
+    ]
+    await message.reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
@@ -1,94 +1,165 @@
-from datetime import UTC, datetime
+import os
+from collections import OrderedDict
+from datetime import UTC, datetime, timedelta
+from functools import partial
 
 import ijson
 from telegram import Message, MessageEntity
 
 from config.db import get_db
-from utils.string import get_user_id_from_username
+from management.ingestion import ingestion_buffer
+from utils.chat_settings import (
+    ChatSettings,
+    get_chat_settings,
+    invalidate_chat_settings,
+)
 
 type ChatImportRow = tuple[int, str, int, str, str, int | None]
 
+USER_STATS_LAST_SEEN_GRANULARITY = timedelta(
+    seconds=float(os.environ.get("USER_STATS_LAST_SEEN_SECONDS", "900"))
+)
+USER_STATS_WRITTEN_SIZE = 10_000
+
+# user_id -> (username, first_name, last_seen) as last queued for user_stats.
+_user_stats_written: OrderedDict[int, tuple[str, str, datetime]] = OrderedDict()
+
+
+USER_STATS_UPSERT = """
+INSERT INTO user_stats (
+    user_id, username, first_name, last_seen, last_message_link
+)
+    VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(user_id) DO UPDATE SET
+    username = excluded.username,
+    first_name = excluded.first_name,
+    last_seen = excluded.last_seen,
+    last_message_link = excluded.last_message_link
+"""
+
+CHAT_STATS_INSERT = """
+INSERT OR IGNORE INTO chat_stats (
+    chat_id, user_id, message_id, message_text,
+    reply_to_message_id, reply_to_user_id
+)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def user_stats_changed(
+    user_id: int, username: str, first_name: str, now: datetime
+) -> bool:
+    """Whether this user's row needs a write.
+
+    Only a new username or first name, or a `last_seen` older than the
+    granularity, is worth an upsert.
+    """
+    previous = _user_stats_written.get(user_id)
+    if previous is None:
+        return True
+    _user_stats_written.move_to_end(user_id)
+    previous_username, previous_first_name, last_seen = previous
+    return (
+        previous_username != username
+        or previous_first_name != first_name
+        or now - last_seen >= USER_STATS_LAST_SEEN_GRANULARITY
+    )
+
+
+def remember_user_stats(
+    user_id: int, username: str, first_name: str, now: datetime
+) -> None:
+    """Record a user row once it has been written."""
+    _user_stats_written[user_id] = (username, first_name, now)
+    _user_stats_written.move_to_end(user_id)
+    if len(_user_stats_written) > USER_STATS_WRITTEN_SIZE:
+        _user_stats_written.popitem(last=False)
+
 
-async def save_message_stats(message: Message) -> None:
+async def save_message_stats(
+    message: Message, chat_settings: ChatSettings | None = None
+) -> None:
+    """Queue the message's stats rows for the next ingestion flush."""
     if not message.from_user:
         return
 
     user = message.from_user
     chat_id = message.chat_id
 
-    async with get_db() as conn:
-        if user.username:
-            await conn.execute(
-                """
-                INSERT INTO user_stats (
-                    user_id, username, first_name, last_seen, last_message_link
-                )
-                    VALUES (?, ?, ?, ?, ?)
-                ON CONFLICT(user_id) DO UPDATE SET
-                    username = excluded.username,
-                    first_name = excluded.first_name,
-                    last_seen = excluded.last_seen,
-                    last_message_link = excluded.last_message_link
-                """,
+    if user.username:
+        now = datetime.now(UTC).replace(tzinfo=None)
+        if user_stats_changed(user.id, user.username, user.first_name, now):
+            ingestion_buffer.add(
+                USER_STATS_UPSERT,
                 (
                     user.id,
                     user.username,
                     user.first_name,
-                    datetime.now(UTC).replace(tzinfo=None),
+                    now,
                     message.link if message.link else None,
                 ),
+                key=user.id,
+                on_flush=partial(
+                    remember_user_stats, user.id, user.username, user.first_name, now
+                ),
             )
 
-        message_text = None
-        if message.text:
-            async with conn.execute(
-                "SELECT fts FROM group_settings WHERE chat_id = ?;",
-                (chat_id,),
-            ) as cursor:
-                result = await cursor.fetchone()
-            if result and result["fts"]:
-                message_text = message.text
-
-        await conn.execute(
-            """
-            INSERT OR IGNORE INTO chat_stats (
-                chat_id, user_id, message_id, message_text,
-                reply_to_message_id, reply_to_user_id
-            )
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (
-                chat_id,
-                user.id,
-                message.message_id,
-                message_text,
-                message.reply_to_message.message_id
-                if message.reply_to_message
-                else None,
-                message.reply_to_message.from_user.id
-                if message.reply_to_message and message.reply_to_message.from_user
-                else None,
-            ),
-        )
+    # Message text is only kept for chats that opted into search.
+    fts = (chat_settings or await get_chat_settings(chat_id)).fts
+    ingestion_buffer.add(
+        CHAT_STATS_INSERT,
+        (
+            chat_id,
+            user.id,
+            message.message_id,
+            message.text if fts else None,
+            message.reply_to_message.message_id if message.reply_to_message else None,
+            message.reply_to_message.from_user.id
+            if message.reply_to_message and message.reply_to_message.from_user
+            else None,
+        ),
+    )
 
 
-async def save_mention(
+async def save_mentions(
     mentioning_user_id: int,
-    mentioned_user_id: int,
     message: Message,
+    user_ids: list[int],
+    usernames: list[str],
 ) -> None:
+    """Store every mention in one statement, resolving `@handles` inline."""
+    sources = ["SELECT ? AS mentioned_user_id" for _ in user_ids]
+    params: list[object] = [*user_ids]
+    if usernames:
+        placeholders = ", ".join("?" for _ in usernames)
+        # A handle can have moved between users; the latest to use it wins.
+        sources.append(
+            f"""
+            SELECT user_id AS mentioned_user_id
+            FROM (
+                SELECT
+                    user_id,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY LOWER(username) ORDER BY last_seen DESC
+                    ) AS handle_rank
+                FROM user_stats
+                WHERE LOWER(username) IN ({placeholders})
+            )
+            WHERE handle_rank = 1
+            """
+        )
+        params.extend(username.lower() for username in usernames)
+    if not sources:
+        return
+
     async with get_db() as conn:
         await conn.execute(
-            """
+            f"""
             INSERT INTO chat_mentions (mentioning_user_id, mentioned_user_id, chat_id, message_id)
-            VALUES (?, ?, ?, ?)
+            SELECT ?, mentioned_user_id, ?, ?
+            FROM ({" UNION ".join(sources)})
             """,
-            (
-                mentioning_user_id,
-                mentioned_user_id,
-                message.chat.id,
-                message.message_id,
-            ),
+            (mentioning_user_id, message.chat.id, message.message_id, *params),
         )
 
 
@@ -96,26 +167,19 @@ async def process_mentions(message: Message) -> None:
     if not message.from_user:
         return
 
-    mentioning_user_id = message.from_user.id
-    mentioned_users: set[int] = set()
-
-    if message.entities:
-        for entity in message.entities:
-            if entity.type == MessageEntity.TEXT_MENTION and entity.user:
-                if entity.user.id not in mentioned_users:
-                    mentioned_users.add(entity.user.id)
-                    await save_mention(mentioning_user_id, entity.user.id, message)
-            elif entity.type == MessageEntity.MENTION and message.text:
-                mentioned_username = message.parse_entity(entity).lstrip("@")
-                user_id = await get_user_id_from_username(mentioned_username)
-                if user_id is not None and user_id not in mentioned_users:
-                    mentioned_users.add(user_id)
-                    await save_mention(mentioning_user_id, user_id, message)
+    user_ids: list[int] = []
+    usernames: list[str] = []
+
+    for entity in message.entities or ():
+        if entity.type == MessageEntity.TEXT_MENTION and entity.user:
+            user_ids.append(entity.user.id)
+        elif entity.type == MessageEntity.MENTION and message.text:
+            usernames.append(message.parse_entity(entity).lstrip("@"))
 
     if message.reply_to_message and message.reply_to_message.from_user:
-        replied_user_id = message.reply_to_message.from_user.id
-        if replied_user_id not in mentioned_users:
-            await save_mention(mentioning_user_id, replied_user_id, message)
+        user_ids.append(message.reply_to_message.from_user.id)
+
+    await save_mentions(message.from_user.id, message, user_ids, usernames)
 
 
 async def chat_search(
@@ -123,17 +187,12 @@ async def chat_search(
     query: str,
     author_id: int | None,
 ) -> list:
-    async with get_db() as conn:
-        async with conn.execute(
-            "SELECT fts FROM group_settings WHERE chat_id = ?;",
-            (chat_id,),
-        ) as cursor:
-            setting = await cursor.fetchone()
-
-        if not setting or not setting["fts"]:
-            return []
+    if not (await get_chat_settings(chat_id)).fts:
+        return []
 
-        async with conn.execute(
+    async with (
+        get_db() as conn,
+        conn.execute(
             """
             SELECT cs.message_id
                 FROM chat_stats_fts csf
@@ -144,20 +203,13 @@ async def chat_search(
                 AND cs.message_text NOT LIKE '/%';
             """,
             (query, chat_id, author_id, author_id),
-        ) as cursor:
-            return list(await cursor.fetchall())
+        ) as cursor,
+    ):
+        return list(await cursor.fetchall())
 
 
 async def is_fts_enabled(chat_id: int) -> bool:
-    async with (
-        get_db() as conn,
-        conn.execute(
-            "SELECT fts FROM group_settings WHERE chat_id = ?;",
-            (chat_id,),
-        ) as cursor,
-    ):
-        setting = await cursor.fetchone()
-    return bool(setting and setting["fts"])
+    return (await get_chat_settings(chat_id)).fts
 
 
 async def enable_fts(chat_id: int) -> None:
@@ -169,6 +221,7 @@ async def enable_fts(chat_id: int) -> None:
             """,
             (chat_id,),
         )
+    invalidate_chat_settings(chat_id)
 
 
 async def chat_stats_summary(chat_id: int, *, today_only: bool) -> tuple[list, int]:
@@ -432,15 +432,18 @@ async def build_aliases(
         {member.username.casefold(): member.user_id for member in members},
     )
     async with get_db() as conn:
-        await conn.execute("DELETE FROM chat_aliases WHERE chat_id = ?", (chat_id,))
-        if aliases:
-            await conn.executemany(
-                "INSERT INTO chat_aliases VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
-                [
-                    (chat_id, item.user_id, item.alias, item.confidence)
+        await conn.batch(
+            [
+                ("DELETE FROM chat_aliases WHERE chat_id = ?", (chat_id,)),
+                *(
+                    (
+                        "INSERT INTO chat_aliases VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                        (chat_id, item.user_id, item.alias, item.confidence),
+                    )
                     for item in aliases
-                ],
-            )
+                ),
+            ]
+        )
     return aliases
 
 
@@ -480,11 +483,11 @@ async def persona_source(
                 watermark,
             ),
         ) as cursor:
-            rows = await cursor.fetchall()
+            utterances = [utterance_from_row(row) async for row in cursor]
     return (
         previous["sheet"] if previous else "",
         set(json.loads(previous["receipts"])) if previous else set(),
-        [utterance_from_row(row) for row in rows],
+        utterances,
         previous is None,
     )
 
@@ -618,7 +621,15 @@ async def lore_source(chat_id: int) -> tuple[dict[str, StoredLore], list[LoreWin
             """,
             (chat_id, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, watermark),
         ) as cursor:
-            window_rows = await cursor.fetchall()
+            windows = [
+                LoreWindow(
+                    row["start_message_id"],
+                    row["end_message_id"],
+                    str(row["start_time"])[:7],
+                    row["message_text"],
+                )
+                async for row in cursor
+            ]
     existing = {
         row["topic"]: StoredLore(
             row["topic"],
@@ -628,15 +639,6 @@ async def lore_source(chat_id: int) -> tuple[dict[str, StoredLore], list[LoreWin
         )
         for row in lore_rows
     }
-    windows = [
-        LoreWindow(
-            row["start_message_id"],
-            row["end_message_id"],
-            str(row["start_time"])[:7],
-            row["message_text"],
-        )
-        for row in window_rows
-    ]
     return existing, windows
 
 
@@ -17,9 +17,11 @@ from chat_search_config import (
 )
 from commands.ai import model, openrouter_provider
 from config.db import get_db
+from config.executors import db_executor
 from config.logger import logger
 from management.chat_aliases import Participant, resolve_participants
 from management.chat_search_cache import open_search_cache
+from management.chat_search_feed import search_index_feed
 from management.chat_semantic_search import (
     NO_SOLID_ANSWER,
     SearchAnswerOutput,
@@ -30,9 +32,10 @@ from management.chat_semantic_search import (
     telegram_message_link,
     vector_search_candidates,
 )
-from openrouter_embeddings import openrouter_embeddings, vector32_json
+from openrouter_embeddings import openrouter_embeddings, vector32_blob
 
 MAX_LEXICAL_TERMS = 10
+TAIL_RESULT_COUNT = 4
 MAX_EVIDENCE = 24
 LEXICAL_RESULT_COUNT = 12
 PAIR_RESULT_COUNT = 12
@@ -327,7 +330,7 @@ async def semantic_evidence(
         *(
             vector_search_candidates(
                 chat_id,
-                vector32_json(embedding),
+                vector32_blob(embedding),
                 candidate_count,
             )
             for embedding in embeddings
@@ -355,7 +358,7 @@ async def utterance_evidence(
         dimensions=UTTERANCE_EMBEDDING_DIMENSIONS,
     )
 
-    def search(query_vector: str):
+    def search(query_vector: bytes):
         connection = open_search_cache()
         try:
             return connection.execute(
@@ -391,10 +394,7 @@ async def utterance_evidence(
             connection.close()
 
     result_lists = await asyncio.gather(
-        *(
-            asyncio.to_thread(search, vector32_json(embedding))
-            for embedding in embeddings
-        )
+        *(db_executor.run(search, vector32_blob(embedding)) for embedding in embeddings)
     )
     best_rows = {}
     for rows in result_lists:
@@ -498,6 +498,40 @@ async def lexical_evidence(
     ]
 
 
+def tail_evidence(
+    chat_id: int,
+    queries: list[str],
+    author_id: int | None,
+) -> list[SearchEvidence]:
+    """Match recent messages that have no embedded window yet by word overlap."""
+    query_tokens = lexical_tokens(" ".join(queries))
+    if not query_tokens:
+        return []
+    scored = [
+        (len(query_tokens & lexical_tokens(message.text)), message)
+        for message in search_index_feed.tail_messages(chat_id)
+        if author_id is None or message.user_id == author_id
+    ]
+    ranked = sorted(
+        ((score, message) for score, message in scored if score),
+        key=lambda pair: (-pair[0], -pair[1].message_id),
+    )
+    return [
+        SearchEvidence(
+            chat_id=chat_id,
+            start_message_id=message.message_id,
+            end_message_id=message.message_id,
+            citation_message_id=message.message_id,
+            text=(
+                f"{message.message_id} {message.create_time} "
+                f"{message.author}: {message.text}"
+            ),
+            score=score / len(query_tokens),
+        )
+        for score, message in ranked[:TAIL_RESULT_COUNT]
+    ]
+
+
 async def interaction_pair_evidence(chat_id: int) -> list[SearchEvidence]:
     async with (
         get_db() as connection,
@@ -917,12 +951,16 @@ async def search_answer(
         if plan.include_interaction_pairs
         else _empty_evidence(),
     )
+    tail_result = tail_evidence(
+        chat_id, [*plan.semantic_queries, *plan.lexical_terms], author_id
+    )
     evidence = merge_evidence(
         (
             *pair_result[:8],
             *identity_result[:4],
             *utterance_result[:16],
             *semantic_result[:6],
+            *tail_result,
             *lexical_result[:2],
         )
     )
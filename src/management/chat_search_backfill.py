@@ -0,0 +1,372 @@
+"""Pipelined backfill of the chat search tables.
+
+Three stages run at once: readers plan batches from `chat_stats`, up to
+`concurrency` embedding requests are in flight, and one writer stores whatever
+has been embedded in a single statement. Each chat's batches are written in
+the order they were read, so the tables always end on a complete prefix and an
+interrupted run resumes where the indexer's own resume queries point.
+"""
+
+import asyncio
+import math
+import signal
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any
+
+from chat_search_config import (
+    UTTERANCE_GAP_SECONDS,
+    WINDOW_MESSAGE_COUNT,
+    WINDOW_STRIDE,
+)
+from config.db import get_db
+from config.logger import logger
+from management.chat_search_cache import sync_search_cache
+from management.chat_search_index import (
+    INDEX_BATCH_WINDOWS,
+    embed_utterances,
+    embed_windows,
+    resume_utterance_start,
+    resume_window_start,
+    store_utterances,
+    store_windows,
+    utterance_batch,
+    window_batch,
+)
+from openrouter_embeddings import (
+    CHARS_PER_TOKEN,
+    EMBEDDING_BATCH_TOKENS,
+)
+
+# Characters a window line adds around the text: ID, timestamp and author.
+WINDOW_LINE_OVERHEAD = 48
+REPORT_INTERVAL_SECONDS = 10
+
+
+@dataclass(frozen=True)
+class BackfillStage:
+    name: str
+    resume: Callable[[int], Awaitable[int]]
+    plan: Callable[[int, int, int], Awaitable[tuple[list[Any], int | None]]]
+    embed: Callable[[list[Any]], Awaitable[list[list[float]]]]
+    store: Callable[[list[Any], list[list[float]]], Awaitable[None]]
+
+
+def backfill_stage(name: str) -> BackfillStage:
+    if name == "windows":
+        return BackfillStage(
+            name,
+            resume_window_start,
+            partial(window_batch, skip_indexed=True),
+            embed_windows,
+            store_windows,
+        )
+    return BackfillStage(
+        name,
+        resume_utterance_start,
+        partial(utterance_batch, skip_indexed=True),
+        embed_utterances,
+        store_utterances,
+    )
+
+
+@dataclass(frozen=True)
+class Backlog:
+    chat_id: int
+    messages: int
+    items: int
+    embedding_calls: int
+
+
+@dataclass
+class ChatProgress:
+    chat_id: int
+    estimate: int
+    done: int = 0
+    batches: int = 0
+    written: int = 0
+    finished: bool = False
+    failed: bool = False
+    started: float = field(default_factory=time.monotonic)
+    # Embedded batches waiting for an earlier batch of the chat to be written.
+    ready: dict[int, tuple[list[Any], list[list[float]]]] = field(default_factory=dict)
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> float | None:
+        if self.finished:
+            return 0.0
+        rate = self.rate
+        return max(0, self.estimate - self.done) / rate if rate else None
+
+
+async def estimate_backlog(stage: BackfillStage, chat_id: int) -> Backlog:
+    """Rough item and embedding request counts from the stage's resume point."""
+    # Resolved first: the resume query takes a connection of its own.
+    start_message_id = await stage.resume(chat_id)
+    async with (
+        get_db() as conn,
+        conn.execute(
+            """
+            SELECT
+                COUNT(*) AS messages,
+                COALESCE(SUM(LENGTH(message_text)), 0) AS characters,
+                COALESCE(SUM(
+                    previous_user_id IS NULL
+                    OR previous_user_id <> user_id
+                    OR (julianday(create_time) - julianday(previous_time)) * 86400 > ?
+                ), 0) AS speaker_turns
+            FROM (
+                SELECT
+                    user_id,
+                    create_time,
+                    message_text,
+                    LAG(user_id) OVER (ORDER BY message_id) AS previous_user_id,
+                    LAG(create_time) OVER (ORDER BY message_id) AS previous_time
+                FROM chat_stats
+                WHERE chat_id = ?
+                AND message_id >= ?
+                AND message_id IS NOT NULL
+                AND message_text IS NOT NULL
+                AND message_text <> ''
+                AND message_text NOT LIKE '/%'
+            )
+            """,
+            (UTTERANCE_GAP_SECONDS, chat_id, start_message_id),
+        ) as cursor,
+    ):
+        row = await cursor.fetchone()
+    if not row:
+        return Backlog(chat_id=chat_id, messages=0, items=0, embedding_calls=0)
+    messages = row["messages"]
+    characters = row["characters"] + WINDOW_LINE_OVERHEAD * messages
+    if stage.name == "windows":
+        items = math.ceil(messages / WINDOW_STRIDE)
+        # Every message appears in WINDOW_MESSAGE_COUNT / WINDOW_STRIDE windows.
+        characters = characters * WINDOW_MESSAGE_COUNT // WINDOW_STRIDE
+    else:
+        items = row["speaker_turns"]
+    tokens = characters // CHARS_PER_TOKEN
+    return Backlog(
+        chat_id=chat_id,
+        messages=messages,
+        items=items,
+        embedding_calls=max(
+            math.ceil(items / INDEX_BATCH_WINDOWS),
+            math.ceil(tokens / EMBEDDING_BATCH_TOKENS),
+        ),
+    )
+
+
+async def run_backfill(
+    stage: BackfillStage,
+    chat_ids: list[int],
+    *,
+    concurrency: int,
+    stop: asyncio.Event,
+    report: Callable[[list[ChatProgress]], None] | None = None,
+) -> list[ChatProgress]:
+    """Index every pending item of `chat_ids`, or until `stop` is set.
+
+    After `stop`, batches already read are still embedded and written.
+    """
+    reads = asyncio.Semaphore(concurrency)
+
+    async def estimate(chat_id: int) -> Backlog:
+        async with reads:
+            return await estimate_backlog(stage, chat_id)
+
+    backlogs = await asyncio.gather(*map(estimate, chat_ids))
+    progress = [ChatProgress(item.chat_id, item.items) for item in backlogs]
+    embed_queue: asyncio.Queue[tuple[ChatProgress, int, list[Any]] | None] = (
+        asyncio.Queue(maxsize=concurrency * 2)
+    )
+    write_queue: asyncio.Queue[
+        tuple[ChatProgress, int, list[Any], list[list[float]]] | None
+    ] = asyncio.Queue()
+    errors: list[BaseException] = []
+
+    async def read(chat: ChatProgress) -> None:
+        start_message_id = await stage.resume(chat.chat_id)
+        while not stop.is_set() and not errors:
+            try:
+                async with reads:
+                    items, next_start_message_id = await stage.plan(
+                        chat.chat_id, start_message_id, INDEX_BATCH_WINDOWS
+                    )
+            except Exception as exc:  # noqa: BLE001
+                logger.warning(
+                    "Reading %s for chat %s failed: %s", stage.name, chat.chat_id, exc
+                )
+                chat.failed = True
+                errors.append(exc)
+                break
+            if not items:
+                break
+            await embed_queue.put((chat, chat.batches, items))
+            chat.batches += 1
+            if len(items) < INDEX_BATCH_WINDOWS or next_start_message_id is None:
+                break
+            start_message_id = next_start_message_id
+
+    async def embed() -> None:
+        while (job := await embed_queue.get()) is not None:
+            chat, batch, items = job
+            if errors or chat.failed:
+                continue
+            try:
+                embeddings = await stage.embed(items)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning(
+                    "Embedding %s for chat %s failed: %s", stage.name, chat.chat_id, exc
+                )
+                chat.failed = True
+                errors.append(exc)
+                continue
+            await write_queue.put((chat, batch, items, embeddings))
+
+    async def write() -> None:
+        done = False
+        while not done:
+            jobs = [await write_queue.get()]
+            while not write_queue.empty():
+                jobs.append(write_queue.get_nowait())
+            done = None in jobs
+            for job in jobs:
+                if job is not None:
+                    chat, batch, items, embeddings = job
+                    chat.ready[batch] = (items, embeddings)
+
+            if errors:
+                continue
+
+            items, embeddings, written = [], [], []
+            for chat in progress:
+                while not chat.failed and chat.written in chat.ready:
+                    chat_items, chat_embeddings = chat.ready.pop(chat.written)
+                    items += chat_items
+                    embeddings += chat_embeddings
+                    written.append((chat, len(chat_items)))
+                    chat.written += 1
+            if items:
+                try:
+                    await stage.store(items, embeddings)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Writing %s failed: %s", stage.name, exc)
+                    for chat, _ in written:
+                        chat.failed = True
+                    errors.append(exc)
+                    continue
+            for chat, count in written:
+                chat.done += count
+
+    async def report_periodically() -> None:
+        while report:
+            await asyncio.sleep(REPORT_INTERVAL_SECONDS)
+            report(progress)
+
+    embedders = [asyncio.create_task(embed()) for _ in range(concurrency)]
+    writer = asyncio.create_task(write())
+    reporter = asyncio.create_task(report_periodically())
+    try:
+        await asyncio.gather(*map(read, progress))
+        for _ in embedders:
+            await embed_queue.put(None)
+        await asyncio.gather(*embedders)
+        await write_queue.put(None)
+        await writer
+    finally:
+        for task in (*embedders, writer, reporter):
+            task.cancel()
+
+    for chat in progress:
+        chat.finished = not chat.failed and not stop.is_set()
+    if any(chat.done for chat in progress):
+        await sync_search_cache()
+    if report:
+        report(progress)
+    if errors:
+        raise errors[0]
+    return progress
+
+
+def format_eta(seconds: float | None) -> str:
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def print_progress(stage: BackfillStage, progress: list[ChatProgress]) -> None:
+    for chat in progress:
+        if chat.done or chat.failed:
+            state = "failed" if chat.failed else "done" if chat.finished else "running"
+            print(
+                f"chat={chat.chat_id} {stage.name}={chat.done:,}/~{chat.estimate:,} "
+                f"rate={chat.rate:.1f}/s eta={format_eta(chat.eta_seconds)} {state}"
+            )
+    done = sum(chat.done for chat in progress)
+    remaining = sum(max(0, chat.estimate - chat.done) for chat in progress)
+    rate = sum(chat.rate for chat in progress)
+    print(
+        f"indexed_{stage.name}={done:,} remaining~{remaining:,} "
+        f"rate={rate:.1f}/s eta={format_eta(remaining / rate if rate else None)}",
+        flush=True,
+    )
+
+
+async def backfill_from_cli(
+    name: str,
+    chat_ids: list[int],
+    *,
+    concurrency: int,
+    dry_run: bool,
+) -> None:
+    """Run or estimate a pipelined backfill, printing progress as it goes.
+
+    The first Ctrl-C finishes the batches in flight so the next run resumes
+    cleanly; a second one stops immediately.
+    """
+    stage = backfill_stage(name)
+    if dry_run:
+        backlogs = [await estimate_backlog(stage, chat_id) for chat_id in chat_ids]
+        for backlog in backlogs:
+            if backlog.messages:
+                print(
+                    f"chat={backlog.chat_id} messages={backlog.messages:,} "
+                    f"{name}~{backlog.items:,} "
+                    f"embedding_calls~{backlog.embedding_calls:,}"
+                )
+        print(
+            f"messages={sum(item.messages for item in backlogs):,} "
+            f"{name}~{sum(item.items for item in backlogs):,} "
+            f"embedding_calls~{sum(item.embedding_calls for item in backlogs):,}"
+        )
+        return
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def interrupt() -> None:
+        print("Finishing batches in flight; press Ctrl-C again to abort.")
+        stop.set()
+        loop.remove_signal_handler(signal.SIGINT)
+
+    loop.add_signal_handler(signal.SIGINT, interrupt)
+    try:
+        await run_backfill(
+            stage,
+            chat_ids,
+            concurrency=concurrency,
+            stop=stop,
+            report=partial(print_progress, stage),
+        )
+    finally:
+        loop.remove_signal_handler(signal.SIGINT)
@@ -1,22 +1,36 @@
 import asyncio
+import hashlib
 import importlib
 import os
+import struct
+import time
 from collections.abc import Sequence
+from dataclasses import asdict, dataclass
 from pathlib import Path
 from typing import Any
 
-from chat_search_config import UTTERANCE_EMBEDDING_DIMENSIONS
+from chat_search_config import UTTERANCE_EMBEDDING_DIMENSIONS, cache_path
 from config.db import TursoRow, get_db
+from config.executors import db_executor
 from config.logger import logger
 
 SEARCH_CACHE_BATCH_SIZE = 1024
-SEARCH_CACHE_PATH = "db/chat-search.db"
+EMBEDDING_CACHE_MAX_MB = int(os.environ.get("EMBEDDING_CACHE_MAX_MB", "256"))
 
-_sync_lock = asyncio.Lock()
+
+@dataclass
+class EmbeddingCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stored: int = 0
+    evicted: int = 0
+    errors: int = 0
 
 
-def cache_path() -> Path:
-    return Path(os.environ.get("SEARCH_CACHE_PATH", SEARCH_CACHE_PATH))
+embedding_cache_stats = EmbeddingCacheStats()
+
+_sync_lock = asyncio.Lock()
+_embedding_cache_path: Path | None = None
 
 
 def open_search_cache():
@@ -119,6 +133,39 @@ def initialize_search_cache_file() -> None:
             VALUES (1, 0)
             """
         )
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                key BLOB PRIMARY KEY,
+                embedding BLOB NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        connection.execute(
+            """
+            CREATE INDEX IF NOT EXISTS embedding_cache_last_used_idx
+            ON embedding_cache (last_used)
+            """
+        )
+        # Kept up to date by every store, so eviction never scans the cache.
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache_state (
+                singleton INTEGER PRIMARY KEY CHECK (singleton = 1),
+                entries INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        connection.execute(
+            """
+            INSERT OR IGNORE INTO embedding_cache_state (singleton, entries, size)
+            SELECT 1, COUNT(*), COALESCE(SUM(LENGTH(embedding)), 0)
+            FROM embedding_cache
+            WHERE NOT EXISTS (SELECT 1 FROM embedding_cache_state)
+            """
+        )
     finally:
         connection.close()
 
@@ -298,6 +345,156 @@ def store_search_utterance_cache_rows(rows: Sequence[TursoRow]) -> None:
         connection.close()
 
 
+def embedding_cache_key(model: str, dimensions: int, text: str) -> bytes:
+    return hashlib.sha256(f"{model}\0{dimensions}\0{text}".encode()).digest()
+
+
+def _open_embedding_cache():
+    global _embedding_cache_path
+    if _embedding_cache_path != cache_path():
+        initialize_search_cache_file()
+        _embedding_cache_path = cache_path()
+    return open_search_cache()
+
+
+def load_cached_embeddings(keys: Sequence[bytes]) -> dict[bytes, list[float]]:
+    """Cached embeddings for `keys`, marking the ones found as recently used."""
+    if not keys:
+        return {}
+    connection = _open_embedding_cache()
+    try:
+        placeholders = ", ".join("?" for _ in keys)
+        rows = connection.execute(
+            f"SELECT key, embedding FROM embedding_cache WHERE key IN ({placeholders})",
+            tuple(keys),
+        ).fetchall()
+        if rows:
+            connection.execute(
+                f"""
+                UPDATE embedding_cache
+                SET last_used = ?
+                WHERE key IN ({", ".join("?" for _ in rows)})
+                """,
+                (time.time(), *(row[0] for row in rows)),
+            )
+    finally:
+        connection.close()
+    return {
+        bytes(key): list(struct.unpack(f"<{len(blob) // 4}f", blob))
+        for key, blob in rows
+    }
+
+
+def store_cached_embeddings(entries: Sequence[tuple[bytes, bytes]]) -> int:
+    """Store `(key, vector32 blob)` pairs, then evict least recently used
+    entries until the cache fits `EMBEDDING_CACHE_MAX_MB`. Returns evictions.
+    """
+    blobs = dict(entries)
+    if not blobs:
+        return 0
+    connection = _open_embedding_cache()
+    try:
+        now = time.time()
+        connection.execute("BEGIN")
+        replaced_count, replaced_size = connection.execute(
+            f"""
+            SELECT COUNT(*), COALESCE(SUM(LENGTH(embedding)), 0)
+            FROM embedding_cache
+            WHERE key IN ({", ".join("?" for _ in blobs)})
+            """,
+            tuple(blobs),
+        ).fetchone()
+        connection.executemany(
+            """
+            INSERT OR REPLACE INTO embedding_cache (key, embedding, last_used)
+            VALUES (?, ?, ?)
+            """,
+            [(key, blob, now) for key, blob in blobs.items()],
+        )
+        count, size = connection.execute(
+            """
+            UPDATE embedding_cache_state
+            SET entries = entries + ?, size = size + ?
+            WHERE singleton = 1
+            RETURNING entries, size
+            """,
+            (
+                len(blobs) - replaced_count,
+                sum(map(len, blobs.values())) - replaced_size,
+            ),
+        ).fetchone()
+        budget = EMBEDDING_CACHE_MAX_MB * 1024 * 1024
+        evicted = []
+        if size > budget and count:
+            # Entries of one model share a size, so the average is close enough.
+            evict = min(count, -(-(size - budget) * count // size))
+            evicted = connection.execute(
+                """
+                DELETE FROM embedding_cache
+                WHERE key IN (
+                    SELECT key FROM embedding_cache ORDER BY last_used LIMIT ?
+                )
+                RETURNING LENGTH(embedding)
+                """,
+                (evict,),
+            ).fetchall()
+            connection.execute(
+                """
+                UPDATE embedding_cache_state
+                SET entries = entries - ?, size = size - ?
+                WHERE singleton = 1
+                """,
+                (len(evicted), sum(row[0] for row in evicted)),
+            )
+        connection.execute("COMMIT")
+        return len(evicted)
+    finally:
+        connection.close()
+
+
+async def cached_embeddings(
+    model: str, dimensions: int, texts: Sequence[str]
+) -> list[list[float] | None]:
+    """Embeddings already computed for `texts`, or None where there are none."""
+    keys = [embedding_cache_key(model, dimensions, text) for text in texts]
+    try:
+        found = await db_executor.run(load_cached_embeddings, keys)
+    except Exception as exc:  # noqa: BLE001
+        embedding_cache_stats.errors += 1
+        logger.warning("Embedding cache lookup failed: %s", exc)
+        found = {}
+    embeddings = [found.get(key) for key in keys]
+    hits = sum(embedding is not None for embedding in embeddings)
+    embedding_cache_stats.hits += hits
+    embedding_cache_stats.misses += len(embeddings) - hits
+    return embeddings
+
+
+async def store_embeddings(
+    model: str,
+    dimensions: int,
+    texts: Sequence[str],
+    embeddings: Sequence[bytes],
+) -> None:
+    """Remember vector32 blobs of freshly computed embeddings for `texts`."""
+    entries = [
+        (embedding_cache_key(model, dimensions, text), blob)
+        for text, blob in zip(texts, embeddings, strict=True)
+    ]
+    try:
+        evicted = await db_executor.run(store_cached_embeddings, entries)
+    except Exception as exc:  # noqa: BLE001
+        embedding_cache_stats.errors += 1
+        logger.warning("Embedding cache store failed: %s", exc)
+        return
+    embedding_cache_stats.stored += len(entries)
+    embedding_cache_stats.evicted += evicted
+
+
+def embedding_cache_metrics() -> dict[str, int]:
+    return asdict(embedding_cache_stats)
+
+
 async def fetch_search_cache_rows(after_remote_id: int) -> list[TursoRow]:
     async with (
         get_db() as connection,
@@ -308,7 +505,7 @@ async def fetch_search_cache_rows(after_remote_id: int) -> list[TursoRow]:
                 chat_id,
                 start_message_id,
                 end_message_id,
-                vector_extract(embedding) AS embedding,
+                embedding,
                 embedding_model,
                 embedding_dimension
             FROM chat_search_windows
@@ -339,7 +536,7 @@ async def fetch_search_utterance_cache_rows(
                 start_time,
                 end_time,
                 message_text,
-                vector_extract(embedding) AS embedding,
+                embedding,
                 embedding_model,
                 embedding_dimension
             FROM chat_search_utterances
@@ -358,12 +555,12 @@ async def sync_search_cache() -> int:
         initialize_search_cache_file()
         synced = 0
         while rows := await fetch_search_cache_rows(cached_remote_id()):
-            await asyncio.to_thread(store_search_cache_rows, rows)
+            await db_executor.run(store_search_cache_rows, rows)
             synced += len(rows)
         while rows := await fetch_search_utterance_cache_rows(
             cached_utterance_remote_id()
         ):
-            await asyncio.to_thread(store_search_utterance_cache_rows, rows)
+            await db_executor.run(store_search_utterance_cache_rows, rows)
             synced += len(rows)
         if synced:
             logger.info("Synced %d semantic search records to local cache", synced)
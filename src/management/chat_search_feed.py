@@ -0,0 +1,450 @@
+"""Incremental chat search indexing driven by new `chat_stats` rows.
+
+The feed reads rows past a global `chat_stats.id` watermark, so a run costs one
+range scan and idle chats are never queried. Each active chat keeps the tail of
+messages whose windows or utterances can still change in memory, so new
+messages are appended rather than re-read. A chat is loaded from the database
+only when it has no state yet, an insert lands out of order, or it has more
+backlog than one batch holds. Chats are loaded and indexed `INDEX_CONCURRENCY`
+at a time.
+
+Short trailing windows wait for `final_windows`, so until a busy chat's tail
+fills up or goes quiet its newest messages are only in memory; `tail_messages`
+lets search match them lexically in the meantime.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+from chat_search_config import (
+    SEARCH_INDEX_CHECKPOINT,
+    WINDOW_MESSAGE_COUNT,
+    WINDOW_STRIDE,
+)
+from config.db import get_db
+from config.logger import logger
+from management.chat_search_cache import sync_search_cache
+from management.chat_search_index import (
+    INDEX_BATCH_WINDOWS,
+    INDEX_CONCURRENCY,
+    MIN_MESSAGE_ID,
+    SearchUtterance,
+    SearchWindow,
+    SourceMessage,
+    build_utterances,
+    build_windows,
+    embed_utterances,
+    embed_windows,
+    existing_utterances,
+    existing_windows,
+    final_windows,
+    resume_utterance_start,
+    resume_window_start,
+    searchable_chat_ids,
+    source_message,
+    source_messages,
+    source_row_limit,
+    store_utterances,
+    store_windows,
+)
+
+FEED_BATCH_ROWS = 5000
+FEED_MAX_ROWS_PER_RUN = 50_000
+# A chat whose in-memory tail grows past this (e.g. while embeddings fail) is
+# dropped and read back from the database once it can make progress again.
+MAX_TAIL_MESSAGES = 4 * source_row_limit(INDEX_BATCH_WINDOWS)
+
+
+@dataclass
+class ChatIndexState:
+    """Messages of one chat whose windows or utterances are not final yet."""
+
+    chat_id: int
+    windows: list[SourceMessage]
+    window_ranges: set[tuple[int, int]]
+    utterances: list[SourceMessage]
+    utterance_ranges: set[tuple[int, int]]
+    # False when the chat had more backlog than one load holds.
+    complete: bool = True
+    # Last message covered by a stored window.
+    windows_end: int = MIN_MESSAGE_ID
+
+    @property
+    def size(self) -> int:
+        return max(len(self.windows), len(self.utterances))
+
+    def append(self, message: SourceMessage) -> bool:
+        """Add a new message; False if it landed inside the tail out of order."""
+        tail = self.windows or self.utterances
+        if tail and message.message_id <= tail[-1].message_id:
+            first = min(
+                messages[0].message_id
+                for messages in (self.windows, self.utterances)
+                if messages
+            )
+            if message.message_id < first:
+                # Behind the resume point, where the index is already final.
+                return True
+            known = {item.message_id for item in self.windows}
+            known.update(item.message_id for item in self.utterances)
+            return message.message_id in known
+        self.windows.append(message)
+        self.utterances.append(message)
+        return True
+
+    def pending_windows(self) -> list[SearchWindow]:
+        """Windows ready to embed; see `final_windows`."""
+        return final_windows(
+            build_windows(self.chat_id, self.windows, self.window_ranges)
+        )
+
+    def pending_utterances(self) -> list[SearchUtterance]:
+        return build_utterances(self.chat_id, self.utterances, self.utterance_ranges)
+
+    def has_pending(self) -> bool:
+        """Whether anything is not stored yet, ready to embed or not."""
+        return bool(
+            build_windows(self.chat_id, self.windows, self.window_ranges)
+            or self.pending_utterances()
+        )
+
+    def unindexed_messages(self) -> list[SourceMessage]:
+        """Messages after the last stored window."""
+        return [m for m in self.windows if m.message_id > self.windows_end]
+
+    def oldest_row_id(self) -> int:
+        return min(
+            (message.row_id for message in (*self.windows, *self.utterances)),
+            default=0,
+        )
+
+    def trim(self) -> None:
+        """Drop messages whose windows and utterances are stored and final."""
+        position = len(self.windows)
+        for start in range(0, len(self.windows), WINDOW_STRIDE):
+            window = self.windows[start : start + WINDOW_MESSAGE_COUNT]
+            if len(window) < WINDOW_MESSAGE_COUNT or (
+                (window[0].message_id, window[-1].message_id) not in self.window_ranges
+            ):
+                position = start
+                break
+        self.windows = self.windows[position:]
+        if self.windows:
+            first = self.windows[0].message_id
+            self.window_ranges = {
+                item for item in self.window_ranges if item[0] >= first
+            }
+
+        groups = build_utterances(self.chat_id, self.utterances, set())
+        for index, group in enumerate(groups):
+            key = (group.start_message_id, group.end_message_id)
+            # The last utterance can still grow, so it always stays.
+            if index == len(groups) - 1 or key not in self.utterance_ranges:
+                self.utterances = [
+                    message
+                    for message in self.utterances
+                    if message.message_id >= group.start_message_id
+                ]
+                self.utterance_ranges = {
+                    item
+                    for item in self.utterance_ranges
+                    if item[0] >= group.start_message_id
+                }
+                break
+
+
+@dataclass(frozen=True)
+class IndexRun:
+    duration_ms: int
+    windows: int
+    utterances: int
+
+
+async def load_chat_state(chat_id: int, limit: int) -> ChatIndexState:
+    """Read a chat's unfinished tail the way the batch indexer resumes."""
+    window_start = await resume_window_start(chat_id)
+    utterance_start = await resume_utterance_start(chat_id)
+    messages = await source_messages(chat_id, min(window_start, utterance_start), limit)
+    window_ranges = await existing_windows(chat_id, window_start)
+    return ChatIndexState(
+        chat_id=chat_id,
+        windows=[m for m in messages if m.message_id >= window_start],
+        window_ranges=window_ranges,
+        utterances=[m for m in messages if m.message_id >= utterance_start],
+        utterance_ranges=await existing_utterances(chat_id, utterance_start),
+        complete=len(messages) < source_row_limit(limit),
+        windows_end=max((end for _, end in window_ranges), default=MIN_MESSAGE_ID),
+    )
+
+
+async def load_checkpoint() -> int | None:
+    async with (
+        get_db() as conn,
+        conn.execute(
+            "SELECT last_stats_id FROM chat_search_index_checkpoint WHERE name = ?",
+            (SEARCH_INDEX_CHECKPOINT,),
+        ) as cursor,
+    ):
+        row = await cursor.fetchone()
+    return row["last_stats_id"] if row else None
+
+
+async def save_checkpoint(last_stats_id: int, run: IndexRun | None = None) -> None:
+    """Store the feed position; without a `run`, the stored run stats are kept."""
+    async with get_db() as conn:
+        await conn.execute(
+            """
+            INSERT INTO chat_search_index_checkpoint (
+                name,
+                last_stats_id,
+                last_run_ms,
+                last_run_windows,
+                last_run_utterances
+            )
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                last_stats_id = excluded.last_stats_id,
+                last_run_ms = COALESCE(excluded.last_run_ms, last_run_ms),
+                last_run_windows = COALESCE(excluded.last_run_windows, last_run_windows),
+                last_run_utterances = COALESCE(
+                    excluded.last_run_utterances, last_run_utterances
+                ),
+                update_time = CURRENT_TIMESTAMP
+            """,
+            (
+                SEARCH_INDEX_CHECKPOINT,
+                last_stats_id,
+                run.duration_ms if run else None,
+                run.windows if run else None,
+                run.utterances if run else None,
+            ),
+        )
+
+
+async def max_stats_id() -> int:
+    async with (
+        get_db() as conn,
+        conn.execute("SELECT COALESCE(MAX(id), 0) AS id FROM chat_stats") as cursor,
+    ):
+        row = await cursor.fetchone()
+    return row["id"] if row else 0
+
+
+async def feed_rows(after_id: int, through_id: int, limit: int):
+    async with (
+        get_db() as conn,
+        conn.execute(
+            """
+            SELECT
+                cs.id AS row_id,
+                cs.chat_id,
+                cs.message_id,
+                cs.user_id,
+                cs.create_time,
+                COALESCE(us.username, 'user:' || cs.user_id) AS author,
+                cs.message_text
+            FROM chat_stats cs
+            JOIN group_settings gs ON gs.chat_id = cs.chat_id AND gs.fts = 1
+            LEFT JOIN user_stats us ON us.user_id = cs.user_id
+            WHERE cs.id > ?
+            AND cs.id <= ?
+            AND cs.message_id IS NOT NULL
+            AND cs.message_text IS NOT NULL
+            AND cs.message_text <> ''
+            AND cs.message_text NOT LIKE '/%'
+            ORDER BY cs.id
+            LIMIT ?
+            """,
+            (after_id, through_id, limit),
+        ) as cursor,
+    ):
+        return await cursor.fetchall()
+
+
+def fair_shares(demand: dict[int, int], budget: int) -> dict[int, int]:
+    """Split `budget` evenly, then hand leftovers to chats that want more."""
+    if not demand:
+        return {}
+    per_chat = max(1, budget // len(demand))
+    shares = {}
+    remaining = budget
+    for chat_id, wanted in demand.items():
+        if remaining <= 0:
+            break
+        shares[chat_id] = min(per_chat, wanted, remaining)
+        remaining -= shares[chat_id]
+    for chat_id, wanted in demand.items():
+        if remaining <= 0:
+            break
+        extra = min(wanted - shares.get(chat_id, 0), remaining)
+        if extra > 0:
+            shares[chat_id] = shares.get(chat_id, 0) + extra
+            remaining -= extra
+    return shares
+
+
+class SearchIndexFeed:
+    def __init__(self, budget: int = INDEX_BATCH_WINDOWS):
+        self.budget = budget
+        self.cursor: int | None = None
+        self.saved: int | None = None
+        self.last_run: IndexRun | None = None
+        self.chats: dict[int, ChatIndexState] = {}
+        # Chats whose tail must be read from the database on the next run.
+        self.reload: set[int] = set()
+
+    async def _start(self) -> int:
+        self.saved = await load_checkpoint()
+        if self.saved is not None:
+            return self.saved
+        # First run: everything so far is picked up by loading each chat.
+        self.reload.update(await searchable_chat_ids())
+        return await max_stats_id()
+
+    async def _read_feed(self, cursor: int) -> int:
+        """Queue new messages per chat; returns the advanced cursor."""
+        through_id = await max_stats_id()
+        read = 0
+        while cursor < through_id and read < FEED_MAX_ROWS_PER_RUN:
+            rows = await feed_rows(cursor, through_id, FEED_BATCH_ROWS)
+            messages: dict[int, list[SourceMessage]] = defaultdict(list)
+            for row in rows:
+                messages[row["chat_id"]].append(source_message(row))
+            for chat_id, chat_messages in messages.items():
+                self._append(chat_id, chat_messages)
+            read += len(rows)
+            cursor = through_id if len(rows) < FEED_BATCH_ROWS else rows[-1]["row_id"]
+        return cursor
+
+    def _append(self, chat_id: int, messages: list[SourceMessage]) -> None:
+        state = self.chats.get(chat_id)
+        if chat_id in self.reload or state is None or not state.complete:
+            self.reload.add(chat_id)
+            return
+        if not all(state.append(message) for message in messages):
+            logger.info("Reloading search index tail for chat %s", chat_id)
+            self.reload.add(chat_id)
+        elif state.size > MAX_TAIL_MESSAGES:
+            del self.chats[chat_id]
+            self.reload.add(chat_id)
+
+    @staticmethod
+    async def _index_windows(
+        state: ChatIndexState, windows: list[SearchWindow]
+    ) -> None:
+        if not windows:
+            return
+        await store_windows(windows, await embed_windows(windows))
+        state.window_ranges.update(
+            (window.start_message_id, window.end_message_id) for window in windows
+        )
+        state.windows_end = max(state.windows_end, windows[-1].end_message_id)
+
+    @staticmethod
+    async def _index_utterances(
+        state: ChatIndexState, utterances: list[SearchUtterance]
+    ) -> None:
+        if not utterances:
+            return
+        await store_utterances(utterances, await embed_utterances(utterances))
+        state.utterance_ranges.update(
+            (utterance.start_message_id, utterance.end_message_id)
+            for utterance in utterances
+        )
+
+    def _checkpoint(self, cursor: int) -> int:
+        """Furthest row a restart may resume after without losing work."""
+        floors = [
+            state.oldest_row_id() - 1
+            for state in self.chats.values()
+            if not state.complete or state.has_pending()
+        ]
+        return min([cursor, *floors])
+
+    def tail_messages(self, chat_id: int) -> list[SourceMessage]:
+        """Newest messages of `chat_id` that no stored window covers yet."""
+        state = self.chats.get(chat_id)
+        if state is None or not state.complete:
+            return []
+        return state.unindexed_messages()
+
+    async def run(self) -> tuple[int, int]:
+        """Index new messages; returns the windows and utterances stored."""
+        started = time.perf_counter()
+        if self.cursor is None:
+            self.cursor = await self._start()
+        self.cursor = await self._read_feed(self.cursor)
+
+        slots = asyncio.Semaphore(INDEX_CONCURRENCY)
+
+        async def load(chat_id: int) -> ChatIndexState:
+            async with slots:
+                return await load_chat_state(chat_id, self.budget)
+
+        reload = sorted(self.reload)
+        for chat_id, state in zip(
+            reload, await asyncio.gather(*map(load, reload)), strict=True
+        ):
+            self.chats[chat_id] = state
+            if state.complete:
+                self.reload.discard(chat_id)
+
+        pending = {
+            chat_id: (state.pending_windows(), state.pending_utterances())
+            for chat_id, state in self.chats.items()
+        }
+        pending = {
+            chat_id: work for chat_id, work in pending.items() if work[0] or work[1]
+        }
+        window_shares = fair_shares(
+            {chat_id: len(work[0]) for chat_id, work in pending.items() if work[0]},
+            self.budget,
+        )
+        utterance_shares = fair_shares(
+            {chat_id: len(work[1]) for chat_id, work in pending.items() if work[1]},
+            self.budget,
+        )
+        work = [
+            (
+                self.chats[chat_id],
+                chat_windows[: window_shares.get(chat_id, 0)],
+                chat_utterances[: utterance_shares.get(chat_id, 0)],
+            )
+            for chat_id, (chat_windows, chat_utterances) in pending.items()
+        ]
+
+        async def index_chat(
+            state: ChatIndexState,
+            windows: list[SearchWindow],
+            utterances: list[SearchUtterance],
+        ) -> None:
+            async with slots:
+                await asyncio.gather(
+                    self._index_windows(state, windows),
+                    self._index_utterances(state, utterances),
+                )
+            state.trim()
+
+        await asyncio.gather(*(index_chat(*item) for item in work))
+        windows = sum(len(chat_windows) for _, chat_windows, _ in work)
+        utterances = sum(len(chat_utterances) for _, _, chat_utterances in work)
+
+        self.last_run = IndexRun(
+            round((time.perf_counter() - started) * 1000), windows, utterances
+        )
+        checkpoint = self._checkpoint(self.cursor)
+        # The stored run is the last one that did work; an idle run that only
+        # moves the checkpoint leaves it in place.
+        if checkpoint != self.saved or windows or utterances:
+            await save_checkpoint(
+                checkpoint, self.last_run if windows or utterances else None
+            )
+            self.saved = checkpoint
+        if windows or utterances:
+            await sync_search_cache()
+        return windows, utterances
+
+
+search_index_feed = SearchIndexFeed()
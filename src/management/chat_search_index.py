@@ -1,5 +1,8 @@
+import asyncio
+import os
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import UTC, datetime
 
 from chat_search_config import (
     EMBEDDING_DIMENSIONS,
@@ -12,9 +15,15 @@ from chat_search_config import (
 )
 from config.db import get_db
 from management.chat_search_cache import reset_search_cache, sync_search_cache
-from openrouter_embeddings import openrouter_embeddings, vector32_json
+from openrouter_embeddings import openrouter_embeddings, vector32_blob
 
 INDEX_BATCH_WINDOWS = 64
+# Chats indexed at once; each holds one database connection and one embedding
+# request at a time.
+INDEX_CONCURRENCY = int(os.environ.get("CHAT_SEARCH_INDEX_CONCURRENCY", "4"))
+# A window short of WINDOW_MESSAGE_COUNT messages is embedded only once the
+# chat has been quiet this long, so a busy tail is not re-embedded as it fills.
+WINDOW_QUIET_SECONDS = int(os.environ.get("CHAT_SEARCH_WINDOW_QUIET_SECONDS", "900"))
 MIN_MESSAGE_ID = -(1 << 63)
 
 
@@ -25,6 +34,7 @@ class SourceMessage:
     author: str
     text: str
     user_id: int = 0
+    row_id: int = 0
 
 
 @dataclass(frozen=True)
@@ -86,6 +96,31 @@ def build_windows(
     return windows
 
 
+def parse_create_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    # chat_stats stores CURRENT_TIMESTAMP, which is UTC without an offset.
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+def final_windows(
+    windows: list[SearchWindow],
+    now: datetime | None = None,
+) -> list[SearchWindow]:
+    """Windows that are full, or whose last message is past the quiet period.
+
+    Only the trailing windows can be short and they all end on the chat's last
+    message, so the result is always a prefix of `windows`.
+    """
+    now = now or datetime.now(UTC)
+    return [
+        window
+        for window in windows
+        if window.message_count >= WINDOW_MESSAGE_COUNT
+        or (now - parse_create_time(window.end_time)).total_seconds()
+        >= WINDOW_QUIET_SECONDS
+    ]
+
+
 def build_utterances(
     chat_id: int,
     messages: list[SourceMessage],
@@ -199,20 +234,35 @@ async def resume_window_start(chat_id: int) -> int:
     return rows[0]["start_message_id"] if rows else MIN_MESSAGE_ID
 
 
+def source_row_limit(window_limit: int) -> int:
+    return max(
+        WINDOW_STRIDE * window_limit + WINDOW_MESSAGE_COUNT,
+        UTTERANCE_MAX_MESSAGES * window_limit + 1,
+    )
+
+
+def source_message(row) -> SourceMessage:
+    return SourceMessage(
+        message_id=row["message_id"],
+        create_time=row["create_time"],
+        author=format_author(row["author"]),
+        text=row["message_text"],
+        user_id=row["user_id"],
+        row_id=row["row_id"],
+    )
+
+
 async def source_messages(
     chat_id: int,
     start_message_id: int,
     window_limit: int,
 ) -> list[SourceMessage]:
-    row_limit = max(
-        WINDOW_STRIDE * window_limit + WINDOW_MESSAGE_COUNT,
-        UTTERANCE_MAX_MESSAGES * window_limit + 1,
-    )
     async with (
         get_db() as conn,
         conn.execute(
             """
             SELECT
+                cs.id AS row_id,
                 cs.message_id,
                 cs.user_id,
                 cs.create_time,
@@ -229,20 +279,11 @@ async def source_messages(
             ORDER BY cs.message_id
             LIMIT ?
             """,
-            (chat_id, start_message_id, row_limit),
+            (chat_id, start_message_id, source_row_limit(window_limit)),
         ) as cursor,
     ):
         rows = await cursor.fetchall()
-    return [
-        SourceMessage(
-            message_id=row["message_id"],
-            create_time=row["create_time"],
-            author=format_author(row["author"]),
-            text=row["message_text"],
-            user_id=row["user_id"],
-        )
-        for row in rows
-    ]
+    return [source_message(row) for row in rows]
 
 
 async def existing_windows(
@@ -366,7 +407,7 @@ async def store_windows(
                     window.end_time,
                     window.message_count,
                     window.text,
-                    vector32_json(embedding),
+                    vector32_blob(embedding),
                     EMBEDDING_MODEL,
                     EMBEDDING_DIMENSIONS,
                 )
@@ -430,7 +471,7 @@ async def store_utterances(
                     utterance.end_time,
                     utterance.message_count,
                     utterance.text,
-                    vector32_json(embedding),
+                    vector32_blob(embedding),
                     EMBEDDING_MODEL,
                     UTTERANCE_EMBEDDING_DIMENSIONS,
                 )
@@ -439,28 +480,39 @@ async def store_utterances(
         )
 
 
-async def index_window_batch(
+async def embed_windows(windows: list[SearchWindow]) -> list[list[float]]:
+    return await openrouter_embeddings(
+        EMBEDDING_MODEL,
+        [window.text for window in windows],
+        dimensions=EMBEDDING_DIMENSIONS,
+    )
+
+
+async def embed_utterances(utterances: list[SearchUtterance]) -> list[list[float]]:
+    return await openrouter_embeddings(
+        EMBEDDING_MODEL,
+        [f"{utterance.author}: {utterance.text}" for utterance in utterances],
+        dimensions=UTTERANCE_EMBEDDING_DIMENSIONS,
+    )
+
+
+async def window_batch(
     chat_id: int,
     start_message_id: int,
     window_limit: int,
     *,
     skip_indexed: bool,
-) -> tuple[int, int | None]:
+) -> tuple[list[SearchWindow], int | None]:
+    """Windows to embed from `start_message_id`, and where the next batch starts."""
     messages = await source_messages(chat_id, start_message_id, window_limit)
     if not messages:
-        return 0, None
+        return [], None
     indexed = (
         await existing_windows(chat_id, start_message_id) if skip_indexed else set()
     )
-    windows = build_windows(chat_id, messages, indexed)[:window_limit]
+    windows = final_windows(build_windows(chat_id, messages, indexed))[:window_limit]
     if not windows:
-        return 0, None
-    embeddings = await openrouter_embeddings(
-        EMBEDDING_MODEL,
-        [window.text for window in windows],
-        dimensions=EMBEDDING_DIMENSIONS,
-    )
-    await store_windows(windows, embeddings)
+        return [], None
     last_start_index = next(
         index
         for index, message in enumerate(messages)
@@ -472,6 +524,21 @@ async def index_window_batch(
         if next_start_index < len(messages)
         else None
     )
+    return windows, next_start_message_id
+
+
+async def index_window_batch(
+    chat_id: int,
+    start_message_id: int,
+    window_limit: int,
+    *,
+    skip_indexed: bool,
+) -> tuple[int, int | None]:
+    windows, next_start_message_id = await window_batch(
+        chat_id, start_message_id, window_limit, skip_indexed=skip_indexed
+    )
+    if windows:
+        await store_windows(windows, await embed_windows(windows))
     return len(windows), next_start_message_id
 
 
@@ -488,28 +555,23 @@ async def index_chat_windows(
     return indexed
 
 
-async def index_utterance_batch(
+async def utterance_batch(
     chat_id: int,
     start_message_id: int,
     utterance_limit: int,
     *,
     skip_indexed: bool,
-) -> tuple[int, int | None]:
+) -> tuple[list[SearchUtterance], int | None]:
+    """Utterances to embed from `start_message_id`, and where the next batch starts."""
     messages = await source_messages(chat_id, start_message_id, utterance_limit)
     if not messages:
-        return 0, None
+        return [], None
     indexed = (
         await existing_utterances(chat_id, start_message_id) if skip_indexed else set()
     )
     utterances = build_utterances(chat_id, messages, indexed)[:utterance_limit]
     if not utterances:
-        return 0, None
-    embeddings = await openrouter_embeddings(
-        EMBEDDING_MODEL,
-        [f"{utterance.author}: {utterance.text}" for utterance in utterances],
-        dimensions=UTTERANCE_EMBEDDING_DIMENSIONS,
-    )
-    await store_utterances(utterances, embeddings)
+        return [], None
     last_end_index = next(
         index
         for index, message in enumerate(messages)
@@ -521,6 +583,21 @@ async def index_utterance_batch(
         if next_start_index < len(messages)
         else None
     )
+    return utterances, next_start_message_id
+
+
+async def index_utterance_batch(
+    chat_id: int,
+    start_message_id: int,
+    utterance_limit: int,
+    *,
+    skip_indexed: bool,
+) -> tuple[int, int | None]:
+    utterances, next_start_message_id = await utterance_batch(
+        chat_id, start_message_id, utterance_limit, skip_indexed=skip_indexed
+    )
+    if utterances:
+        await store_utterances(utterances, await embed_utterances(utterances))
     return len(utterances), next_start_message_id
 
 
@@ -537,33 +614,58 @@ async def index_chat_utterances(
     return indexed
 
 
-async def index_pending_utterances(
-    *,
+async def index_fairly(
     chat_ids: list[int],
-    utterance_limit: int = INDEX_BATCH_WINDOWS,
+    limit: int,
+    index_chat: Callable[[int, int], Awaitable[int]],
 ) -> int:
+    """Give each chat an even share of `limit`, then let backlogged chats use
+    what is left. Up to `INDEX_CONCURRENCY` chats are indexed at once.
+    """
     if not chat_ids:
         return 0
 
-    indexed = 0
-    backlogged = []
-    per_chat_limit = max(1, utterance_limit // len(chat_ids))
-    for chat_id in chat_ids:
-        remaining = utterance_limit - indexed
-        if remaining <= 0:
-            break
-        chat_limit = min(per_chat_limit, remaining)
-        chat_indexed = await index_chat_utterances(chat_id, chat_limit)
-        indexed += chat_indexed
-        if chat_indexed == chat_limit:
-            backlogged.append(chat_id)
-
-    for chat_id in backlogged:
-        remaining = utterance_limit - indexed
-        if remaining <= 0:
-            break
-        indexed += await index_chat_utterances(chat_id, remaining)
-    await sync_search_cache()
+    slots = asyncio.Semaphore(INDEX_CONCURRENCY)
+    # Budget held by chats that are running, or that finished and used it.
+    reserved = 0
+
+    async def index_share(chat_id: int, share: int) -> tuple[int, int]:
+        nonlocal reserved
+        async with slots:
+            chat_limit = min(share, limit - reserved)
+            if chat_limit <= 0:
+                return 0, 0
+            reserved += chat_limit
+            chat_indexed = 0
+            try:
+                chat_indexed = await index_chat(chat_id, chat_limit)
+            finally:
+                reserved -= chat_limit - chat_indexed
+            return chat_indexed, chat_limit
+
+    per_chat_limit = max(1, limit // len(chat_ids))
+    results = await asyncio.gather(
+        *(index_share(chat_id, per_chat_limit) for chat_id in chat_ids)
+    )
+    backlogged = [
+        chat_id
+        for chat_id, (chat_indexed, chat_limit) in zip(chat_ids, results, strict=True)
+        if chat_limit and chat_indexed == chat_limit
+    ]
+    results += await asyncio.gather(
+        *(index_share(chat_id, limit) for chat_id in backlogged)
+    )
+    return sum(chat_indexed for chat_indexed, _ in results)
+
+
+async def index_pending_utterances(
+    *,
+    chat_ids: list[int],
+    utterance_limit: int = INDEX_BATCH_WINDOWS,
+) -> int:
+    indexed = await index_fairly(chat_ids, utterance_limit, index_chat_utterances)
+    if chat_ids:
+        await sync_search_cache()
     return indexed
 
 
@@ -572,28 +674,9 @@ async def index_pending_windows(
     chat_ids: list[int],
     window_limit: int = INDEX_BATCH_WINDOWS,
 ) -> int:
-    if not chat_ids:
-        return 0
-
-    indexed = 0
-    backlogged = []
-    per_chat_limit = max(1, window_limit // len(chat_ids))
-    for chat_id in chat_ids:
-        remaining = window_limit - indexed
-        if remaining <= 0:
-            break
-        chat_limit = min(per_chat_limit, remaining)
-        chat_indexed = await index_chat_windows(chat_id, chat_limit)
-        indexed += chat_indexed
-        if chat_indexed == chat_limit:
-            backlogged.append(chat_id)
-
-    for chat_id in backlogged:
-        remaining = window_limit - indexed
-        if remaining <= 0:
-            break
-        indexed += await index_chat_windows(chat_id, remaining)
-    await sync_search_cache()
+    indexed = await index_fairly(chat_ids, window_limit, index_chat_windows)
+    if chat_ids:
+        await sync_search_cache()
     return indexed
 
 
@@ -1,4 +1,3 @@
-import asyncio
 from dataclasses import dataclass
 from itertools import groupby
 
@@ -11,6 +10,7 @@ from chat_search_config import (
     VECTOR_RESULT_COUNT,
 )
 from config.db import TursoRow, get_db
+from config.executors import db_executor
 from management.chat_search_cache import open_search_cache
 from management.chat_search_index import format_author
 
@@ -51,7 +51,7 @@ def telegram_message_link(chat_id: int, message_id: int) -> str | None:
 
 async def vector_search_candidates(
     chat_id: int,
-    query_vector: str,
+    query_vector: bytes,
     result_count: int,
 ) -> list[SearchCandidate]:
     def search() -> list[tuple]:
@@ -80,7 +80,7 @@ async def vector_search_candidates(
         finally:
             connection.close()
 
-    rows = await asyncio.to_thread(search)
+    rows = await db_executor.run(search)
 
     return [SearchCandidate(remote_id=row[0], score=1 - row[1]) for row in rows]
 
@@ -0,0 +1,266 @@
+"""Write-behind buffer that turns per-message writes into periodic batches."""
+
+import asyncio
+import itertools
+import os
+from collections.abc import Callable, Hashable
+from contextlib import suppress
+
+from config.db import get_db
+from config.logger import logger
+
+INGESTION_FLUSH_ROWS = int(os.environ.get("INGESTION_FLUSH_ROWS", "200"))
+INGESTION_FLUSH_SECONDS = float(os.environ.get("INGESTION_FLUSH_MS", "1000")) / 1000
+# Rows held while the database is unreachable; new rows past this are dropped.
+INGESTION_MAX_ROWS = int(os.environ.get("INGESTION_MAX_ROWS", "20000"))
+# Failed flushes in a row before the buffered rows are given up on.
+INGESTION_MAX_ATTEMPTS = int(os.environ.get("INGESTION_MAX_ATTEMPTS", "10"))
+INGESTION_RETRY_MAX_SECONDS = 30
+
+type Row = tuple[str, Hashable]
+
+
+class IngestionBuffer:
+    """Collects rows per statement and writes each statement with `executemany`.
+
+    A row added with a `key` replaces any pending row for the same statement and
+    key, so repeated upserts for one user collapse into the latest one; an
+    `on_flush` callback runs once its row has been committed.
+
+    Rows of a failed flush stay buffered. The retry halves the batch until the
+    rows that fail on their own are found, and drops those. After
+    `max_attempts` failed flushes in a row, or past `max_rows`, rows are dropped
+    too; both show up in `metrics`.
+    """
+
+    def __init__(
+        self,
+        *,
+        flush_rows: int,
+        flush_seconds: float,
+        max_rows: int = INGESTION_MAX_ROWS,
+        max_attempts: int = INGESTION_MAX_ATTEMPTS,
+    ):
+        self._flush_rows = flush_rows
+        self._flush_seconds = flush_seconds
+        self._max_rows = max_rows
+        self._max_attempts = max_attempts
+        self._pending: dict[str, dict[Hashable, object]] = {}
+        self._size = 0
+        self._on_flush: dict[Row, Callable[[], None]] = {}
+        self._failures = 0
+        self._dropped = 0
+        self._rejected = 0
+        self._sequence = itertools.count()
+        self._lock = asyncio.Lock()
+        self._wake: asyncio.Event | None = None
+        self._flusher: asyncio.Task[None] | None = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def metrics(self) -> dict[str, int]:
+        return {
+            "buffered": self._size,
+            "failures": self._failures,
+            "dropped": self._dropped,
+            "rejected": self._rejected,
+        }
+
+    def add(
+        self,
+        sql: str,
+        params: object,
+        *,
+        key: Hashable | None = None,
+        on_flush: Callable[[], None] | None = None,
+    ) -> None:
+        rows = self._pending.setdefault(sql, {})
+        row_key = ("row", next(self._sequence)) if key is None else ("key", key)
+        if row_key not in rows and self._size >= self._max_rows:
+            self._dropped += 1
+            if self._dropped % 1000 == 1:
+                logger.warning(
+                    "Ingestion buffer is full at %s rows; %d rows dropped so far",
+                    self._size,
+                    self._dropped,
+                )
+            return
+        before = len(rows)
+        rows[row_key] = params
+        self._size += len(rows) - before
+        if on_flush:
+            self._on_flush[sql, row_key] = on_flush
+        else:
+            self._on_flush.pop((sql, row_key), None)
+        wake = self._start()
+        if self._size >= self._flush_rows:
+            wake.set()
+
+    async def flush(self) -> int:
+        async with self._lock:
+            pending, self._pending, self._size = self._pending, {}, 0
+            on_flush, self._on_flush = self._on_flush, {}
+            rows = [(sql, key) for sql, group in pending.items() for key in group]
+            if not rows:
+                return 0
+            written: list[Row] = []
+            failed: list[tuple[Row, Exception]] = []
+            try:
+                if self._failures:
+                    await self._write_isolating(pending, rows, written, failed)
+                    if failed and not written:
+                        raise failed[0][1]
+                else:
+                    await self._write(pending, rows)
+                    written = rows
+            except BaseException:
+                self._failures += 1
+                self._committed(on_flush, written)
+                self._settle(pending, on_flush, written)
+                raise
+            self._committed(on_flush, written)
+            self._failures = 0
+            if failed:
+                self._rejected += len(failed)
+                logger.warning(
+                    "Dropped %d ingestion rows that fail on their own: %s",
+                    len(failed),
+                    failed[0][1],
+                )
+            return len(written)
+
+    @staticmethod
+    def _committed(on_flush: dict[Row, Callable[[], None]], written: list[Row]) -> None:
+        for row in written:
+            if callback := on_flush.pop(row, None):
+                callback()
+
+    async def _write(
+        self, pending: dict[str, dict[Hashable, object]], rows: list[Row]
+    ) -> None:
+        statements: dict[str, list[object]] = {}
+        for sql, key in rows:
+            statements.setdefault(sql, []).append(pending[sql][key])
+        async with get_db() as conn, conn.transaction():
+            for sql, params in statements.items():
+                await conn.executemany(sql, params)
+
+    async def _write_isolating(
+        self,
+        pending: dict[str, dict[Hashable, object]],
+        rows: list[Row],
+        written: list[Row],
+        failed: list[tuple[Row, Exception]],
+    ) -> None:
+        """Write `rows`, halving a failing batch down to the rows at fault.
+
+        A second row failing alone before anything was written points at the
+        database rather than the rows, so that error is raised instead.
+        """
+        try:
+            await self._write(pending, rows)
+        except Exception as exc:
+            if len(rows) > 1:
+                middle = len(rows) // 2
+                await self._write_isolating(pending, rows[:middle], written, failed)
+                await self._write_isolating(pending, rows[middle:], written, failed)
+            elif failed and not written:
+                raise
+            else:
+                failed.append((rows[0], exc))
+        else:
+            written += rows
+
+    def _settle(
+        self,
+        pending: dict[str, dict[Hashable, object]],
+        on_flush: dict[Row, Callable[[], None]],
+        written: list[Row],
+    ) -> None:
+        """Requeue the rows a failed flush did not write, or drop them for good."""
+        for sql, key in written:
+            del pending[sql][key]
+        unwritten = sum(len(rows) for rows in pending.values())
+        if self._failures < self._max_attempts:
+            self._restore(pending, on_flush)
+            return
+        logger.warning(
+            "Dropped %d ingestion rows after %d failed flushes",
+            unwritten,
+            self._failures,
+        )
+        self._dropped += unwritten
+        self._failures = 0
+
+    def _restore(
+        self,
+        pending: dict[str, dict[Hashable, object]],
+        on_flush: dict[Row, Callable[[], None]],
+    ) -> None:
+        """Put unwritten rows back ahead of the ones added since the flush began.
+
+        A keyed row added in the meantime is newer, so it keeps its place.
+        """
+        for sql, rows in self._pending.items():
+            for key in rows:
+                on_flush.pop((sql, key), None)
+            pending.setdefault(sql, {}).update(rows)
+        on_flush.update(self._on_flush)
+        self._pending = {sql: rows for sql, rows in pending.items() if rows}
+        self._size = sum(len(rows) for rows in pending.values())
+        self._on_flush = on_flush
+
+    async def close(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flusher
+            self._flusher = None
+        try:
+            await self.flush()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Final ingestion flush failed: %s", exc)
+
+    def _start(self) -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+        if (
+            self._wake is None
+            or self._flusher is None
+            or self._flusher.done()
+            or self._flusher.get_loop() is not loop
+        ):
+            self._wake = asyncio.Event()
+            self._flusher = loop.create_task(self._flush_periodically(self._wake))
+        return self._wake
+
+    async def _flush_periodically(self, wake: asyncio.Event) -> None:
+        failures = 0
+        while True:
+            with suppress(TimeoutError):
+                async with asyncio.timeout(self._flush_seconds):
+                    await wake.wait()
+            wake.clear()
+            try:
+                await self.flush()
+            except Exception as exc:  # noqa: BLE001
+                failures += 1
+                delay = min(
+                    self._flush_seconds * 2**failures, INGESTION_RETRY_MAX_SECONDS
+                )
+                logger.warning(
+                    "Ingestion flush of %s rows failed; retrying in %.1fs: %s",
+                    self._size,
+                    delay,
+                    exc,
+                )
+                await asyncio.sleep(delay)
+            else:
+                failures = 0
+
+
+ingestion_buffer = IngestionBuffer(
+    flush_rows=INGESTION_FLUSH_ROWS,
+    flush_seconds=INGESTION_FLUSH_SECONDS,
+)
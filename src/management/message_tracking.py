@@ -8,6 +8,7 @@ from telegram.ext import (
 from management.chat_memory import process_mentions, save_message_stats
 from utils.concurrency import schedule_background_task
 from utils.messages import get_message
+from utils.update_context import update_context
 
 
 async def handle_message_stats(update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
@@ -20,10 +21,7 @@ async def handle_message_stats(update: Update, _: ContextTypes.DEFAULT_TYPE) ->
     if not message.text or message.text.startswith("/"):
         return
 
-    schedule_background_task(
-        save_message_stats(message),
-        "message-stats",
-    )
+    await save_message_stats(message, await update_context(update).settings())
 
 
 async def handle_mentions(update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
@@ -32,16 +30,18 @@ async def handle_mentions(update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
     if not message or not message.from_user:
         return
 
-    schedule_background_task(
+    await schedule_background_task(
         process_mentions(message),
         "message-mentions",
     )
 
 
+# Blocking, so they run inside the update's per-chat ordered slot (see
+# `ChatFairUpdateProcessor`) and see a chat's messages in arrival order. Both
+# only queue work, so they do not hold up the later handler groups for long.
 message_stats_handler = MessageHandler(
     filters.TEXT & ~filters.COMMAND,
     handle_message_stats,
-    block=False,
 )
 
 mention_handler = MessageHandler(
@@ -52,5 +52,4 @@ mention_handler = MessageHandler(
         | filters.REPLY
     ),
     handle_mentions,
-    block=False,
 )
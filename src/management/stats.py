@@ -9,7 +9,7 @@ from telegram.helpers import mention_html
 
 import commands
 import utils
-from config.db import get_db
+from config.db import get_db, get_read_db
 from management.chat_memory import chat_stats_summary, last_seen_in_chat
 from utils import readable_time
 from utils.decorators import command
@@ -190,7 +190,7 @@ async def get_user_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     if context.args and "@" in context.args[0]:
         async with (
-            get_db() as conn,
+            get_read_db() as conn,
             conn.execute(
                 "SELECT user_id, username FROM user_stats WHERE LOWER(username) = ?",
                 (context.args[0].split("@", 1)[1].lower(),),
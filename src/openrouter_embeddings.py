@@ -1,4 +1,78 @@
-import json
+import asyncio
+import os
+import struct
+import time
+from dataclasses import dataclass
+
+import openai
+
+from config.logger import logger
+
+# Estimated tokens per embedding request; adjusted between the floor and this.
+EMBEDDING_BATCH_TOKENS = int(os.environ.get("EMBEDDING_BATCH_TOKENS", "32000"))
+EMBEDDING_MIN_BATCH_TOKENS = int(os.environ.get("EMBEDDING_MIN_BATCH_TOKENS", "2000"))
+EMBEDDING_REQUEST_CONCURRENCY = int(
+    os.environ.get("EMBEDDING_REQUEST_CONCURRENCY", "4")
+)
+# Requests slower than this shrink the budget; faster ones grow it back.
+EMBEDDING_TARGET_SECONDS = float(os.environ.get("EMBEDDING_TARGET_SECONDS", "5"))
+# Chat text with handles, timestamps and IDs runs to about 3 characters a token.
+CHARS_PER_TOKEN = 3
+EMBEDDING_RETRY_SECONDS = 2.0
+# How providers word a 400 for input over the model's context or request limit.
+TOO_LARGE_HINTS = ("too large", "too long", "context length", "maximum context")
+
+
+@dataclass
+class BatchSizer:
+    """Token budget per request: grown while requests are fast, cut back when
+    they are slow or rejected as too large.
+    """
+
+    budget: int = EMBEDDING_BATCH_TOKENS
+    minimum: int = EMBEDDING_MIN_BATCH_TOKENS
+    maximum: int = EMBEDDING_BATCH_TOKENS
+    target_seconds: float = EMBEDDING_TARGET_SECONDS
+    requests: int = 0
+    failures: int = 0
+
+    def observe(self, seconds: float) -> None:
+        self.requests += 1
+        if seconds > self.target_seconds:
+            self.budget = max(self.minimum, self.budget * 3 // 4)
+        else:
+            self.budget = min(self.maximum, self.budget + self.maximum // 8)
+
+    def failed(self) -> None:
+        self.failures += 1
+        self.budget = max(self.minimum, self.budget // 2)
+
+
+batch_sizer = BatchSizer()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack_batches(inputs: list[str], budget: int) -> list[list[str]]:
+    """Consecutive runs of `inputs` that fit `budget` estimated tokens each.
+
+    An input over the budget on its own still gets a batch of its own.
+    """
+    batches: list[list[str]] = []
+    current: list[str] = []
+    used = 0
+    for text in inputs:
+        tokens = estimate_tokens(text)
+        if current and used + tokens > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(text)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
 
 
 async def openrouter_embeddings(
@@ -6,6 +80,120 @@ async def openrouter_embeddings(
     inputs: list[str],
     *,
     dimensions: int,
+) -> list[list[float]]:
+    """Embed `inputs`, asking the API only for text not in the local cache."""
+    from management.chat_search_cache import cached_embeddings, store_embeddings
+
+    embeddings = await cached_embeddings(model, dimensions, inputs)
+    missing = list(
+        dict.fromkeys(
+            text
+            for text, embedding in zip(inputs, embeddings, strict=True)
+            if embedding is None
+        )
+    )
+    if not missing:
+        return [embedding for embedding in embeddings if embedding is not None]
+
+    slots = asyncio.Semaphore(EMBEDDING_REQUEST_CONCURRENCY)
+    results = await asyncio.gather(
+        *(
+            _embed_batch(model, batch, dimensions, slots)
+            for batch in pack_batches(missing, batch_sizer.budget)
+        )
+    )
+    fetched = dict(
+        zip(
+            missing,
+            (embedding for batch in results for embedding in batch),
+            strict=True,
+        )
+    )
+    for embedding in fetched.values():
+        if len(embedding) != dimensions:
+            raise RuntimeError(
+                f"Expected {dimensions} embedding dimensions, got {len(embedding)}"
+            )
+    await store_embeddings(
+        model,
+        dimensions,
+        missing,
+        [vector32_blob(fetched[text]) for text in missing],
+    )
+    return [
+        fetched[text] if embedding is None else embedding
+        for text, embedding in zip(inputs, embeddings, strict=True)
+    ]
+
+
+def _too_large(exc: Exception) -> bool:
+    """Whether the request was rejected for its size, so halves may succeed."""
+    if not isinstance(exc, openai.APIStatusError):
+        return False
+    message = str(exc).lower()
+    return exc.status_code == 413 or (
+        exc.status_code == 400 and any(hint in message for hint in TOO_LARGE_HINTS)
+    )
+
+
+def _transient(exc: Exception) -> bool:
+    return isinstance(
+        exc,
+        openai.APIConnectionError | openai.RateLimitError | openai.InternalServerError,
+    )
+
+
+async def _embed_batch(
+    model: str,
+    inputs: list[str],
+    dimensions: int,
+    slots: asyncio.Semaphore,
+    *,
+    retried: bool = False,
+) -> list[list[float]]:
+    """One request for `inputs`.
+
+    A request rejected as too large is retried as two halves; a timeout, rate
+    limit or server error is retried once as is. Anything else is raised.
+    """
+    try:
+        async with slots:
+            started = time.perf_counter()
+            embeddings = await _request_embeddings(model, inputs, dimensions=dimensions)
+    except Exception as exc:
+        if _transient(exc) and not retried:
+            logger.warning(
+                "Embedding request for %d inputs failed, retrying it: %s",
+                len(inputs),
+                exc,
+            )
+            await asyncio.sleep(EMBEDDING_RETRY_SECONDS)
+            return await _embed_batch(model, inputs, dimensions, slots, retried=True)
+        if not _too_large(exc) or len(inputs) == 1:
+            raise
+        batch_sizer.failed()
+        logger.warning(
+            "Embedding request for %d inputs failed, splitting it: %s",
+            len(inputs),
+            exc,
+        )
+        middle = len(inputs) // 2
+        first, second = await asyncio.gather(
+            _embed_batch(model, inputs[:middle], dimensions, slots),
+            _embed_batch(model, inputs[middle:], dimensions, slots),
+        )
+        return first + second
+    batch_sizer.observe(time.perf_counter() - started)
+    if len(embeddings) != len(inputs):
+        raise RuntimeError(f"Expected {len(inputs)} embeddings, got {len(embeddings)}")
+    return embeddings
+
+
+async def _request_embeddings(
+    model: str,
+    inputs: list[str],
+    *,
+    dimensions: int,
 ) -> list[list[float]]:
     from commands.ai import openrouter_provider
 
@@ -15,14 +203,9 @@ async def openrouter_embeddings(
         dimensions=dimensions,
         extra_body={"provider": {"sort": "latency"}},
     )
-    embeddings = [item.embedding for item in response.data]
-    for embedding in embeddings:
-        if len(embedding) != dimensions:
-            raise RuntimeError(
-                f"Expected {dimensions} embedding dimensions, got {len(embedding)}"
-            )
-    return embeddings
+    return [item.embedding for item in response.data]
 
 
-def vector32_json(embedding: list[float]) -> str:
-    return json.dumps(embedding, separators=(",", ":"))
+def vector32_blob(embedding: list[float]) -> bytes:
+    """Little-endian float32 bytes, the F32_BLOB layout libsql stores."""
+    return struct.pack(f"<{len(embedding)}f", *embedding)
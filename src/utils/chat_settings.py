@@ -0,0 +1,65 @@
+"""Process-local cache of the per-chat settings read on every message."""
+
+import os
+import time
+from dataclasses import dataclass
+
+from config.db import get_db
+
+SETTINGS_CACHE_TTL_SECONDS = float(os.environ.get("SETTINGS_CACHE_TTL_SECONDS", "300"))
+
+
+@dataclass(frozen=True)
+class ChatSettings:
+    fts: bool
+    auto_dl: bool
+    whitelisted: frozenset[str]
+
+
+_cache: dict[int, tuple[float, ChatSettings]] = {}
+_generation = 0
+
+
+async def get_chat_settings(chat_id: int) -> ChatSettings:
+    """Settings for `chat_id`, reloaded after invalidation or the TTL."""
+    cached = _cache.get(chat_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    generation = _generation
+    async with get_db() as conn:
+        async with conn.execute(
+            "SELECT fts, auto_dl FROM group_settings WHERE chat_id = ?",
+            (chat_id,),
+        ) as cursor:
+            row = await cursor.fetchone()
+        async with conn.execute(
+            """
+            SELECT command
+            FROM command_whitelist
+            WHERE whitelist_type = 'chat' AND whitelist_id = ?
+            """,
+            (chat_id,),
+        ) as cursor:
+            commands = frozenset(item["command"] for item in await cursor.fetchall())
+
+    settings = ChatSettings(
+        fts=bool(row and row["fts"]),
+        auto_dl=bool(row and row["auto_dl"]),
+        whitelisted=commands,
+    )
+    # Loaded from the primary, not the replica, which may not have synced our
+    # write yet. A change that landed while we were loading makes this stale.
+    if generation == _generation:
+        _cache[chat_id] = (time.monotonic() + SETTINGS_CACHE_TTL_SECONDS, settings)
+    return settings
+
+
+def invalidate_chat_settings(chat_id: int | None = None) -> None:
+    """Drop cached settings for one chat, or for every chat."""
+    global _generation
+    _generation += 1
+    if chat_id is None:
+        _cache.clear()
+    else:
+        _cache.pop(chat_id, None)
@@ -4,29 +4,152 @@ from __future__ import annotations
 
 import asyncio
 from collections.abc import Coroutine
+from dataclasses import asdict, dataclass
+from enum import StrEnum
 
 from config.logger import logger
 
 
-def schedule_background_task[T](
-    coro: Coroutine[object, object, T],
-    label: str,
-) -> None:
-    """Fire-and-forget a coroutine while bubbling failures to the logs."""
+class OverflowPolicy(StrEnum):
+    # Cosmetic work is discarded when its lane is full.
+    DROP = "drop"
+    # Work that must land makes the caller wait for room instead.
+    BLOCK = "block"
+
+
+@dataclass(frozen=True)
+class TaskLimit:
+    concurrency: int
+    queue_size: int
+    overflow: OverflowPolicy
+
+
+@dataclass
+class TaskCounters:
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    dropped: int = 0
+    failed: int = 0
+
+
+TASK_LIMITS = {
+    "typing-indicator": TaskLimit(8, 32, OverflowPolicy.DROP),
+    "command-reaction": TaskLimit(8, 32, OverflowPolicy.DROP),
+    "command-event": TaskLimit(4, 256, OverflowPolicy.BLOCK),
+    "message-mentions": TaskLimit(4, 256, OverflowPolicy.BLOCK),
+}
+DEFAULT_TASK_LIMIT = TaskLimit(8, 128, OverflowPolicy.BLOCK)
+
+
+class _Lane:
+    def __init__(self, limit: TaskLimit):
+        self.limit = limit
+        self.counters = TaskCounters()
+        # Admission covers queued and running tasks; slots cover running ones.
+        self.admission = asyncio.Semaphore(limit.concurrency + limit.queue_size)
+        self.slots = asyncio.Semaphore(limit.concurrency)
+        self.tasks: set[asyncio.Task[object]] = set()
+
+
+class BackgroundScheduler:
+    """Runs fire-and-forget coroutines in per-label lanes of bounded size.
 
-    try:
+    Each label gets `concurrency` running tasks and `queue_size` waiting ones.
+    Once a lane is full, `DROP` lanes discard new work and `BLOCK` lanes make
+    the submitter wait, so a backlog cannot pile up tasks and connections.
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, TaskLimit],
+        default: TaskLimit,
+    ):
+        self.limits = limits
+        self.default = default
+        self._lanes: dict[str, _Lane] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _lane(self, label: str) -> _Lane:
         loop = asyncio.get_running_loop()
-    except RuntimeError:
-        return
+        if self._loop is not loop:
+            # Semaphores belong to the loop that first waits on them.
+            self._loop = loop
+            self._lanes = {}
+        lane = self._lanes.get(label)
+        if lane is None:
+            lane = self._lanes[label] = _Lane(self.limits.get(label, self.default))
+        return lane
+
+    async def submit[T](self, coro: Coroutine[object, object, T], label: str) -> bool:
+        """Queue `coro` in its label's lane. Returns False if it was dropped."""
+        lane = self._lane(label)
+        if lane.limit.overflow is OverflowPolicy.DROP and lane.admission.locked():
+            lane.counters.dropped += 1
+            coro.close()
+            logger.debug("Dropped background task '%s': lane is full", label)
+            return False
 
-    task = loop.create_task(coro)
+        await lane.admission.acquire()
+        lane.counters.queued += 1
+        task = asyncio.get_running_loop().create_task(self._run(lane, coro, label))
+        lane.tasks.add(task)
+        task.add_done_callback(lane.tasks.discard)
+        return True
 
-    def _log_task_result(completed: asyncio.Task[T]) -> None:
+    async def _run[T](
+        self, lane: _Lane, coro: Coroutine[object, object, T], label: str
+    ) -> None:
+        counters = lane.counters
+        started = False
         try:
-            completed.result()
+            async with lane.slots:
+                started = True
+                counters.queued -= 1
+                counters.running += 1
+                try:
+                    await coro
+                finally:
+                    counters.running -= 1
+            counters.completed += 1
         except asyncio.CancelledError:
             logger.debug("Background task '%s' cancelled", label)
+            raise
         except Exception as exc:  # noqa: BLE001
+            counters.failed += 1
             logger.warning("Background task '%s' failed: %s", label, exc, exc_info=exc)
+        finally:
+            if not started:
+                counters.queued -= 1
+            coro.close()
+            lane.admission.release()
+
+    async def drain(self, timeout: float) -> None:
+        """Wait up to `timeout` seconds for admitted tasks, then cancel the rest."""
+        tasks = {task for lane in self._lanes.values() for task in lane.tasks}
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def metrics(self) -> dict[str, dict[str, int]]:
+        return {
+            label: asdict(lane.counters) for label, lane in sorted(self._lanes.items())
+        }
+
+
+background_tasks = BackgroundScheduler(TASK_LIMITS, DEFAULT_TASK_LIMIT)
+
+
+async def schedule_background_task[T](
+    coro: Coroutine[object, object, T],
+    label: str,
+) -> bool:
+    """Fire-and-forget a coroutine while bubbling failures to the logs.
+
+    Waits for room only when `label` uses the `BLOCK` overflow policy.
+    """
 
-    task.add_done_callback(_log_task_result)
+    return await background_tasks.submit(coro, label)
@@ -0,0 +1,98 @@
+"""Per-chat highlight matchers, compiled once and reused for every message."""
+
+import os
+import time
+from collections import deque
+from collections.abc import Sequence
+
+from config.db import TursoRow, get_db
+
+HIGHLIGHT_CACHE_TTL_SECONDS = float(
+    os.environ.get("HIGHLIGHT_CACHE_TTL_SECONDS", "300")
+)
+
+
+class HighlightMatcher:
+    """Aho-Corasick automaton over a chat's lowercased highlight strings.
+
+    `matches` finds every highlight contained in a message in one pass over the
+    text, however many highlights the chat has.
+    """
+
+    def __init__(self, highlights: Sequence[TursoRow]):
+        self._highlights = list(highlights)
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail = [0]
+        self._output: list[list[int]] = [[]]
+
+        for index, highlight in enumerate(self._highlights):
+            state = 0
+            for char in highlight["string"].lower():
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] += self._output[self._fail[child]]
+
+    def __len__(self) -> int:
+        return len(self._highlights)
+
+    def matches(self, text: str) -> list[TursoRow]:
+        found: set[int] = set()
+        state = 0
+        for char in text.lower():
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            found.update(self._output[state])
+        return [self._highlights[index] for index in sorted(found)]
+
+
+_matchers: dict[int, tuple[float, HighlightMatcher]] = {}
+_generation = 0
+
+
+async def get_highlight_matcher(chat_id: int) -> HighlightMatcher:
+    """Matcher for `chat_id`, rebuilt after invalidation or the TTL."""
+    cached = _matchers.get(chat_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    generation = _generation
+    async with (
+        get_db() as conn,
+        conn.execute(
+            "SELECT * FROM highlights WHERE chat_id = ?", (chat_id,)
+        ) as cursor,
+    ):
+        matcher = HighlightMatcher(await cursor.fetchall())
+    # Loaded from the primary, not the replica, which may not have synced our
+    # write yet. A change that landed while we were loading makes this stale.
+    if generation == _generation:
+        now = time.monotonic()
+        # Chats that stopped posting would otherwise stay cached forever.
+        for expired in [key for key, item in _matchers.items() if item[0] <= now]:
+            del _matchers[expired]
+        _matchers[chat_id] = (now + HIGHLIGHT_CACHE_TTL_SECONDS, matcher)
+    return matcher
+
+
+def invalidate_highlight_matcher(chat_id: int) -> None:
+    global _generation
+    _generation += 1
+    _matchers.pop(chat_id, None)
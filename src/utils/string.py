@@ -4,7 +4,7 @@ from async_lru import alru_cache
 from telegram.error import BadRequest, TelegramError
 from telegram.ext import ContextTypes
 
-from config.db import get_db
+from config.db import get_db, get_read_db
 
 
 async def readable_time(input_timestamp: int) -> str:
@@ -31,7 +31,7 @@ async def get_username(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> str:
     Get the username and/or first_name for a user_id.
     """
     async with (
-        get_db() as conn,
+        get_read_db() as conn,
         conn.execute(
             "SELECT username FROM user_stats WHERE user_id = ?",
             (user_id,),
@@ -72,7 +72,7 @@ async def get_user_id_from_username(username: str) -> int | None:
     Get the user_id from a username.
     """
     async with (
-        get_db() as conn,
+        get_read_db() as conn,
         conn.execute(
             "SELECT user_id FROM user_stats WHERE LOWER(username) = ?",
             (username.lower().replace("@", ""),),
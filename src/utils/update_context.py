@@ -0,0 +1,73 @@
+"""Chat state shared by every handler group that processes one update."""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from typing import Any
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from utils.chat_settings import ChatSettings, get_chat_settings
+from utils.highlights import HighlightMatcher, get_highlight_matcher
+
+_current: ContextVar["UpdateContext | None"] = ContextVar(
+    "update_context", default=None
+)
+
+
+class UpdateContext:
+    """Loads chat state on first use and hands the same result to later handlers.
+
+    Handlers registered with `block=False` may run concurrently, so each value
+    is memoized as a task and concurrent callers share one query.
+    """
+
+    def __init__(self, update: Update):
+        self.update = update
+        chat = update.effective_chat
+        self.chat_id = chat.id if chat else None
+        self._loaded: dict[str, asyncio.Future[Any]] = {}
+
+    async def settings(self) -> ChatSettings:
+        chat_id = self.chat_id
+        if chat_id is None:
+            return ChatSettings(fts=False, auto_dl=False, whitelisted=frozenset())
+        return await self._memoized("settings", lambda: get_chat_settings(chat_id))
+
+    async def highlights(self) -> HighlightMatcher:
+        chat_id = self.chat_id
+        if chat_id is None:
+            return HighlightMatcher([])
+        return await self._memoized(
+            "highlights", lambda: get_highlight_matcher(chat_id)
+        )
+
+    async def _memoized[T](self, key: str, load: Callable[[], Awaitable[T]]) -> T:
+        loaded = self._loaded.get(key)
+        # A failed load is retried by the next caller rather than cached.
+        if loaded is None or (
+            loaded.done() and (loaded.cancelled() or loaded.exception() is not None)
+        ):
+            loaded = self._loaded[key] = asyncio.ensure_future(load())
+            # The load outlives a cancelled caller; retrieve its error so one
+            # nobody is waiting for is not reported as never retrieved.
+            loaded.add_done_callback(_retrieve_exception)
+        return await asyncio.shield(loaded)
+
+
+def _retrieve_exception(loaded: asyncio.Future[Any]) -> None:
+    if not loaded.cancelled():
+        loaded.exception()
+
+
+async def bind_update_context(update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
+    """Run first (group -1) so later handler groups share one context."""
+    _current.set(UpdateContext(update))
+
+
+def update_context(update: Update) -> UpdateContext:
+    current = _current.get()
+    if current is not None and current.update is update:
+        return current
+    return UpdateContext(update)
@@ -0,0 +1,117 @@
+"""Update processing that is bounded globally and fair between chats."""
+
+import asyncio
+import contextlib
+import os
+from collections.abc import Awaitable
+from dataclasses import dataclass, field
+from typing import Any
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+UPDATE_CONCURRENCY = int(os.environ.get("UPDATE_CONCURRENCY", "64"))
+UPDATE_PER_CHAT_CONCURRENCY = int(os.environ.get("UPDATE_PER_CHAT_CONCURRENCY", "4"))
+UPDATE_MAX_PENDING = int(os.environ.get("UPDATE_MAX_PENDING", "1024"))
+
+
+@dataclass
+class _ChatLane:
+    slots: asyncio.Semaphore
+    order: asyncio.Lock = field(default_factory=asyncio.Lock)
+    pending: int = 0
+    running: int = 0
+
+
+def _is_ordered(update: object) -> bool:
+    """Plain messages feed message tracking, so they keep their arrival order."""
+    if not isinstance(update, Update) or update.callback_query:
+        return False
+    message = update.effective_message
+    return message is not None and not (message.text or "").startswith("/")
+
+
+class ChatFairUpdateProcessor(BaseUpdateProcessor):
+    """Caps running updates globally and per chat, in arrival order per chat.
+
+    Each chat may run `per_chat` updates at once, so one busy group cannot take
+    every slot. Plain messages in a chat run one at a time in the order they
+    arrived. Commands and callbacks only count against the chat's cap, so a long
+    /video does not hold up the rest of the chat. The global slot is taken after
+    the chat's, so updates queued behind a busy chat do not hold global slots.
+    """
+
+    def __init__(
+        self,
+        max_running: int = UPDATE_CONCURRENCY,
+        per_chat: int = UPDATE_PER_CHAT_CONCURRENCY,
+        max_pending: int = UPDATE_MAX_PENDING,
+    ):
+        # The base class semaphore bounds admitted updates, queued or running.
+        super().__init__(max(max_pending, max_running))
+        self.max_running = max_running
+        self.per_chat = per_chat
+        self._running = asyncio.Semaphore(max_running)
+        self._chats: dict[int, _ChatLane] = {}
+        self._active = 0
+
+    async def do_process_update(
+        self,
+        update: object,
+        coroutine: Awaitable[Any],
+    ) -> None:
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            async with self._running:
+                await self._run(coroutine)
+            return
+
+        lane = self._chats.get(chat.id)
+        if lane is None:
+            lane = self._chats[chat.id] = _ChatLane(asyncio.Semaphore(self.per_chat))
+        order = lane.order if _is_ordered(update) else contextlib.nullcontext()
+        lane.pending += 1
+        started = False
+        try:
+            async with lane.slots, order, self._running:
+                started = True
+                lane.pending -= 1
+                lane.running += 1
+                try:
+                    await self._run(coroutine)
+                finally:
+                    lane.running -= 1
+        finally:
+            if not started:
+                lane.pending -= 1
+            if not lane.pending and not lane.running:
+                self._chats.pop(chat.id, None)
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        self._active += 1
+        try:
+            await coroutine
+        finally:
+            self._active -= 1
+
+    def queue_depths(self) -> dict[int, int]:
+        """Updates per chat that are admitted but not yet running."""
+        return {
+            chat_id: lane.pending
+            for chat_id, lane in self._chats.items()
+            if lane.pending
+        }
+
+    def metrics(self) -> dict[str, int]:
+        return {
+            "running": self._active,
+            "pending": sum(lane.pending for lane in self._chats.values()),
+            "admitted": self.current_concurrent_updates,
+            "chats": len(self._chats),
+        }
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
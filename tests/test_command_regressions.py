@@ -1,15 +1,18 @@
 from __future__ import annotations
 
 import ast
+import asyncio
 import base64
+import gc
 import importlib
 import io
 import json
 import os
 import tempfile
+import threading
 import unittest
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import UTC, datetime
 from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
@@ -26,8 +29,16 @@ os.environ.setdefault("TURSO_AUTH_TOKEN", "test-token")
 
 chat_memory = importlib.import_module("management.chat_memory")
 chat_search = importlib.import_module("management.chat_search")
+ingestion = importlib.import_module("management.ingestion")
+chat_settings = importlib.import_module("utils.chat_settings")
+update_context_module = importlib.import_module("utils.update_context")
+highlights_module = importlib.import_module("utils.highlights")
+highlight_module = importlib.import_module("commands.highlight")
 commands_module = importlib.import_module("commands")
 db = importlib.import_module("config.db")
+executors = importlib.import_module("config.executors")
+concurrency = importlib.import_module("utils.concurrency")
+update_processor = importlib.import_module("utils.update_processor")
 migrate = importlib.import_module("migrate")
 ask_module = importlib.import_module("commands.ask")
 animals_module = importlib.import_module("commands.animals")
@@ -58,6 +69,7 @@ def search_database(path: str):
     for filename in (
         "20240624131537_init.py",
         "20240917172646_user_stats.py",
+        "20260514000000_add_auto_dl.py",
         "20260815000000_search_foundations.py",
         "20260817000000_search_event_lane.py",
     ):
@@ -142,19 +154,20 @@ class FakeResponse:
     async def json(self):
         return self.data
 
+    async def read(self):
+        return json.dumps(self.data).encode()
 
-class FakeUrlOpenResponse:
-    def __init__(self, data: object) -> None:
-        self.data = data
 
-    def __enter__(self):
-        return self
+class FakeHranaSession:
+    def __init__(self, respond) -> None:
+        self.respond = respond
+        self.requests: list[dict[str, object]] = []
 
-    def __exit__(self, *_args):
-        return None
-
-    def read(self) -> bytes:
-        return json.dumps(self.data).encode()
+    def post(self, url: str, **kwargs):
+        self.requests.append(
+            {"url": url, "body": kwargs["json"], "headers": kwargs["headers"]}
+        )
+        return FakeResponse(self.respond(kwargs["json"]))
 
 
 class FakeSession:
@@ -257,6 +270,15 @@ class FakeSyncConnection:
         self.closed = True
 
 
+class FakeReplicaConnection(FakeSyncConnection):
+    def __init__(self) -> None:
+        super().__init__()
+        self.syncs = 0
+
+    def sync(self):
+        self.syncs += 1
+
+
 class CommandRegressionTests(unittest.IsolatedAsyncioTestCase):
     def test_registered_commands_have_user_facing_help_metadata(self):
         for command in commands_module.list_of_commands:
@@ -920,28 +942,53 @@ class CommandRegressionTests(unittest.IsolatedAsyncioTestCase):
         )
         self.assertIsNone(stats_module._message_link(12345, 1, None))
 
-    async def test_process_mentions_uses_telegram_entity_parser(self):
-        entity = SimpleNamespace(type=MessageEntity.MENTION)
+    async def test_process_mentions_stores_all_mentions_in_one_statement(self):
+        handles = iter(["@KnownUser", "@ghost"])
+        mention = SimpleNamespace(type=MessageEntity.MENTION)
+        text_mention = SimpleNamespace(
+            type=MessageEntity.TEXT_MENTION, user=SimpleNamespace(id=3)
+        )
         message = SimpleNamespace(
             from_user=SimpleNamespace(id=1),
-            entities=[entity],
-            text="😀 @knownuser",
-            reply_to_message=None,
-            parse_entity=lambda parsed_entity: "@knownuser",
+            chat=SimpleNamespace(id=-1001),
+            message_id=42,
+            entities=[mention, text_mention, mention],
+            text="😀 @KnownUser @ghost",
+            reply_to_message=SimpleNamespace(from_user=SimpleNamespace(id=2)),
+            parse_entity=lambda _entity: next(handles),
         )
+        with tempfile.TemporaryDirectory() as directory:
+            raw = search_database(f"{directory}/search.db")
+            migrate.load_migration(
+                Path("migrations", "20261018010000_user_stats_lower_username_index.py")
+            ).upgrade(raw)
+            raw.execute(
+                """
+                INSERT INTO user_stats (user_id, username, last_seen) VALUES
+                (2, 'knownuser', '2026-10-18 12:00:00'),
+                (4, 'KnownUser', '2026-01-01 12:00:00')
+                """
+            )
+            connection = db.TursoConnection(raw)
+            with (
+                patch.object(
+                    chat_memory, "get_db", return_value=connection_context(connection)
+                ),
+                patch.object(
+                    connection, "execute", wraps=connection.execute
+                ) as execute,
+            ):
+                await chat_memory.process_mentions(message)
+            rows = raw.execute(
+                """
+                SELECT mentioning_user_id, mentioned_user_id, chat_id, message_id
+                FROM chat_mentions ORDER BY mentioned_user_id
+                """
+            ).fetchall()
+            await connection.close()
 
-        with (
-            patch.object(
-                chat_memory,
-                "get_user_id_from_username",
-                AsyncMock(return_value=2),
-            ) as get_user_id,
-            patch.object(chat_memory, "save_mention", AsyncMock()) as save_mention,
-        ):
-            await chat_memory.process_mentions(message)
-
-        get_user_id.assert_awaited_once_with("knownuser")
-        save_mention.assert_awaited_once_with(1, 2, message)
+        self.assertEqual(execute.call_count, 1)
+        self.assertEqual(rows, [(1, 2, -1001, 42), (1, 3, -1001, 42)])
 
     async def test_message_stats_capture_reply(self):
         with tempfile.TemporaryDirectory() as directory:
@@ -958,10 +1005,20 @@ class CommandRegressionTests(unittest.IsolatedAsyncioTestCase):
                     message_id=41, from_user=SimpleNamespace(id=8)
                 ),
             )
-            with patch.object(
-                chat_memory, "get_db", return_value=connection_context(connection)
+            chat_settings.invalidate_chat_settings()
+            chat_memory._user_stats_written.clear()
+            with (
+                patch.object(
+                    chat_settings,
+                    "get_db",
+                    return_value=connection_context(connection),
+                ),
+                patch.object(
+                    ingestion, "get_db", return_value=connection_context(connection)
+                ),
             ):
                 await chat_memory.save_message_stats(message)
+                await ingestion.ingestion_buffer.flush()
             row = raw.execute(
                 "SELECT reply_to_message_id, reply_to_user_id FROM chat_stats"
             ).fetchone()
@@ -973,6 +1030,405 @@ class CommandRegressionTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(row, (41, 8))
         self.assertEqual(user, ("alice", "Alice"))
 
+    async def test_message_stats_drop_text_without_search_opt_in(self):
+        with tempfile.TemporaryDirectory() as directory:
+            raw = search_database(f"{directory}/search.db")
+            connection = db.TursoConnection(raw)
+            message = SimpleNamespace(
+                from_user=SimpleNamespace(id=7, username=None, first_name="Alice"),
+                chat_id=-1001,
+                message_id=42,
+                text="private",
+                link=None,
+                reply_to_message=None,
+            )
+            chat_settings.invalidate_chat_settings()
+            chat_memory._user_stats_written.clear()
+            with (
+                patch.object(
+                    chat_settings,
+                    "get_db",
+                    return_value=connection_context(connection),
+                ),
+                patch.object(
+                    ingestion, "get_db", return_value=connection_context(connection)
+                ),
+            ):
+                await chat_memory.save_message_stats(message)
+                await ingestion.ingestion_buffer.flush()
+            row = raw.execute(
+                "SELECT message_id, message_text FROM chat_stats"
+            ).fetchone()
+            await connection.close()
+
+        self.assertEqual(row, (42, None))
+
+    async def test_ingestion_buffer_collapses_user_upserts_into_one_flush(self):
+        buffer = ingestion.IngestionBuffer(flush_rows=100, flush_seconds=60)
+        with tempfile.TemporaryDirectory() as directory:
+            raw = search_database(f"{directory}/search.db")
+            connection = db.TursoConnection(raw)
+            for message_id, username in ((1, "alice"), (2, "alice_renamed")):
+                buffer.add(
+                    chat_memory.USER_STATS_UPSERT,
+                    (7, username, "Alice", "2026-10-18 00:00:00", None),
+                    key=7,
+                )
+                buffer.add(
+                    chat_memory.CHAT_STATS_INSERT,
+                    (-1001, 7, message_id, "hi", None, None),
+                )
+            self.assertEqual(buffer.size, 3)
+            with (
+                patch.object(
+                    ingestion, "get_db", return_value=connection_context(connection)
+                ),
+                patch.object(
+                    connection, "executemany", wraps=connection.executemany
+                ) as executemany,
+            ):
+                self.assertEqual(await buffer.flush(), 3)
+                await buffer.close()
+            users = raw.execute("SELECT username FROM user_stats").fetchall()
+            messages = raw.execute("SELECT COUNT(*) FROM chat_stats").fetchone()
+            await connection.close()
+
+        self.assertEqual(executemany.call_count, 2)
+        self.assertEqual(users, [("alice_renamed",)])
+        self.assertEqual(messages, (2,))
+
+    async def test_ingestion_buffer_keeps_rows_when_a_flush_fails(self):
+        buffer = ingestion.IngestionBuffer(flush_rows=100, flush_seconds=60)
+        with tempfile.TemporaryDirectory() as directory:
+            raw = search_database(f"{directory}/search.db")
+            connection = db.TursoConnection(raw)
+            buffer.add(
+                chat_memory.USER_STATS_UPSERT,
+                (7, "alice", "Alice", "2026-10-18 00:00:00", None),
+                key=7,
+            )
+            buffer.add(chat_memory.CHAT_STATS_INSERT, (-1001, 7, 1, "hi", None, None))
+            with (
+                patch.object(
+                    ingestion, "get_db", side_effect=ConnectionError("turso down")
+                ),
+                self.assertRaises(ConnectionError),
+            ):
+                await buffer.flush()
+            # Added while the failed flush was out: newer than its keyed row.
+            buffer.add(
+                chat_memory.USER_STATS_UPSERT,
+                (7, "alice_renamed", "Alice", "2026-10-18 00:01:00", None),
+                key=7,
+            )
+            buffer.add(
+                chat_memory.CHAT_STATS_INSERT, (-1001, 7, 2, "there", None, None)
+            )
+            self.assertEqual(buffer.size, 3)
+            with patch.object(
+                ingestion, "get_db", return_value=connection_context(connection)
+            ):
+                self.assertEqual(await buffer.flush(), 3)
+                await buffer.close()
+            users = raw.execute("SELECT username FROM user_stats").fetchall()
+            messages = raw.execute(
+                "SELECT message_id FROM chat_stats ORDER BY message_id"
+            ).fetchall()
+            await connection.close()
+
+        self.assertEqual(users, [("alice_renamed",)])
+        self.assertEqual(messages, [(1,), (2,)])
+
+    async def test_ingestion_buffer_drops_rows_that_fail_on_their_own(self):
+        insert = "INSERT INTO items (name) VALUES (?)"
+        buffer = ingestion.IngestionBuffer(
+            flush_rows=100, flush_seconds=60, max_rows=6, max_attempts=3
+        )
+        connection = db.TursoConnection(libsql.connect(":memory:", autocommit=True))
+        await connection.execute("CREATE TABLE items (name TEXT NOT NULL)")
+        for name in ("one", "two", None, "three", "four", "five", "six"):
+            buffer.add(insert, (name,))
+
+        with patch.object(
+            ingestion, "get_db", side_effect=lambda: connection_context(connection)
+        ):
+            with self.assertRaises(ValueError):
+                await buffer.flush()
+            self.assertEqual(buffer.size, 6)
+            self.assertEqual(await buffer.flush(), 5)
+        async with connection.execute("SELECT name FROM items") as cursor:
+            names = [row["name"] for row in await cursor.fetchall()]
+
+        self.assertEqual(names, ["one", "two", "three", "four", "five"])
+        self.assertEqual(
+            buffer.metrics(),
+            {"buffered": 0, "failures": 0, "dropped": 1, "rejected": 1},
+        )
+
+    async def test_ingestion_buffer_gives_up_after_repeated_outages(self):
+        buffer = ingestion.IngestionBuffer(
+            flush_rows=100, flush_seconds=60, max_attempts=2
+        )
+        for message_id in (1, 2, 3):
+            buffer.add(
+                chat_memory.CHAT_STATS_INSERT, (-1001, 7, message_id, "hi", None, None)
+            )
+
+        with patch.object(
+            ingestion, "get_db", side_effect=ConnectionError("turso down")
+        ) as get_db:
+            for _ in range(2):
+                with self.assertRaises(ConnectionError):
+                    await buffer.flush()
+
+        # The retry halves the batch until a second row fails alone, then stops.
+        self.assertEqual(get_db.call_count, 1 + 4)
+        self.assertEqual(buffer.metrics()["dropped"], 3)
+        self.assertEqual(buffer.size, 0)
+
+    def test_user_stats_writes_only_on_change_or_stale_last_seen(self):
+        chat_memory._user_stats_written.clear()
+        self.addCleanup(chat_memory._user_stats_written.clear)
+        now = datetime(2026, 10, 18, 12, tzinfo=UTC)
+        granularity = chat_memory.USER_STATS_LAST_SEEN_GRANULARITY
+
+        def written(first_name: str, seen: datetime) -> bool:
+            changed = chat_memory.user_stats_changed(7, "alice", first_name, seen)
+            if changed:
+                chat_memory.remember_user_stats(7, "alice", first_name, seen)
+            return changed
+
+        self.assertTrue(chat_memory.user_stats_changed(7, "alice", "Alice", now))
+        changed = [
+            written("Alice", now),
+            written("Alice", now + granularity / 2),
+            written("Ali", now + granularity / 2),
+            written("Ali", now + granularity),
+            written("Ali", now + granularity * 2),
+        ]
+
+        self.assertEqual(changed, [True, False, True, False, True])
+
+    async def test_user_stats_are_remembered_only_after_the_flush_commits(self):
+        chat_memory._user_stats_written.clear()
+        self.addCleanup(chat_memory._user_stats_written.clear)
+        buffer = ingestion.IngestionBuffer(flush_rows=100, flush_seconds=60)
+        message = SimpleNamespace(
+            from_user=SimpleNamespace(id=7, username="alice", first_name="Alice"),
+            chat_id=-1001,
+            message_id=1,
+            text="hi",
+            link=None,
+            reply_to_message=None,
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            raw = search_database(f"{directory}/search.db")
+            connection = db.TursoConnection(raw)
+            with patch.object(chat_memory, "ingestion_buffer", buffer):
+                await chat_memory.save_message_stats(
+                    message, chat_settings.ChatSettings(True, False, frozenset())
+                )
+                with (
+                    patch.object(
+                        ingestion, "get_db", side_effect=ConnectionError("turso down")
+                    ),
+                    self.assertRaises(ConnectionError),
+                ):
+                    await buffer.flush()
+                self.assertNotIn(7, chat_memory._user_stats_written)
+
+                with patch.object(
+                    ingestion, "get_db", return_value=connection_context(connection)
+                ):
+                    await buffer.flush()
+                    await buffer.close()
+            await connection.close()
+
+        self.assertEqual(chat_memory._user_stats_written[7][:2], ("alice", "Alice"))
+
+    async def test_chat_settings_are_cached_until_invalidated(self):
+        chat_settings.invalidate_chat_settings()
+        self.addCleanup(chat_settings.invalidate_chat_settings)
+        with tempfile.TemporaryDirectory() as directory:
+            raw = search_database(f"{directory}/search.db")
+            connection = db.TursoConnection(raw)
+            raw.execute("INSERT INTO group_settings (chat_id, fts) VALUES (-1001, 1)")
+            with patch.object(
+                chat_settings,
+                "get_db",
+                side_effect=lambda: connection_context(connection),
+            ) as get_db:
+                first = await chat_settings.get_chat_settings(-1001)
+                raw.execute("UPDATE group_settings SET fts = 0 WHERE chat_id = -1001")
+                cached = await chat_settings.get_chat_settings(-1001)
+                chat_settings.invalidate_chat_settings(-1001)
+                reloaded = await chat_settings.get_chat_settings(-1001)
+            await connection.close()
+
+        self.assertTrue(first.fts)
+        self.assertTrue(cached.fts)
+        self.assertFalse(reloaded.fts)
+        self.assertEqual(get_db.call_count, 2)
+
+    async def test_update_context_shares_one_settings_load_across_handlers(self):
+        update = SimpleNamespace(effective_chat=SimpleNamespace(id=-1001))
+        settings = chat_settings.ChatSettings(
+            fts=True, auto_dl=False, whitelisted=frozenset()
+        )
+        load = AsyncMock(return_value=settings)
+
+        with patch.object(update_context_module, "get_chat_settings", load):
+            await update_context_module.bind_update_context(update, SimpleNamespace())
+            results = await asyncio.gather(
+                update_context_module.update_context(update).settings(),
+                update_context_module.update_context(update).settings(),
+            )
+            other = SimpleNamespace(effective_chat=SimpleNamespace(id=-1002))
+            await update_context_module.update_context(other).settings()
+
+        self.assertEqual(results, [settings, settings])
+        self.assertEqual(
+            [call.args for call in load.await_args_list], [(-1001,), (-1002,)]
+        )
+
+    async def test_update_context_retrieves_a_load_error_after_cancellation(self):
+        update = SimpleNamespace(effective_chat=SimpleNamespace(id=-1001))
+        release = asyncio.Event()
+        unretrieved = []
+
+        async def load(_chat_id):
+            await release.wait()
+            raise ConnectionError("turso down")
+
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda _loop, context: unretrieved.append(context))
+        self.addCleanup(loop.set_exception_handler, None)
+        with patch.object(update_context_module, "get_chat_settings", load):
+            context = update_context_module.UpdateContext(update)
+            caller = asyncio.ensure_future(context.settings())
+            await asyncio.sleep(0)
+            caller.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await caller
+            release.set()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            del context
+            gc.collect()
+
+        self.assertEqual(unretrieved, [])
+
+    def test_highlight_matcher_finds_overlapping_highlights_in_one_pass(self):
+        rows = [
+            {"id": 1, "string": "Elden Ring"},
+            {"id": 2, "string": "ring"},
+            {"id": 3, "string": "den"},
+            {"id": 4, "string": "sekiro"},
+            {"id": 5, "string": "ringo"},
+        ]
+        matcher = highlights_module.HighlightMatcher(rows)
+
+        matched = matcher.matches("who else is playing ELDEN RING tonight")
+
+        self.assertEqual([row["id"] for row in matched], [1, 2, 3])
+        self.assertEqual(matcher.matches("nothing here"), [])
+
+    async def test_highlight_matcher_is_cached_until_highlights_change(self):
+        with tempfile.TemporaryDirectory() as directory:
+            raw = libsql.connect(
+                f"{directory}/highlights.db", autocommit=True, _check_same_thread=False
+            )
+            migrate.load_migration(
+                Path("migrations", "20240624131537_init.py")
+            ).upgrade(raw)
+            raw.execute(
+                "INSERT INTO highlights (chat_id, string, user_id) VALUES (-1001, 'tea', 7)"
+            )
+            connection = db.TursoConnection(raw)
+            highlights_module.invalidate_highlight_matcher(-1001)
+            with patch.object(
+                highlights_module,
+                "get_db",
+                side_effect=lambda: connection_context(connection),
+            ) as get_db:
+                first = await highlights_module.get_highlight_matcher(-1001)
+                raw.execute(
+                    "INSERT INTO highlights (chat_id, string, user_id) VALUES (-1001, 'coffee', 8)"
+                )
+                cached = await highlights_module.get_highlight_matcher(-1001)
+                highlights_module.invalidate_highlight_matcher(-1001)
+                rebuilt = await highlights_module.get_highlight_matcher(-1001)
+                with patch.object(highlights_module, "HIGHLIGHT_CACHE_TTL_SECONDS", 0):
+                    highlights_module.invalidate_highlight_matcher(-1001)
+                    await highlights_module.get_highlight_matcher(-1001)
+                    expired = await highlights_module.get_highlight_matcher(-1001)
+                    await highlights_module.get_highlight_matcher(-1002)
+            await connection.close()
+
+        self.assertIs(first, cached)
+        self.assertEqual(len(rebuilt), 2)
+        self.assertEqual(len(expired), 2)
+        self.assertEqual(get_db.call_count, 5)
+        # Storing -1002 evicted the expired -1001 entry.
+        self.assertNotIn(-1001, highlights_module._matchers)
+        self.assertIn(-1002, highlights_module._matchers)
+
+    async def test_highlight_worker_sends_one_dm_per_recipient(self):
+        from telegram.error import Forbidden
+
+        matcher = highlights_module.HighlightMatcher(
+            [
+                {"id": 1, "string": "tea", "user_id": 7},
+                {"id": 2, "string": "coffee", "user_id": 7},
+                {"id": 3, "string": "tea", "user_id": 8},
+            ]
+        )
+        message = SimpleNamespace(
+            text="tea or coffee?",
+            chat_id=-1001,
+            chat=SimpleNamespace(title="Group"),
+            from_user=SimpleNamespace(id=9, first_name="Sam"),
+            link="https://t.me/c/1/2",
+        )
+        update = SimpleNamespace(
+            effective_chat=SimpleNamespace(id=-1001), effective_message=message
+        )
+        send_message = AsyncMock(side_effect=[None, Forbidden("blocked"), None])
+        context = SimpleNamespace(bot=SimpleNamespace(send_message=send_message))
+        highlight_module._dm_blocked_until.clear()
+        # A cooldown that ran out long ago, for a user who never matches again.
+        highlight_module._dm_blocked_until[99] = 0.0
+
+        with (
+            patch.object(highlight_module, "get_message", return_value=message),
+            patch.object(
+                update_context_module,
+                "get_highlight_matcher",
+                AsyncMock(return_value=matcher),
+            ),
+        ):
+            await highlight_module.highlight_worker(update, context)
+            await highlight_module.highlight_worker(update, context)
+
+        self.assertEqual(
+            [call.args[0] for call in send_message.await_args_list], [7, 8, 7]
+        )
+        first = send_message.await_args_list[0]
+        self.assertIn("<code>tea</code>, <code>coffee</code> were", first.args[1])
+        self.assertEqual(len(first.kwargs["reply_markup"].inline_keyboard), 2)
+        self.assertEqual(list(highlight_module._dm_blocked_until), [8])
+        highlight_module._dm_blocked_until.clear()
+
+    def test_highlight_dm_slots_belong_to_the_running_loop(self):
+        async def slots():
+            return highlight_module.dm_slots(), highlight_module.dm_slots()
+
+        first, same = asyncio.run(slots())
+        second, _ = asyncio.run(slots())
+
+        self.assertIs(first, same)
+        self.assertIsNot(first, second)
+
     async def test_search_event_is_persisted(self):
         search_events = importlib.import_module("management.search_events")
         with tempfile.TemporaryDirectory() as directory:
@@ -1021,6 +1477,44 @@ class CommandRegressionTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(row["id"], 1)
         self.assertEqual(row[1], "one")
 
+    async def test_turso_rows_are_tuples_sharing_one_column_map(self):
+        conn = db.TursoConnection(libsql.connect(":memory:", autocommit=True))
+        await conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        await conn.executemany(
+            "INSERT INTO items (name) VALUES (?)",
+            [(f"item {index}",) for index in range(5)],
+        )
+
+        async with conn.execute("SELECT id, name FROM items ORDER BY id") as rows:
+            first = await rows.fetchmany(2)
+            rest = [row async for row in rows]
+
+        self.assertEqual([len(first), len(rest)], [2, 3])
+        self.assertEqual(first[0], (1, "item 0"))
+        self.assertEqual(rest[-1]["name"], "item 4")
+        self.assertIs(type(first[0]), type(rest[0]))
+        self.assertIsInstance(rest[0], db.TursoRow)
+        self.assertFalse(hasattr(rest[0], "__dict__"))
+
+    async def test_turso_http_cursor_decodes_rows_as_they_are_fetched(self):
+        decoded = []
+
+        def decode(row):
+            decoded.append(row)
+            return tuple(row)
+
+        cursor = db.TursoCursor(
+            db.TursoHttpCursor([[1], [2], [3]], ["id"], 0, None, decode)
+        )
+
+        first = await cursor.fetchone()
+        self.assertEqual(decoded, [[1]])
+        remaining = [row["id"] async for row in cursor]
+
+        self.assertEqual(first["id"], 1)
+        self.assertEqual(remaining, [2, 3])
+        self.assertEqual(await cursor.fetchall(), [])
+
     async def test_turso_adapter_binds_datetimes_as_sqlite_text(self):
         conn = db.TursoConnection(libsql.connect(":memory:", autocommit=True))
         seen_at = datetime(2026, 6, 5, 7, 58, 2, 221759)  # noqa: DTZ001
@@ -1034,51 +1528,48 @@ class CommandRegressionTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(row["seen_at"], "2026-06-05 07:58:02.221759")
 
     async def test_turso_http_adapter_uses_hrana_pipeline_shape(self):
-        seen = {}
-
-        def fake_urlopen(req, *, timeout: int):
-            seen["timeout"] = timeout
-            seen["url"] = req.full_url
-            seen["authorization"] = req.get_header("Authorization")
-            seen["body"] = json.loads(req.data.decode())
-            return FakeUrlOpenResponse(
-                {
-                    "results": [
-                        {
-                            "type": "ok",
-                            "response": {
-                                "type": "execute",
-                                "result": {
-                                    "cols": [
-                                        {"name": "id"},
-                                        {"name": "name"},
-                                    ],
-                                    "rows": [
-                                        [
-                                            {"type": "integer", "value": "1"},
-                                            {"type": "text", "value": "one"},
-                                        ]
-                                    ],
-                                    "affected_row_count": 0,
-                                    "last_insert_rowid": None,
-                                },
+        session = FakeHranaSession(
+            lambda _body: {
+                "results": [
+                    {
+                        "type": "ok",
+                        "response": {
+                            "type": "execute",
+                            "result": {
+                                "cols": [
+                                    {"name": "id"},
+                                    {"name": "name"},
+                                ],
+                                "rows": [
+                                    [
+                                        {"type": "integer", "value": "1"},
+                                        {"type": "text", "value": "one"},
+                                    ]
+                                ],
+                                "affected_row_count": 0,
+                                "last_insert_rowid": None,
                             },
                         },
-                        {"type": "ok", "response": {"type": "close"}},
-                    ]
-                }
-            )
+                    },
+                    {"type": "ok", "response": {"type": "close"}},
+                ]
+            }
+        )
 
-        with patch.object(db.request, "urlopen", fake_urlopen):
+        with (
+            patch.object(db, "http_session", return_value=session),
+            patch.object(db.db_executor, "run", side_effect=AssertionError),
+        ):
             conn = db.TursoConnection(
                 db.TursoHttpConnection("libsql://example.turso.io", "secret")
             )
             async with conn.execute("SELECT ? AS id, ? AS name", (1, "one")) as rows:
                 row = await rows.fetchone()
+            await conn.close()
 
-        self.assertEqual(seen["timeout"], db.HTTP_READ_TIMEOUT_SECONDS)
+        [seen] = session.requests
         self.assertEqual(seen["url"], "https://example.turso.io/v2/pipeline")
-        self.assertEqual(seen["authorization"], "Bearer secret")
+        self.assertEqual(seen["headers"], {"Authorization": "Bearer secret"})
         self.assertEqual(
             seen["body"],
             {
@@ -1101,31 +1592,29 @@ class CommandRegressionTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(row["name"], "one")
 
     async def test_turso_http_executemany_sums_rowcounts(self):
-        def fake_urlopen(req, *, timeout: int):
-            body = json.loads(req.data.decode())
-            return FakeUrlOpenResponse(
-                {
-                    "results": [
-                        {
-                            "type": "ok",
-                            "response": {
-                                "type": "execute",
-                                "result": {
-                                    "cols": [],
-                                    "rows": [],
-                                    "affected_row_count": 1,
-                                    "last_insert_rowid": str(index + 1),
-                                },
+        session = FakeHranaSession(
+            lambda body: {
+                "results": [
+                    {
+                        "type": "ok",
+                        "response": {
+                            "type": "execute",
+                            "result": {
+                                "cols": [],
+                                "rows": [],
+                                "affected_row_count": 1,
+                                "last_insert_rowid": str(index + 1),
                             },
-                        }
-                        for index, _request in enumerate(body["requests"])
-                        if _request["type"] == "execute"
-                    ]
-                    + [{"type": "ok", "response": {"type": "close"}}]
-                }
-            )
+                        },
+                    }
+                    for index, _request in enumerate(body["requests"])
+                    if _request["type"] == "execute"
+                ]
+                + [{"type": "ok", "response": {"type": "close"}}]
+            }
+        )
 
-        with patch.object(db.request, "urlopen", fake_urlopen):
+        with patch.object(db, "http_session", return_value=session):
             conn = db.TursoConnection(
                 db.TursoHttpConnection("libsql://example.turso.io", "secret")
             )
@@ -1134,9 +1623,259 @@ class CommandRegressionTests(unittest.IsolatedAsyncioTestCase):
                 [("one",), ("two",)],
             )
 
+        self.assertEqual(len(session.requests), 1)
         self.assertEqual(cursor.rowcount, 2)
         self.assertEqual(cursor.lastrowid, 2)
 
+    async def test_turso_http_round_trips_blobs_as_base64(self):
+        session = FakeHranaSession(
+            lambda _body: {
+                "results": [
+                    {
+                        "type": "ok",
+                        "response": {
+                            "type": "execute",
+                            "result": {
+                                "cols": [{"name": "embedding"}],
+                                "rows": [[{"type": "blob", "base64": "AACAPw"}]],
+                                "affected_row_count": 0,
+                                "last_insert_rowid": None,
+                            },
+                        },
+                    },
+                    {"type": "ok", "response": {"type": "close"}},
+                ]
+            }
+        )
+
+        with patch.object(db, "http_session", return_value=session):
+            conn = db.TursoConnection(
+                db.TursoHttpConnection("libsql://example.turso.io", "secret")
+            )
+            async with conn.execute(
+                "SELECT vector32(?) AS embedding",
+                (memoryview(b"\x00\x00\x80?"),),
+            ) as rows:
+                row = await rows.fetchone()
+
+        [seen] = session.requests
+        self.assertEqual(
+            seen["body"]["requests"][0]["stmt"]["args"],
+            [{"type": "blob", "base64": "AACAPw=="}],
+        )
+        self.assertEqual(row["embedding"], b"\x00\x00\x80?")
+
+    async def test_turso_http_disconnect_is_a_retryable_open_error(self):
+        class DisconnectingSession:
+            def post(self, *_args, **_kwargs):
+                raise aiohttp.ServerDisconnectedError()
+
+        conn = db.TursoHttpConnection("libsql://example.turso.io", "secret")
+        with (
+            patch.object(db, "http_session", return_value=DisconnectingSession()),
+            self.assertRaises(ValueError) as raised,
+        ):
+            await conn.execute("SELECT 1")
+
+        self.assertTrue(db.is_retryable_open_error(raised.exception))
+
+    async def test_turso_http_resends_once_after_a_stale_keepalive_socket(self):
+        result = {
+            "type": "ok",
+            "response": {
+                "type": "execute",
+                "result": {
+                    "cols": [{"name": "one"}],
+                    "rows": [[{"type": "integer", "value": "1"}]],
+                    "affected_row_count": 0,
+                    "last_insert_rowid": None,
+                },
+            },
+        }
+        session = FakeHranaSession(
+            lambda body: {
+                "baton": "stream",
+                "results": [
+                    result
+                    if request["type"] == "execute"
+                    else {"type": "ok", "response": {"type": "close"}}
+                    for request in body["requests"]
+                ],
+            }
+        )
+        disconnects = 0
+
+        def post(url, **kwargs):
+            nonlocal disconnects
+            if disconnects < 1 or kwargs["json"].get("baton"):
+                disconnects += 1
+                raise aiohttp.ServerDisconnectedError()
+            return FakeHranaSession.post(session, url, **kwargs)
+
+        conn = db.TursoHttpConnection("libsql://example.turso.io", "secret")
+        with (
+            patch.object(session, "post", side_effect=post),
+            patch.object(db, "http_session", return_value=session),
+        ):
+            cursor = await conn.execute("SELECT 1 AS one")
+            await conn.begin()
+            await conn.execute("SELECT 1 AS one")
+            with self.assertRaises(ValueError) as raised:
+                await conn.execute("SELECT 1 AS one")
+
+        self.assertEqual(cursor.fetchone(), (1,))
+        # Inside the stream the baton may be gone, so it is not resent.
+        self.assertEqual(disconnects, 2)
+        self.assertEqual(len(session.requests), 2)
+        self.assertTrue(db.is_retryable_open_error(raised.exception))
+
+    async def test_turso_batch_is_atomic_on_local_connections(self):
+        conn = db.TursoConnection(libsql.connect(":memory:", autocommit=True))
+        await conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+
+        cursors = await conn.batch(
+            [
+                ("INSERT INTO items (name) VALUES (?)", ("one",)),
+                ("SELECT COUNT(*) AS total FROM items", None),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            await conn.batch(
+                [
+                    ("INSERT INTO items (name) VALUES (?)", ("two",)),
+                    ("INSERT INTO missing (name) VALUES (?)", ("three",)),
+                ]
+            )
+        async with conn.execute("SELECT name FROM items") as rows:
+            names = [row["name"] for row in await rows.fetchall()]
+
+        self.assertEqual(cursors[0].lastrowid, 1)
+        self.assertEqual((await cursors[1].fetchone())["total"], 1)
+        self.assertEqual(names, ["one"])
+        self.assertFalse(conn.in_transaction)
+
+    async def test_turso_local_transaction_rolls_back_on_error(self):
+        conn = db.TursoConnection(libsql.connect(":memory:", autocommit=True))
+        await conn.execute("CREATE TABLE items (name TEXT)")
+
+        with self.assertRaisesRegex(RuntimeError, "abort"):
+            async with conn.transaction():
+                await conn.execute("INSERT INTO items (name) VALUES ('one')")
+                raise RuntimeError("abort")
+        async with conn.transaction():
+            await conn.execute("INSERT INTO items (name) VALUES ('two')")
+        async with conn.execute("SELECT name FROM items") as rows:
+            names = [row["name"] for row in await rows.fetchall()]
+
+        self.assertEqual(names, ["two"])
+
+    async def test_turso_http_batch_sends_one_conditional_pipeline(self):
+        def ok(index: int) -> dict[str, object]:
+            return {
+                "cols": [],
+                "rows": [],
+                "affected_row_count": 1,
+                "last_insert_rowid": str(index),
+            }
+
+        session = FakeHranaSession(
+            lambda _body: {
+                "results": [
+                    {
+                        "type": "ok",
+                        "response": {
+                            "type": "batch",
+                            "result": {
+                                "step_results": [ok(0), ok(1), ok(2), ok(0), None],
+                                "step_errors": [None, None, None, None, None],
+                            },
+                        },
+                    },
+                    {"type": "ok", "response": {"type": "close"}},
+                ]
+            }
+        )
+
+        with patch.object(db, "http_session", return_value=session):
+            conn = db.TursoConnection(
+                db.TursoHttpConnection("libsql://example.turso.io", "secret")
+            )
+            cursors = await conn.batch(
+                [
+                    ("DELETE FROM items WHERE id = ?", (1,)),
+                    ("INSERT INTO items (name) VALUES (?)", ("two",)),
+                ]
+            )
+
+        [seen] = session.requests
+        [batch, close] = seen["body"]["requests"]
+        steps = batch["batch"]["steps"]
+        self.assertEqual(close, {"type": "close"})
+        self.assertEqual(
+            [step["stmt"]["sql"] for step in steps],
+            [
+                "BEGIN",
+                "DELETE FROM items WHERE id = ?",
+                "INSERT INTO items (name) VALUES (?)",
+                "COMMIT",
+                "ROLLBACK",
+            ],
+        )
+        self.assertEqual(steps[3]["condition"], {"type": "ok", "step": 2})
+        self.assertEqual(
+            steps[4]["condition"],
+            {"type": "not", "cond": {"type": "ok", "step": 3}},
+        )
+        self.assertEqual([cursor.lastrowid for cursor in cursors], [1, 2])
+
+    async def test_turso_http_transaction_holds_a_baton_stream(self):
+        def respond(body):
+            executes = [
+                {
+                    "type": "ok",
+                    "response": {
+                        "type": "execute",
+                        "result": {
+                            "cols": [],
+                            "rows": [],
+                            "affected_row_count": 1,
+                            "last_insert_rowid": None,
+                        },
+                    },
+                }
+                for request in body["requests"]
+                if request["type"] == "execute"
+            ]
+            closes = [
+                {"type": "ok", "response": {"type": "close"}}
+                for request in body["requests"]
+                if request["type"] == "close"
+            ]
+            return {"baton": "b1", "base_url": None, "results": executes + closes}
+
+        session = FakeHranaSession(respond)
+        with patch.object(db, "http_session", return_value=session):
+            conn = db.TursoConnection(
+                db.TursoHttpConnection("libsql://example.turso.io", "secret")
+            )
+            async with conn.transaction():
+                cursor = await conn.execute("UPDATE items SET name = 'x'")
+                self.assertTrue(conn.in_transaction)
+
+        first, commit = (request["body"] for request in session.requests)
+        self.assertEqual(
+            [request["stmt"]["sql"] for request in first["requests"]],
+            ["BEGIN", "UPDATE items SET name = 'x'"],
+        )
+        self.assertNotIn("baton", first)
+        self.assertEqual(commit["baton"], "b1")
+        self.assertEqual(
+            commit["requests"],
+            [{"type": "execute", "stmt": {"sql": "COMMIT"}}, {"type": "close"}],
+        )
+        self.assertEqual(cursor.rowcount, 1)
+        self.assertFalse(conn.in_transaction)
+
     async def test_turso_open_retries_hrana_closed_stream(self):
         failed = FakeSyncConnection(
             ValueError(
@@ -1182,6 +1921,316 @@ class CommandRegressionTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(opened.queries, [])
         await conn.close()
 
+    async def test_get_db_reuses_pooled_connections(self):
+        opened = [FakeSyncConnection(), FakeSyncConnection()]
+
+        with patch.object(db, "open_sync_connection", side_effect=opened) as connect:
+            async with db.get_db() as first:
+                await first.execute("SELECT 1;")
+            async with db.get_db() as second:
+                await second.execute("SELECT 2;")
+            await db.close_db()
+
+        self.assertIs(first, second)
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(
+            opened[0].queries, ["PRAGMA foreign_keys = ON;", "SELECT 1;", "SELECT 2;"]
+        )
+        self.assertTrue(opened[0].closed)
+
+    async def test_get_db_discards_connection_after_failure(self):
+        opened = [FakeSyncConnection(), FakeSyncConnection()]
+
+        with patch.object(db, "open_sync_connection", side_effect=opened):
+            with self.assertRaisesRegex(RuntimeError, "handler failed"):
+                async with db.get_db():
+                    raise RuntimeError("handler failed")
+            async with db.get_db() as conn:
+                await conn.execute("SELECT 1;")
+            await db.close_db()
+
+        self.assertTrue(opened[0].closed)
+        self.assertEqual(opened[1].queries, ["PRAGMA foreign_keys = ON;", "SELECT 1;"])
+
+    async def test_nested_get_db_reuses_the_task_connection(self):
+        opened = [FakeSyncConnection(), FakeSyncConnection()]
+
+        with (
+            patch.object(db, "DB_POOL_SIZE", 1),
+            patch.object(db, "open_sync_connection", side_effect=opened),
+        ):
+            await db.close_db()
+            async with db.get_db() as outer:
+                # The pool's only slot is taken; this would wait forever.
+                async with asyncio.timeout(1), db.get_db() as inner:
+                    await inner.execute("SELECT 1;")
+
+                async def other_task():
+                    async with db.get_db() as conn:
+                        return conn
+
+                waiting = asyncio.ensure_future(other_task())
+                await asyncio.sleep(0)
+                self.assertFalse(waiting.done())
+            self.assertIs(await waiting, outer)
+            await db.close_db()
+
+        self.assertIs(inner, outer)
+
+    async def test_pool_from_another_loop_is_closed_when_replaced(self):
+        opened = FakeSyncConnection()
+        stale = db.ConnectionPool(size=1, idle_seconds=60, health_check_seconds=60)
+
+        with patch.object(db, "open_sync_connection", return_value=opened):
+            conn = await stale.acquire()
+            await stale.release(conn, reusable=True)
+            stale._loop = asyncio.new_event_loop()
+            stale._loop.close()
+            with patch.object(db, "_pool", stale):
+                replacement = await db._connection_pool()
+                await replacement.close()
+
+        self.assertIsNot(replacement, stale)
+        self.assertTrue(opened.closed)
+
+    async def test_pool_replaces_connections_that_fail_health_checks(self):
+        stale = FakeSyncConnection()
+        fresh = FakeSyncConnection()
+        pool = db.ConnectionPool(size=1, idle_seconds=60, health_check_seconds=0)
+
+        with patch.object(db, "open_sync_connection", side_effect=[stale, fresh]):
+            conn = await pool.acquire()
+            await pool.release(conn, reusable=True)
+            stale.failure = ValueError("Hrana: `stream expired`")
+            conn = await pool.acquire()
+            await pool.release(conn, reusable=True)
+            await pool.close()
+
+        self.assertTrue(stale.closed)
+        self.assertEqual(fresh.queries, ["PRAGMA foreign_keys = ON;"])
+        self.assertTrue(fresh.closed)
+
+    async def test_pool_reaps_idle_connections(self):
+        opened = FakeSyncConnection()
+        pool = db.ConnectionPool(size=1, idle_seconds=0, health_check_seconds=0)
+
+        with patch.object(db, "open_sync_connection", return_value=opened):
+            conn = await pool.acquire()
+            await pool.release(conn, reusable=True)
+            await pool.reap_idle()
+            await pool.close()
+
+        self.assertTrue(opened.closed)
+
+    async def test_named_executor_reports_queue_depth_and_wait(self):
+        executor = executors.NamedExecutor("test", max_workers=1)
+        release = threading.Event()
+        try:
+            blocker = asyncio.ensure_future(executor.run(release.wait))
+            queued = asyncio.ensure_future(executor.run(lambda: "done"))
+            await asyncio.sleep(0.05)
+            busy = executor.metrics()
+            release.set()
+            self.assertEqual(await queued, "done")
+            await blocker
+        finally:
+            executor.shutdown()
+
+        self.assertEqual((busy["running"], busy["queued"]), (1, 1))
+        idle = executor.metrics()
+        self.assertEqual((idle["completed"], idle["queued"]), (2, 0))
+        self.assertGreater(idle["wait_ms_max"], 0)
+
+    async def test_background_scheduler_drops_or_blocks_when_a_lane_is_full(self):
+        scheduler = concurrency.BackgroundScheduler(
+            {
+                "cosmetic": concurrency.TaskLimit(
+                    1, 1, concurrency.OverflowPolicy.DROP
+                ),
+                "stats": concurrency.TaskLimit(1, 0, concurrency.OverflowPolicy.BLOCK),
+            },
+            concurrency.TaskLimit(1, 1, concurrency.OverflowPolicy.BLOCK),
+        )
+        release = asyncio.Event()
+
+        async def wait():
+            await release.wait()
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        admitted = [await scheduler.submit(wait(), "cosmetic") for _ in range(3)]
+        await scheduler.submit(wait(), "stats")
+        blocked = asyncio.ensure_future(scheduler.submit(fail(), "stats"))
+        await asyncio.sleep(0)
+        busy = scheduler.metrics()
+        self.assertFalse(blocked.done())
+
+        release.set()
+        self.assertTrue(await blocked)
+        await scheduler.drain(timeout=1)
+
+        self.assertEqual(admitted, [True, True, False])
+        self.assertEqual(
+            (busy["cosmetic"]["running"], busy["cosmetic"]["queued"]), (1, 1)
+        )
+        self.assertEqual(busy["cosmetic"]["dropped"], 1)
+        idle = scheduler.metrics()
+        self.assertEqual(idle["cosmetic"]["completed"], 2)
+        self.assertEqual((idle["stats"]["completed"], idle["stats"]["failed"]), (1, 1))
+        self.assertEqual((idle["stats"]["running"], idle["stats"]["queued"]), (0, 0))
+
+    async def test_update_processor_orders_messages_per_chat_and_shares_slots(self):
+        from telegram import Chat, Message, Update
+
+        def update(update_id, chat_id, text):
+            chat = Chat(chat_id, Chat.SUPERGROUP)
+            return Update(
+                update_id,
+                message=Message(update_id, datetime.now(UTC), chat, text=text),
+            )
+
+        processor = update_processor.ChatFairUpdateProcessor(
+            max_running=4, per_chat=3, max_pending=16
+        )
+        command_done = asyncio.Event()
+        first_done = asyncio.Event()
+        started = []
+
+        async def handle(name, done=None):
+            started.append(name)
+            if done:
+                await done.wait()
+
+        tasks = [
+            asyncio.ensure_future(processor.process_update(item, coroutine))
+            for item, coroutine in [
+                (update(1, -1001, "/video cat"), handle("command", command_done)),
+                (update(2, -1001, "hello"), handle("first", first_done)),
+                (update(3, -1001, "world"), handle("second")),
+                (update(4, -1002, "hi"), handle("other chat")),
+            ]
+        ]
+        await asyncio.sleep(0)
+        waiting = list(started)
+        depths = processor.queue_depths()
+        busy = processor.metrics()
+        first_done.set()
+        await asyncio.gather(*tasks[1:])
+        self.assertFalse(tasks[0].done())
+        command_done.set()
+        await tasks[0]
+
+        self.assertEqual(waiting, ["command", "first", "other chat"])
+        self.assertEqual(started[-1], "second")
+        self.assertEqual(depths, {-1001: 1})
+        self.assertEqual((busy["running"], busy["pending"]), (2, 1))
+        self.assertEqual(processor.metrics()["chats"], 0)
+
+    async def test_message_tracking_sees_a_chats_messages_in_arrival_order(self):
+        from telegram import Chat, Message, Update, User
+        from telegram.ext import ApplicationBuilder, TypeHandler
+        from telegram.request import BaseRequest
+
+        message_tracking = importlib.import_module("management.message_tracking")
+
+        class LocalBotRequest(BaseRequest):
+            @property
+            def read_timeout(self):
+                return None
+
+            async def initialize(self):
+                pass
+
+            async def shutdown(self):
+                pass
+
+            async def do_request(self, url, method, request_data=None, **_kwargs):
+                bot = {"id": 1, "is_bot": True, "first_name": "Bot", "username": "bot"}
+                return 200, json.dumps({"ok": True, "result": bot}).encode()
+
+        application = (
+            ApplicationBuilder()
+            .token("1:test")
+            .request(LocalBotRequest())
+            .updater(None)
+            .concurrent_updates(update_processor.ChatFairUpdateProcessor())
+            .build()
+        )
+        application.add_handler(
+            TypeHandler(Update, update_context_module.bind_update_context), -1
+        )
+        application.add_handlers(
+            [message_tracking.message_stats_handler, message_tracking.mention_handler],
+            3,
+        )
+        settings = chat_settings.ChatSettings(
+            fts=True, auto_dl=False, whitelisted=frozenset()
+        )
+        loads = 0
+        tracked = []
+
+        async def load_settings(_chat_id):
+            nonlocal loads
+            loads += 1
+            # The first message's cold settings load is the slowest.
+            await asyncio.sleep(0.05 if loads == 1 else 0)
+            return settings
+
+        async def save_message_stats(message, _settings):
+            tracked.append(message.message_id)
+
+        chat = Chat(-1001, Chat.SUPERGROUP)
+        author = User(7, "Alice", False)
+        with (
+            patch.object(update_context_module, "get_chat_settings", load_settings),
+            patch.object(message_tracking, "save_message_stats", save_message_stats),
+        ):
+            await application.initialize()
+            await application.start()
+            for message_id in range(1, 6):
+                message = Message(
+                    message_id,
+                    datetime.now(UTC),
+                    chat,
+                    from_user=author,
+                    text=f"message {message_id}",
+                )
+                message.set_bot(application.bot)
+                await application.update_queue.put(Update(message_id, message=message))
+            await application.update_queue.join()
+            await application.stop()
+            await application.shutdown()
+
+        self.assertEqual(tracked, [1, 2, 3, 4, 5])
+
+    async def test_read_db_serves_from_replica_and_resyncs_after_writes(self):
+        replica = FakeReplicaConnection()
+        primary = FakeSyncConnection()
+
+        with (
+            patch.dict(os.environ, {"TURSO_DATABASE_URL": "libsql://example"}),
+            patch.object(db, "DB_REPLICA_PATH", "replica.db"),
+            patch.object(db, "DB_REPLICA_SYNC_SECONDS", 60),
+            patch.object(db, "open_replica_connection", return_value=replica),
+            patch.object(db, "open_sync_connection", return_value=primary),
+        ):
+            async with db.get_read_db() as conn:
+                await conn.execute("SELECT fts FROM group_settings;")
+            async with db.get_db() as conn:
+                await conn.execute("SELECT 1;")
+            await asyncio.sleep(0.01)
+            self.assertEqual(replica.syncs, 1)
+            async with db.get_db() as conn:
+                await conn.execute("UPDATE group_settings SET fts = 1;")
+            await asyncio.sleep(0.01)
+            self.assertEqual(replica.syncs, 2)
+            await db.close_db()
+
+        self.assertEqual(replica.queries, ["SELECT fts FROM group_settings;"])
+        self.assertNotIn("SELECT fts FROM group_settings;", primary.queries)
+        self.assertTrue(replica.closed)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -6,7 +6,7 @@ import tempfile
 import unittest
 from pathlib import Path
 from types import SimpleNamespace
-from unittest.mock import AsyncMock, Mock, patch
+from unittest.mock import AsyncMock, patch
 
 import libsql
 
@@ -18,6 +18,8 @@ os.environ.setdefault("TURSO_AUTH_TOKEN", "test-token")
 command_usage = importlib.import_module("command_usage")
 db = importlib.import_module("config.db")
 migrate = importlib.import_module("migrate")
+query_stats = importlib.import_module("config.query_stats")
+botstats = importlib.import_module("management.botstats")
 runtime = importlib.import_module("commands.runtime")
 
 
@@ -65,7 +67,7 @@ class ObservabilityTests(unittest.IsolatedAsyncioTestCase):
             reply_text=AsyncMock(),
             set_reaction=AsyncMock(),
         )
-        finish = Mock()
+        finish = AsyncMock()
 
         def discard(coroutine, _name):
             coroutine.close()
@@ -201,6 +203,48 @@ class ObservabilityTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(events[0]["error_type"], "TimeoutError")
         self.assertEqual(events[1]["input_text"], "who likes <gulab jamun> most?")
 
+    def test_query_fingerprint_groups_literals_and_placeholder_lists(self):
+        self.assertEqual(
+            query_stats.fingerprint(
+                "SELECT *\n  FROM t WHERE id IN (?, ?, ?) AND name = 'x' LIMIT 5;"
+            ),
+            "SELECT * FROM t WHERE id IN (?, ...) AND name = ? LIMIT ?",
+        )
+
+    async def test_query_stats_are_recorded_and_reported(self):
+        query_stats.reset_query_stats()
+        self.addCleanup(query_stats.reset_query_stats)
+        with tempfile.TemporaryDirectory() as directory:
+            connection = libsql.connect(
+                str(Path(directory, "stats.db")),
+                autocommit=True,
+                _check_same_thread=False,
+            )
+            migrate.load_migration(
+                Path("migrations/20261018000000_query_stats.py")
+            ).upgrade(connection)
+            conn = db.TursoConnection(connection)
+            for value in (1, 2):
+                async with conn.execute(
+                    "SELECT ? UNION ALL SELECT 3", (value,)
+                ) as rows:
+                    await rows.fetchall()
+
+            with patch.object(botstats, "get_db", return_value=ConnectionContext(conn)):
+                await botstats.save_query_stats()
+            try:
+                report = command_usage.query_report(connection, limit=10)
+            finally:
+                connection.close()
+
+        [query] = [
+            row
+            for row in report["queries"]
+            if row["fingerprint"] == "SELECT ? UNION ALL SELECT ?"
+        ]
+        self.assertEqual((query["calls"], query["rows"], query["errors"]), (2, 4, 0))
+        self.assertGreaterEqual(query["p99_ms"], query["p50_ms"])
+
 
 if __name__ == "__main__":
     unittest.main()
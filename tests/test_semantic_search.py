@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import dataclasses
 import importlib
 import os
+import subprocess
+import sys
 import tempfile
 import unittest
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
 
+import httpx
+import openai
+
 os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
 os.environ.setdefault("QUOTE_CHANNEL_ID", "1")
 os.environ.setdefault("OPENROUTER_API_KEY", "test-openrouter-key")
@@ -19,6 +28,10 @@ chat_aliases = importlib.import_module("management.chat_aliases")
 chat_search = importlib.import_module("management.chat_search")
 search_cache = importlib.import_module("management.chat_search_cache")
 search_index = importlib.import_module("management.chat_search_index")
+search_feed = importlib.import_module("management.chat_search_feed")
+search_backfill = importlib.import_module("management.chat_search_backfill")
+chat_search_lag = importlib.import_module("chat_search_lag")
+command_usage = importlib.import_module("command_usage")
 openrouter_embeddings = importlib.import_module("openrouter_embeddings")
 commands_ai = importlib.import_module("commands.ai")
 db = importlib.import_module("config.db")
@@ -26,6 +39,13 @@ libsql = importlib.import_module("libsql")
 migrate = importlib.import_module("migrate")
 
 
+def api_response(status: int) -> httpx.Response:
+    return httpx.Response(
+        status,
+        request=httpx.Request("POST", "https://openrouter.ai/api/v1/embeddings"),
+    )
+
+
 class SemanticSearchTests(unittest.TestCase):
     def test_utterance_migration_matches_the_index_record(self):
         with tempfile.TemporaryDirectory() as directory:
@@ -145,6 +165,22 @@ class SemanticSearchTests(unittest.TestCase):
             [(1, 12), (13, 13)],
         )
 
+    def test_search_feed_state_ignores_duplicates_and_flags_gaps(self):
+        def message(message_id):
+            return search_index.SourceMessage(
+                message_id, "2026-10-18 10:00:00", "@alice", "text", 1
+            )
+
+        state = search_feed.ChatIndexState(
+            -1001, [message(10), message(12)], set(), [message(12)], set()
+        )
+
+        self.assertTrue(state.append(message(14)))
+        self.assertTrue(state.append(message(12)))
+        self.assertTrue(state.append(message(3)))
+        self.assertFalse(state.append(message(11)))
+        self.assertEqual([item.message_id for item in state.windows], [10, 12, 14])
+
     def test_select_evidence_removes_overlaps(self):
         evidence = semantic_search.SearchEvidence
         windows = [
@@ -373,8 +409,8 @@ class ChatSearchTests(unittest.IsolatedAsyncioTestCase):
 
 class SearchCacheTests(unittest.IsolatedAsyncioTestCase):
     async def test_vector_search_reads_local_cache_and_scopes_chat(self):
-        def vector(first: int) -> str:
-            return f"[{first}," + ",".join(["0"] * 1023) + "]"
+        def vector(first: int) -> bytes:
+            return openrouter_embeddings.vector32_blob([first] + [0.0] * 1023)
 
         columns = {
             name: index
@@ -391,17 +427,14 @@ class SearchCacheTests(unittest.IsolatedAsyncioTestCase):
             )
         }
         rows = [
-            search_cache.TursoRow(
+            db.row_type(tuple(columns))(
                 (1, -1001, 1, 24, vector(1), "model", 1024),
-                columns,
             ),
-            search_cache.TursoRow(
+            db.row_type(tuple(columns))(
                 (2, -1001, 25, 48, vector(-1), "model", 1024),
-                columns,
             ),
-            search_cache.TursoRow(
+            db.row_type(tuple(columns))(
                 (3, -1002, 1, 24, vector(1), "model", 1024),
-                columns,
             ),
         ]
 
@@ -514,7 +547,7 @@ class SearchCacheTests(unittest.IsolatedAsyncioTestCase):
         )
 
     def test_new_tail_window_replaces_stale_cached_range(self):
-        vector = "[1," + ",".join(["0"] * 1023) + "]"
+        vector = openrouter_embeddings.vector32_blob([1.0] + [0.0] * 1023)
         columns = {
             name: index
             for index, name in enumerate(
@@ -530,13 +563,11 @@ class SearchCacheTests(unittest.IsolatedAsyncioTestCase):
             )
         }
         rows = [
-            search_cache.TursoRow(
+            db.row_type(tuple(columns))(
                 (1, -1001, 1, 10, vector, "model", 1024),
-                columns,
             ),
-            search_cache.TursoRow(
+            db.row_type(tuple(columns))(
                 (2, -1001, 1, 20, vector, "model", 1024),
-                columns,
             ),
         ]
 
@@ -560,7 +591,7 @@ class SearchCacheTests(unittest.IsolatedAsyncioTestCase):
             self.assertEqual(cached, [(20, 2)])
 
     def test_new_tail_utterance_replaces_stale_cached_text(self):
-        vector = "[1," + ",".join(["0"] * 255) + "]"
+        vector = openrouter_embeddings.vector32_blob([1.0] + [0.0] * 255)
         columns = {
             name: index
             for index, name in enumerate(
@@ -581,7 +612,7 @@ class SearchCacheTests(unittest.IsolatedAsyncioTestCase):
             )
         }
         rows = [
-            search_cache.TursoRow(
+            db.row_type(tuple(columns))(
                 (
                     1,
                     -1001,
@@ -596,9 +627,8 @@ class SearchCacheTests(unittest.IsolatedAsyncioTestCase):
                     "model",
                     256,
                 ),
-                columns,
             ),
-            search_cache.TursoRow(
+            db.row_type(tuple(columns))(
                 (
                     2,
                     -1001,
@@ -613,7 +643,6 @@ class SearchCacheTests(unittest.IsolatedAsyncioTestCase):
                     "model",
                     256,
                 ),
-                columns,
             ),
         ]
 
@@ -650,9 +679,16 @@ class OpenRouterEmbeddingTests(unittest.IsolatedAsyncioTestCase):
             )
         )
 
-        with patch(
-            "commands.ai.openrouter_provider",
-            return_value=provider,
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            patch.dict(
+                os.environ,
+                {"SEARCH_CACHE_PATH": f"{directory}/search.db"},
+            ),
+            patch(
+                "commands.ai.openrouter_provider",
+                return_value=provider,
+            ),
         ):
             embeddings = await openrouter_embeddings.openrouter_embeddings(
                 "model",
@@ -666,6 +702,173 @@ class OpenRouterEmbeddingTests(unittest.IsolatedAsyncioTestCase):
             {"provider": {"sort": "latency"}},
         )
 
+    async def test_embeddings_reuse_cached_text_and_evict_oldest(self):
+        async def create(*, model, input, dimensions, extra_body):
+            return SimpleNamespace(
+                data=[
+                    SimpleNamespace(embedding=[float(len(text)), 0.5]) for text in input
+                ]
+            )
+
+        provider = SimpleNamespace(
+            sdk_client=SimpleNamespace(
+                embeddings=SimpleNamespace(create=AsyncMock(side_effect=create)),
+            )
+        )
+        stats = search_cache.EmbeddingCacheStats()
+
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            patch.dict(
+                os.environ,
+                {"SEARCH_CACHE_PATH": f"{directory}/search.db"},
+            ),
+            patch("commands.ai.openrouter_provider", return_value=provider),
+            patch.object(search_cache, "embedding_cache_stats", stats),
+        ):
+            first = await openrouter_embeddings.openrouter_embeddings(
+                "model", ["a", "bb", "a"], dimensions=2
+            )
+            second = await openrouter_embeddings.openrouter_embeddings(
+                "model", ["bb", "ccc"], dimensions=2
+            )
+            other_model = await openrouter_embeddings.openrouter_embeddings(
+                "other", ["a"], dimensions=2
+            )
+            calls = [
+                call.kwargs["input"]
+                for call in provider.sdk_client.embeddings.create.await_args_list
+            ]
+            touched = await search_cache.cached_embeddings("model", 2, ["a"])
+
+            # Two 8-byte entries fit, so the three least recently used go.
+            with patch.object(search_cache, "EMBEDDING_CACHE_MAX_MB", 16 / 2**20):
+                await search_cache.store_embeddings(
+                    "model",
+                    2,
+                    ["dddd"],
+                    [openrouter_embeddings.vector32_blob([4.0, 0.5])],
+                )
+            cached = await search_cache.cached_embeddings(
+                "model", 2, ["a", "bb", "ccc", "dddd"]
+            )
+            connection = search_cache.open_search_cache()
+            tracked = connection.execute(
+                "SELECT entries, size FROM embedding_cache_state"
+            ).fetchone()
+            actual = connection.execute(
+                "SELECT COUNT(*), SUM(LENGTH(embedding)) FROM embedding_cache"
+            ).fetchone()
+            connection.close()
+
+        self.assertEqual(first, [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]])
+        self.assertEqual(second, [[2.0, 0.5], [3.0, 0.5]])
+        self.assertEqual(other_model, [[1.0, 0.5]])
+        self.assertEqual(calls, [["a", "bb"], ["ccc"], ["a"]])
+        self.assertEqual(touched, [[1.0, 0.5]])
+        self.assertEqual(cached, [[1.0, 0.5], None, None, [4.0, 0.5]])
+        self.assertEqual(tracked, (2, 16))
+        self.assertEqual(tracked, actual)
+        self.assertEqual((stats.hits, stats.misses), (4, 7))
+        self.assertEqual((stats.stored, stats.evicted), (5, 3))
+
+    async def test_embeddings_pack_token_budget_and_split_failed_requests(self):
+        requests = []
+
+        async def create(*, model, input, dimensions, extra_body):
+            requests.append(list(input))
+            if len(input) > 2:
+                raise openai.APIStatusError(
+                    "payload too large", response=api_response(413), body=None
+                )
+            return SimpleNamespace(
+                data=[SimpleNamespace(embedding=[float(text[1:])]) for text in input]
+            )
+
+        provider = SimpleNamespace(
+            sdk_client=SimpleNamespace(
+                embeddings=SimpleNamespace(create=AsyncMock(side_effect=create)),
+            )
+        )
+        # 30-character inputs estimate 11 tokens, so a 40 token budget packs 3.
+        inputs = [f"m{index}".ljust(30) for index in range(7)]
+        sizer = openrouter_embeddings.BatchSizer(
+            budget=40, minimum=10, maximum=40, target_seconds=60
+        )
+
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            patch.dict(
+                os.environ,
+                {"SEARCH_CACHE_PATH": f"{directory}/search.db"},
+            ),
+            patch("commands.ai.openrouter_provider", return_value=provider),
+            patch.object(openrouter_embeddings, "batch_sizer", sizer),
+        ):
+            embeddings = await openrouter_embeddings.openrouter_embeddings(
+                "model", inputs, dimensions=1
+            )
+
+        self.assertEqual(embeddings, [[float(index)] for index in range(7)])
+        self.assertEqual(
+            sorted(len(batch) for batch in requests), [1, 1, 1, 2, 2, 3, 3]
+        )
+        self.assertEqual((sizer.requests, sizer.failures), (5, 2))
+        self.assertLess(sizer.budget, 40)
+
+    async def test_embeddings_retry_transient_errors_once_without_splitting(self):
+        cases = (
+            (openai.RateLimitError, 429, 2),
+            (openai.InternalServerError, 502, 2),
+            (openai.AuthenticationError, 401, 1),
+            (openai.BadRequestError, 400, 1),
+        )
+        for error, status, attempts in cases:
+            with self.subTest(status=status):
+                create = AsyncMock(
+                    side_effect=error(
+                        "request failed", response=api_response(status), body=None
+                    )
+                )
+                provider = SimpleNamespace(
+                    sdk_client=SimpleNamespace(
+                        embeddings=SimpleNamespace(create=create)
+                    )
+                )
+                sizer = openrouter_embeddings.BatchSizer(
+                    budget=40, minimum=10, maximum=40
+                )
+                with (
+                    patch("commands.ai.openrouter_provider", return_value=provider),
+                    patch.object(openrouter_embeddings, "batch_sizer", sizer),
+                    patch.object(openrouter_embeddings, "EMBEDDING_RETRY_SECONDS", 0),
+                    self.assertRaises(error),
+                ):
+                    await openrouter_embeddings._embed_batch(
+                        "model", ["a", "b", "c", "d"], 1, asyncio.Semaphore(1)
+                    )
+
+                self.assertEqual(create.await_count, attempts)
+                self.assertEqual((sizer.budget, sizer.failures), (40, 0))
+
+    def test_embedding_batches_keep_oversized_inputs_alone(self):
+        batches = openrouter_embeddings.pack_batches(["a" * 90, "b", "c"], 20)
+
+        self.assertEqual(batches, [["a" * 90], ["b", "c"]])
+
+    def test_vector32_blob_matches_libsql_f32_layout(self):
+        connection = libsql.connect(":memory:", autocommit=True)
+        try:
+            blob = openrouter_embeddings.vector32_blob([1.0, -2.5, 0.25])
+            stored = connection.execute(
+                "SELECT vector32(?), vector_extract(vector32(?))", (blob, blob)
+            ).fetchone()
+        finally:
+            connection.close()
+
+        self.assertEqual(len(blob), 12)
+        self.assertEqual(stored, (blob, "[1,-2.5,0.25]"))
+
 
 class SearchIndexTests(unittest.IsolatedAsyncioTestCase):
     async def test_store_windows_cleans_each_growing_tail(self):
@@ -733,6 +936,26 @@ class SearchIndexTests(unittest.IsolatedAsyncioTestCase):
             [(-1002, 3), (-1001, 3)],
         )
 
+    async def test_pending_indexing_overlaps_chats_up_to_the_limit(self):
+        running = 0
+        peak = 0
+
+        async def index_chat(_chat_id, limit):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return limit - 1
+
+        with patch.object(search_index, "INDEX_CONCURRENCY", 2):
+            indexed = await search_index.index_fairly(
+                [-1001, -1002, -1003, -1004], 8, index_chat
+            )
+
+        self.assertEqual(indexed, 4)
+        self.assertEqual(peak, 2)
+
     async def test_pending_utterances_allocates_each_chat_a_share(self):
         index_chat_utterances = AsyncMock(side_effect=lambda _chat_id, limit: limit)
         with (
@@ -776,6 +999,358 @@ class SearchIndexTests(unittest.IsolatedAsyncioTestCase):
             [search_index.MIN_MESSAGE_ID, 100],
         )
 
+    @contextlib.contextmanager
+    def feed_database(self):
+        """A migrated chat with search on, wired to the feed and the indexer."""
+
+        class ConnectionContext:
+            def __init__(self, connection):
+                self.connection = connection
+
+            async def __aenter__(self):
+                return self.connection
+
+            async def __aexit__(self, *_args):
+                return None
+
+        def fake_embeddings(dimensions):
+            return AsyncMock(
+                side_effect=lambda items: [[0.0] * dimensions] * len(items)
+            )
+
+        with tempfile.TemporaryDirectory() as directory:
+            connection = libsql.connect(
+                f"{directory}/feed.db", autocommit=True, _check_same_thread=False
+            )
+            for path in sorted(migrate.MIGRATIONS_DIR.glob("*.py")):
+                migrate.load_migration(path).upgrade(connection)
+            connection.execute(
+                "INSERT INTO group_settings (chat_id, fts) VALUES (-1001, 1)"
+            )
+            context = ConnectionContext(db.TursoConnection(connection))
+            try:
+                with (
+                    patch.object(search_feed, "get_db", return_value=context),
+                    patch.object(search_index, "get_db", return_value=context),
+                    patch.object(search_backfill, "get_db", return_value=context),
+                    patch.object(search_backfill, "sync_search_cache", AsyncMock()),
+                    patch.object(
+                        search_feed,
+                        "embed_windows",
+                        fake_embeddings(search_index.EMBEDDING_DIMENSIONS),
+                    ),
+                    patch.object(
+                        search_feed,
+                        "embed_utterances",
+                        fake_embeddings(search_index.UTTERANCE_EMBEDDING_DIMENSIONS),
+                    ),
+                    patch.object(search_feed, "sync_search_cache", AsyncMock()),
+                ):
+                    yield connection
+            finally:
+                connection.close()
+
+    @staticmethod
+    def insert_feed_messages(connection, message_ids):
+        connection.executemany(
+            """
+            INSERT INTO chat_stats (
+                chat_id, user_id, message_id, create_time, message_text
+            )
+            VALUES (-1001, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    (message_id - 1) // 3 % 2 + 1,
+                    message_id,
+                    (
+                        datetime(2026, 6, 7, 10, tzinfo=UTC)
+                        + timedelta(minutes=message_id)
+                    ).strftime("%Y-%m-%d %H:%M:%S"),
+                    f"message {message_id}",
+                )
+                for message_id in message_ids
+            ],
+        )
+
+    @staticmethod
+    def stored_windows(connection) -> list[tuple[int, int]]:
+        return [
+            tuple(row)
+            for row in connection.execute(
+                """
+                SELECT start_message_id, end_message_id
+                FROM chat_search_windows
+                ORDER BY start_message_id
+                """
+            ).fetchall()
+        ]
+
+    async def test_search_feed_indexes_new_rows_without_rereading_the_chat(self):
+        feed = search_feed.SearchIndexFeed(budget=64)
+        load_chat_state = AsyncMock(wraps=search_feed.load_chat_state)
+        with (
+            self.feed_database() as connection,
+            patch.object(search_feed, "load_chat_state", load_chat_state),
+            patch.object(search_index, "WINDOW_QUIET_SECONDS", 0),
+        ):
+            self.insert_feed_messages(connection, range(1, 30))
+            first = await feed.run()
+            self.insert_feed_messages(connection, range(30, 41))
+            second = await feed.run()
+            idle = await feed.run()
+            windows = self.stored_windows(connection)
+            utterances = {
+                tuple(row)
+                for row in connection.execute(
+                    "SELECT start_message_id, end_message_id FROM chat_search_utterances"
+                ).fetchall()
+            }
+            checkpoint = connection.execute(
+                "SELECT last_stats_id FROM chat_search_index_checkpoint"
+            ).fetchone()
+
+        messages = [
+            search_index.SourceMessage(
+                message_id,
+                f"2026-06-07 10:{message_id:02d}:00",
+                "@user",
+                f"message {message_id}",
+                (message_id - 1) // 3 % 2 + 1,
+            )
+            for message_id in range(1, 41)
+        ]
+        expected_windows = search_index.build_windows(-1001, messages, set())
+        expected_utterances = search_index.build_utterances(-1001, messages, set())
+        self.assertEqual(first, (4, 10))
+        self.assertEqual(second, (4, 5))
+        self.assertEqual(idle, (0, 0))
+        self.assertEqual(load_chat_state.await_count, 1)
+        self.assertEqual(
+            windows,
+            [(item.start_message_id, item.end_message_id) for item in expected_windows],
+        )
+        self.assertLessEqual(
+            {
+                (item.start_message_id, item.end_message_id)
+                for item in expected_utterances
+            },
+            utterances,
+        )
+        self.assertEqual(checkpoint[0], 40)
+
+    async def test_search_feed_holds_short_windows_until_the_chat_is_quiet(self):
+        feed = search_feed.SearchIndexFeed(budget=64)
+        with self.feed_database() as connection:
+            self.insert_feed_messages(connection, range(1, 30))
+            with patch.object(search_index, "WINDOW_QUIET_SECONDS", 10**9):
+                busy = await feed.run()
+                busy_windows = self.stored_windows(connection)
+                tail = feed.tail_messages(-1001)
+                busy_checkpoint = connection.execute(
+                    "SELECT last_stats_id FROM chat_search_index_checkpoint"
+                ).fetchone()
+            with (
+                patch.object(search_index, "WINDOW_QUIET_SECONDS", 0),
+                patch.object(chat_search, "search_index_feed", feed),
+            ):
+                evidence = chat_search.tail_evidence(-1001, ["message 27"], None)
+                quiet = await feed.run()
+            quiet_windows = self.stored_windows(connection)
+
+        self.assertEqual(busy[0], 1)
+        self.assertEqual(busy_windows, [(1, 24)])
+        self.assertEqual([message.message_id for message in tail], list(range(25, 30)))
+        # The window from message 9 is still unembedded, so a restart rereads it.
+        self.assertEqual(busy_checkpoint[0], 8)
+        self.assertEqual(evidence[0].citation_message_id, 27)
+        self.assertEqual(quiet[0], 3)
+        self.assertEqual(quiet_windows, [(1, 24), (9, 29), (17, 29), (25, 29)])
+        self.assertEqual(feed.tail_messages(-1001), [])
+
+    async def test_pipelined_backfill_writes_in_order_and_resumes_after_stop(self):
+        stop = asyncio.Event()
+        calls = 0
+
+        async def embed(windows):
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                stop.set()
+            # The first request finishes last, so the writer has to wait for it.
+            await asyncio.sleep(0.05 if calls == 1 else 0)
+            return [[0.0] * search_index.EMBEDDING_DIMENSIONS] * len(windows)
+
+        with (
+            self.feed_database() as connection,
+            patch.object(search_backfill, "INDEX_BATCH_WINDOWS", 4),
+        ):
+            self.insert_feed_messages(connection, range(1, 401))
+            stage = dataclasses.replace(
+                search_backfill.backfill_stage("windows"), embed=embed
+            )
+            backlog = await search_backfill.estimate_backlog(stage, -1001)
+            interrupted = await search_backfill.run_backfill(
+                stage, [-1001], concurrency=2, stop=stop
+            )
+            partial_windows = self.stored_windows(connection)
+            resumed = await search_backfill.run_backfill(
+                stage, [-1001], concurrency=2, stop=asyncio.Event()
+            )
+            windows = self.stored_windows(connection)
+
+        messages = [
+            search_index.SourceMessage(message_id, "", "", "")
+            for message_id in range(1, 401)
+        ]
+        expected = [
+            (item.start_message_id, item.end_message_id)
+            for item in search_index.build_windows(-1001, messages, set())
+        ]
+        self.assertEqual(backlog.items, len(expected))
+        self.assertFalse(interrupted[0].finished)
+        self.assertTrue(0 < len(partial_windows) < len(expected))
+        self.assertEqual(partial_windows, expected[: len(partial_windows)])
+        self.assertTrue(resumed[0].finished)
+        self.assertEqual(windows, expected)
+        self.assertEqual(
+            interrupted[0].done + resumed[0].done,
+            len(expected),
+        )
+
+    async def test_pipelined_backfill_stops_when_a_write_fails(self):
+        embedded = 0
+        reports = []
+
+        async def embed(windows):
+            nonlocal embedded
+            embedded += 1
+            return [[0.0] * search_index.EMBEDDING_DIMENSIONS] * len(windows)
+
+        async def store(windows, embeddings):
+            raise ConnectionError("turso down")
+
+        with (
+            self.feed_database() as connection,
+            patch.object(search_backfill, "INDEX_BATCH_WINDOWS", 4),
+            patch.object(search_backfill, "REPORT_INTERVAL_SECONDS", 0),
+        ):
+            self.insert_feed_messages(connection, range(1, 401))
+            stage = dataclasses.replace(
+                search_backfill.backfill_stage("windows"), embed=embed, store=store
+            )
+            with self.assertRaises(ConnectionError):
+                await search_backfill.run_backfill(
+                    stage,
+                    [-1001],
+                    concurrency=1,
+                    stop=asyncio.Event(),
+                    report=reports.append,
+                )
+            reported = len(reports)
+            await asyncio.sleep(0.01)
+
+        self.assertLess(embedded, 400 // search_backfill.WINDOW_STRIDE // 4)
+        self.assertTrue(reports[-1][0].failed)
+        self.assertEqual(len(reports), reported)
+
+    async def test_search_lag_reports_chat_backlog_and_the_last_run(self):
+        feed = search_feed.SearchIndexFeed(budget=64)
+        with (
+            self.feed_database() as connection,
+            tempfile.TemporaryDirectory() as directory,
+            patch.dict(os.environ, {"SEARCH_CACHE_PATH": f"{directory}/none.db"}),
+            patch.object(search_index, "WINDOW_QUIET_SECONDS", 10**9),
+        ):
+            self.insert_feed_messages(connection, range(1, 30))
+            await feed.run()
+            self.insert_feed_messages(connection, range(30, 33))
+            report = await asyncio.to_thread(
+                command_usage.search_lag_report, connection
+            )
+
+        chat = report["chats"][0]
+        self.assertEqual(chat["chat_id"], -1001)
+        self.assertEqual(chat["newest_message_id"], 32)
+        self.assertEqual(chat["windows"]["indexed_through"], 24)
+        self.assertEqual(chat["windows"]["backlog_messages"], 8)
+        self.assertEqual(chat["windows"]["lag_seconds"], 8 * 60)
+        self.assertEqual(chat["utterances"]["indexed_through"], 29)
+        self.assertEqual(chat["utterances"]["backlog_messages"], 3)
+        self.assertEqual(report["indexer"]["feed_backlog_rows"], 32 - 8)
+        self.assertEqual(report["indexer"]["last_run_windows"], 1)
+        self.assertEqual(report["cache"]["windows_behind"], None)
+
+    def test_search_lag_report_runs_without_the_bot_settings(self):
+        environment = {
+            name: value
+            for name, value in os.environ.items()
+            if name not in {"TELEGRAM_TOKEN", "QUOTE_CHANNEL_ID"}
+        }
+        environment["PYTHONPATH"] = str(Path(command_usage.__file__).parent)
+        loaded = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                (
+                    "import sys, chat_search_lag, command_usage; "
+                    "print(sorted({'config', 'management'} & set(sys.modules)))"
+                ),
+            ],
+            env=environment,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        self.assertEqual(loaded.stdout.strip(), "[]")
+
+    def test_search_lag_reads_the_synced_ids_from_the_local_cache(self):
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            patch.dict(os.environ, {"SEARCH_CACHE_PATH": f"{directory}/search.db"}),
+        ):
+            search_cache.initialize_search_cache_file()
+            connection = search_cache.open_search_cache()
+            connection.execute("UPDATE search_cache_state SET remote_id = 7")
+            connection.execute("UPDATE search_utterance_cache_state SET remote_id = 9")
+            connection.close()
+
+            self.assertEqual(chat_search_lag.cached_remote_ids(), (7, 9))
+
+    async def test_checkpoint_without_a_run_keeps_the_last_run_stats(self):
+        with self.feed_database() as connection:
+            await search_feed.save_checkpoint(10, search_feed.IndexRun(120, 3, 5))
+            await search_feed.save_checkpoint(20)
+            row = connection.execute(
+                """
+                SELECT last_stats_id, last_run_ms, last_run_windows,
+                    last_run_utterances
+                FROM chat_search_index_checkpoint
+                """
+            ).fetchone()
+
+        self.assertEqual(row, (20, 120, 3, 5))
+
+    def test_final_windows_wait_for_a_full_window_or_a_quiet_chat(self):
+        def window(count, end_time):
+            return search_index.SearchWindow(
+                -1001, 1, count, "2026-10-18 09:00:00", end_time, count, "text"
+            )
+
+        now = datetime(2026, 10, 18, 10, 0, tzinfo=UTC)
+        windows = [
+            window(24, "2026-10-18 09:59:00"),
+            window(12, "2026-10-18 09:59:00"),
+        ]
+
+        with patch.object(search_index, "WINDOW_QUIET_SECONDS", 300):
+            busy = search_index.final_windows(windows, now)
+            quiet = search_index.final_windows(windows, now + timedelta(minutes=5))
+
+        self.assertEqual(busy, windows[:1])
+        self.assertEqual(quiet, windows)
+
 
 if __name__ == "__main__":
     unittest.main()